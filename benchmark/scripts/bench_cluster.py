@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+from sklearn.cluster import DBSCAN
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.cluster import CLUSTER_METHODS, dbscan_labels_exact, eps_neighbor_counts, largest_cluster_mask
+from synthetic_scene import make_aqc_scene
+
+
+def random_cases(num_cases, seed=0):
+    """
+    随机点集与参数：均匀分布、若干高斯团、坐标取整到 0.1（大量重复点和恰好等于 eps 的距离）；
+    每个点集另取 xy 作为二维用例（improve 系列只用 xy 聚类）
+    """
+    rng = np.random.default_rng(seed)
+    for i in range(num_cases):
+        n = int(rng.integers(5, 3000))
+        eps = float(rng.choice([0.05, 0.2, 0.5, 1.0, 2.0]))
+        min_samples = int(rng.integers(1, 12))
+        kind = i % 3
+        if kind == 0:
+            xyz = rng.uniform(0, 10, (n, 3))
+        elif kind == 1:
+            xyz = np.concatenate([rng.normal(c, 0.5, (n // 3 + 1, 3)) for c in rng.uniform(0, 20, (3, 3))])
+        else:
+            xyz = np.round(rng.uniform(0, 5, (n, 3)), 1)
+        yield f"random[{i}]", xyz, eps, min_samples
+        yield f"random[{i}] xy", xyz[:, :2], eps, min_samples
+
+
+def check_agreement(cases):
+    """
+    exact 的簇编号必须与 sklearn DBSCAN 完全相同（按网格判定核心点、按 eps_neighbor_counts 的计数判定核心点
+    两种方式都检查），返回不一致的用例名
+    """
+    failed = []
+    for name, xyz, eps, min_samples in cases:
+        expected = DBSCAN(eps=eps, min_samples=min_samples).fit(xyz).labels_
+        for method, got in (('exact', dbscan_labels_exact(xyz, eps, min_samples)),
+                            ('counts', dbscan_labels_exact(xyz, eps, min_samples,
+                                                           neighbor_counts=eps_neighbor_counts(xyz, eps)))):
+            if not np.array_equal(expected, got):
+                failed.append(f"{name} {method}")
+                print(f"❌ {name} {method}: {xyz.shape[0]} 点 eps={eps} min_samples={min_samples}，"
+                      f"{np.count_nonzero(expected != got)} 个点的簇编号不同")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="标签1最大簇提取：sklearn DBSCAN 与网格并查集（exact / voxel）的耗时与一致性")
+    parser.add_argument('--points', type=int, nargs='+', default=[50000, 200000, 1000000],
+                        help="合成场景总点数（标签1约占 15%%）")
+    parser.add_argument('--params', nargs='+', default=['2:5', '0.5:8'], help="eps:min_samples")
+    parser.add_argument('--random_cases', type=int, default=60, help="随机一致性用例数")
+    parser.add_argument('--max_sklearn_points', type=int, default=40000,
+                        help="标签1点数超过该值时不运行 sklearn（其邻域列表内存随密度增长）")
+    args = parser.parse_args()
+
+    params = [(float(p.split(':')[0]), int(p.split(':')[1])) for p in args.params]
+    scenes = [(num_points, make_aqc_scene(num_points, seed=num_points % 97)) for num_points in args.points]
+
+    # 一致性：随机用例 + 合成场景中 sklearn 能跑完的标签1点集
+    cases = list(random_cases(args.random_cases))
+    for num_points, (xyz, labels) in scenes:
+        xyz1 = xyz[labels == 1].astype(np.float64)
+        if xyz1.shape[0] <= args.max_sklearn_points:
+            cases += [(f"scene[{num_points}] eps={eps}", xyz1, eps, ms) for eps, ms in params]
+    failed = check_agreement(cases)
+    print(f"一致性：{len(cases)} 个用例中 {len(failed)} 项与 sklearn 不一致")
+
+    print(f"{'标签1点数':>10}{'eps':>6}{'min_s':>6}" + ''.join(f"{m:>12}" for m in CLUSTER_METHODS) + f"{'voxel IoU':>12}")
+    for num_points, (xyz, labels) in scenes:
+        xyz1 = xyz[labels == 1].astype(np.float64)
+        for eps, ms in params:
+            times, masks = {}, {}
+            for method in CLUSTER_METHODS:
+                if method == 'sklearn' and xyz1.shape[0] > args.max_sklearn_points:
+                    continue
+                start = time.perf_counter()
+                masks[method] = largest_cluster_mask(xyz1, eps, ms, method)
+                times[method] = time.perf_counter() - start
+            reference = masks['exact']
+            iou = np.count_nonzero(reference & masks['voxel']) / max(np.count_nonzero(reference | masks['voxel']), 1)
+            cells = ''.join(f"{times[m] * 1000:>10.1f}ms" if m in times else f"{'-':>12}" for m in CLUSTER_METHODS)
+            print(f"{xyz1.shape[0]:>10}{eps:>6}{ms:>6}{cells}{iou:>12.4f}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
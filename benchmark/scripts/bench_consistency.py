@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.normals import normal_consistency_labels
+
+
+def loop_labels(normals, cluster_labels, cos_threshold, noise_policy):
+    """
+    原实现：逐簇对全部标签2点做掩码，求平均法向与余弦
+    """
+    new_labels = np.zeros(cluster_labels.shape[0], dtype=np.int64)
+    for clu in np.unique(cluster_labels):
+        clu_mask = cluster_labels == clu
+        idx = np.where(clu_mask)[0]
+        if clu == -1:
+            new_labels[idx] = 2 if noise_policy == 'keep' else 0
+            continue
+        clu_normals = normals[clu_mask]
+        mean_normal = np.mean(clu_normals, axis=0)
+        mean_normal /= np.linalg.norm(mean_normal) + 1e-8
+        cos_sim = np.dot(clu_normals, mean_normal)
+        new_labels[idx] = np.where(cos_sim > cos_threshold, 2, 0)
+    return new_labels
+
+
+def make_case(num_points, num_clusters, noise_ratio, seed):
+    """
+    num_clusters 个簇（每簇法向集中在一个随机方向附近）加噪声点，点序打乱
+    """
+    rng = np.random.default_rng(seed)
+    cluster_labels = rng.integers(0, num_clusters, num_points)
+    cluster_labels[rng.random(num_points) < noise_ratio] = -1
+    directions = rng.normal(size=(num_clusters, 3))
+    normals = directions[np.maximum(cluster_labels, 0)] + rng.normal(scale=0.4, size=(num_points, 3))
+    normals /= np.linalg.norm(normals, axis=1)[:, None]
+    return normals, cluster_labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="标签2法向一致性筛选：逐簇循环 与 分组一次计算 的耗时和一致性")
+    parser.add_argument('--points', type=int, nargs='+', default=[20000, 100000])
+    parser.add_argument('--clusters', type=int, nargs='+', default=[10, 100, 1000, 5000])
+    parser.add_argument('--noise_ratio', type=float, default=0.1)
+    parser.add_argument('--cos_threshold', type=float, default=0.8)
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'标签2点数':>10}{'簇数':>8}{'逐簇循环':>12}{'分组计算':>12}{'加速':>8}{'结果不同':>10}")
+    for num_points in args.points:
+        for num_clusters in args.clusters:
+            normals, cluster_labels = make_case(num_points, num_clusters, args.noise_ratio, num_clusters)
+            # 两种噪声点处理方式都核对，耗时取最后一种
+            mismatched = 0
+            for noise_policy in ('keep', 'drop'):
+                start = time.perf_counter()
+                expected = loop_labels(normals, cluster_labels, args.cos_threshold, noise_policy)
+                t_loop = time.perf_counter() - start
+                start = time.perf_counter()
+                got = normal_consistency_labels(normals, cluster_labels, args.cos_threshold, noise_policy)[0]
+                t_grouped = time.perf_counter() - start
+                mismatched += np.count_nonzero(expected != got)
+            failed |= mismatched > 0
+            print(f"{num_points:>10}{num_clusters:>8}{t_loop * 1000:>10.1f}ms{t_grouped * 1000:>10.1f}ms"
+                  f"{t_loop / t_grouped:>7.0f}x{mismatched:>10}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import io
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+import contextlib
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'process_data', 'scripts'))
+from common.pcd_io import PCD_DATA_FORMATS, read_pcd_points, write_pcd_points
+from synthetic_scene import make_aqc_scene, write_scene_pcd, write_scene_kitti
+
+DEFAULT_RESULTS = os.path.join(ROOT, 'benchmark', 'results', 'hot_paths.jsonl')
+# 比基线慢超过该比例时标记为退化
+REGRESSION_THRESHOLD = 1.10
+
+
+def git_commit():
+    """
+    当前提交的短哈希，工作区有未提交改动时加上 -dirty
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return commit + '-dirty' if dirty else commit
+
+
+def time_best(func, repeat=3, budget=30.0):
+    """
+    取 repeat 次中的最短耗时；累计超过 budget 秒后不再重复（慢函数在大点数下只跑一次）
+    """
+    best, spent = float('inf'), 0.0
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+        best, spent = min(best, elapsed), spent + elapsed
+        if spent > budget:
+            break
+    return best
+
+
+def hot_path_benchmarks(tmp_dir, num_points, seed=0):
+    """
+    生成一帧合成场景，返回 [(名称, 可调用对象或跳过原因)]；依赖 open3d 的函数在未安装或无法加载时给出跳过原因
+    """
+    xyz, labels = make_aqc_scene(num_points, seed)
+    # 与 read_pcd_points 的返回一致：float64 的 x y z label
+    points = np.column_stack([xyz, labels]).astype(np.float64)
+    paths = {}
+    for data_format in PCD_DATA_FORMATS:
+        paths[data_format] = os.path.join(tmp_dir, f"{num_points}_{data_format}.pcd")
+        write_scene_pcd(paths[data_format], xyz, labels, data_format)
+    bin_path = os.path.join(tmp_dir, f"{num_points}.bin")
+    write_scene_kitti(bin_path, os.path.join(tmp_dir, f"{num_points}.label"), xyz, labels)
+    header, _ = read_pcd_points(paths['ascii'])
+    out_path = os.path.join(tmp_dir, "out.pcd")
+
+    benches = []
+    for data_format in PCD_DATA_FORMATS:
+        benches.append((f"read_pcd[{data_format}]", lambda p=paths[data_format]: read_pcd_points(p)))
+    for data_format in PCD_DATA_FORMATS:
+        benches.append((f"write_pcd[{data_format}]",
+                        lambda f=data_format: write_pcd_points(out_path, points, header, f)))
+
+    import cut_new
+    benches.append(("cut_new.remove_outliers_by_percentile", lambda: cut_new.remove_outliers_by_percentile(points)))
+    benches.append(("cut_new.get_dynamic_bounds", lambda: cut_new.get_dynamic_bounds(points)))
+    benches.append(("cut_new.crop_points", lambda: cut_new.crop_points(points)))
+
+    import DBSCAN as dbscan_stage
+    benches.append(("DBSCAN.process_pcd_file",
+                    lambda: dbscan_stage.process_pcd_file(paths['binary'], out_path, 2, 5, 'binary')))
+
+    try:
+        import improve2
+        # 函数会就地改写标签列，每次传入副本
+        benches.append(("improve2.filter_label2_by_normal_cluster",
+                        lambda: improve2.filter_label2_by_normal_cluster(points.copy(), cos_threshold=0.8,
+                                                                         dbscan_eps=0.5, dbscan_min_samples=3)))
+    except (ImportError, OSError) as e:
+        benches.append(("improve2.filter_label2_by_normal_cluster", f"跳过：{e}"))
+
+    import removeisolated
+    benches.append(("removeisolated.remove_outliers", lambda: removeisolated.remove_outliers(xyz, labels)))
+
+    import scan
+    benches.append(("scan.scan_file", lambda: scan.scan_file(bin_path, 'bench')))
+    return benches
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def find_baseline(history, commit, baseline=None):
+    """
+    baseline 为提交哈希前缀时取该提交最近一次结果，否则取最近一次来自其他提交的结果
+    """
+    for run in reversed(history):
+        if baseline is not None:
+            if run['commit'].startswith(baseline):
+                return run
+        elif run['commit'] != commit:
+            return run
+    return None
+
+
+def compare_runs(current, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    逐项对比耗时，打印比值并返回退化项列表
+    """
+    base = {(r['bench'], r['points']): r['seconds'] for r in baseline['results']}
+    print(f"与 {baseline['commit']}（{baseline['time']}）对比：")
+    regressions = []
+    for r in current['results']:
+        old = base.get((r['bench'], r['points']))
+        if old is None:
+            continue
+        ratio = r['seconds'] / old if old > 0 else float('inf')
+        mark = ''
+        if ratio > threshold:
+            mark = '  ⚠️ 退化'
+            regressions.append(r)
+        elif ratio < 1 / threshold:
+            mark = '  ✅ 加速'
+        print(f"{r['bench']:<45}{r['points']:>9}  {old * 1000:10.1f} → {r['seconds'] * 1000:10.1f} ms"
+              f"  x{ratio:5.2f}{mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="热点函数在合成岸桥场景上的耗时，结果按提交追加保存，便于对比退化")
+    parser.add_argument('--points', type=int, nargs='+', default=[10000, 100000, 500000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--budget', type=float, default=30.0, help="单项累计耗时超过该秒数后不再重复")
+    parser.add_argument('--only', nargs='+', default=None, help="只运行名称包含这些子串的项")
+    parser.add_argument('--results', default=DEFAULT_RESULTS, help="结果 JSONL，每次运行追加一行")
+    parser.add_argument('--baseline', default=None, help="对比的提交哈希前缀，默认为最近一次其他提交的结果")
+    parser.add_argument('--no_save', action='store_true', help="只打印不保存")
+    args = parser.parse_args()
+
+    run = {
+        'commit': git_commit(),
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'repeat': args.repeat,
+        'results': [],
+        'skipped': {},
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for num_points in args.points:
+            for name, bench in hot_path_benchmarks(tmp_dir, num_points):
+                if args.only and not any(s in name for s in args.only):
+                    continue
+                if isinstance(bench, str):
+                    run['skipped'][name] = bench
+                    continue
+                seconds = time_best(bench, args.repeat, args.budget)
+                run['results'].append({'bench': name, 'points': num_points, 'seconds': seconds})
+                print(f"{name:<45}{num_points:>9}  {seconds * 1000:10.1f} ms  "
+                      f"{num_points / seconds / 1e6:8.2f} M点/s")
+    for name, reason in run['skipped'].items():
+        print(f"{name}: {reason}")
+
+    history = load_history(args.results)
+    baseline = find_baseline(history, run['commit'], args.baseline)
+    if baseline is not None:
+        compare_runs(run, baseline)
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+        with open(args.results, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(run, ensure_ascii=False) + '\n')
+        print(f"结果已追加到 {args.results}（提交 {run['commit']}）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+from scipy.spatial import cKDTree
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.normals import DEFAULT_NORMAL_KNN, knn_normals
+from synthetic_scene import make_aqc_scene
+
+# 与 open3d 的法向逐点比较的容差（协方差的计算顺序不同，只有浮点误差）
+OPEN3D_TOLERANCE = 1e-6
+
+
+def timed(func):
+    start = time.perf_counter()
+    value = func()
+    return value, time.perf_counter() - start
+
+
+def open3d_normals(xyz, knn):
+    """
+    原实现：open3d 对全部点估算法向；open3d 无法加载时返回 None
+    """
+    try:
+        import open3d as o3d
+    except (ImportError, OSError):
+        return None
+    pcd = o3d.geometry.PointCloud()
+    pcd.points = o3d.utility.Vector3dVector(xyz)
+    pcd.estimate_normals(search_param=o3d.geometry.KDTreeSearchParamKNN(knn=knn))
+    return np.asarray(pcd.normals)
+
+
+def eigh_directions(xyz, query_idx, knn):
+    """
+    np.linalg.eigh 求出的最小特征向量（符号不确定），只用来核对方向
+    """
+    _, neighbors = cKDTree(xyz).query(xyz[query_idx], k=knn)
+    nb = xyz[neighbors]
+    nb -= nb.mean(axis=1, keepdims=True)
+    return np.linalg.eigh(np.matmul(nb.transpose(0, 2, 1), nb))[1][:, :, 0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="标签2法向：open3d 全部点估算 与 只对标签2点估算（KNN + 批量协方差）的耗时和一致性")
+    parser.add_argument('--points', type=int, nargs='+', default=[50000, 200000, 1000000])
+    parser.add_argument('--knn', type=int, default=DEFAULT_NORMAL_KNN)
+    parser.add_argument('--skip_full', action='store_true', help="不计算全部点的法向（大点数时较慢）")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'点数':>10}{'标签2':>9}{'open3d全部':>12}{'numpy全部':>12}{'只算标签2':>12}{'方向偏差':>12}{'与open3d':>12}")
+    for num_points in args.points:
+        xyz, labels = make_aqc_scene(num_points, seed=num_points % 97)
+        xyz = xyz.astype(np.float64)
+        idx2 = np.flatnonzero(labels == 2)
+
+        label2, t_label2 = timed(lambda: knn_normals(xyz, idx2, args.knn))
+        reference, t_o3d = timed(lambda: open3d_normals(xyz, args.knn))
+        t_full = None
+        if not args.skip_full:
+            full, t_full = timed(lambda: knn_normals(xyz, None, args.knn))
+            # 近邻相同，只对标签2计算的结果必须与全部计算后取出的完全相同
+            if not np.array_equal(full[idx2], label2):
+                print(f"❌ {num_points}：只对标签2计算的法向与全部点计算后取出的不同")
+                failed = True
+
+        direction_error = 1 - np.abs((label2 * eigh_directions(xyz, idx2, args.knn)).sum(axis=1)).min()
+        failed |= direction_error > 1e-9
+        agree = '-'
+        if reference is not None:
+            close = np.all(np.abs(reference[idx2] - label2) < OPEN3D_TOLERANCE, axis=1).mean()
+            agree = f"{close * 100:.2f}%"
+            # 近邻距离并列时两边取到的点可能不同，允许极少数点不一致
+            failed |= close < 0.999
+
+        cells = [f"{t * 1000:>10.0f}ms" if t is not None else f"{'-':>12}"
+                 for t in (t_o3d if reference is not None else None, t_full, t_label2)]
+        print(f"{num_points:>10}{idx2.shape[0]:>9}{''.join(cells)}{direction_error:>12.1e}{agree:>12}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
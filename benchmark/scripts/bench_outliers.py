@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.outliers import DEFAULT_NB_NEIGHBORS, DEFAULT_STD_RATIO, outlier_keep_indices, radius_outlier_mask
+from synthetic_scene import make_aqc_scene
+
+
+def timed(func):
+    start = time.perf_counter()
+    value = func()
+    return value, time.perf_counter() - start
+
+
+def with_threads(num_threads, func):
+    """
+    在 thread_budget() 为 num_threads 的条件下调用 func
+    """
+    saved = os.environ.get('OMP_NUM_THREADS')
+    os.environ['OMP_NUM_THREADS'] = str(num_threads)
+    try:
+        return func()
+    finally:
+        if saved is None:
+            os.environ.pop('OMP_NUM_THREADS')
+        else:
+            os.environ['OMP_NUM_THREADS'] = saved
+
+
+def open3d_keep_indices(xyz, method, *params):
+    """
+    原实现：构造 open3d 点云后调用 remove_statistical_outlier / remove_radius_outlier，返回保留点下标；
+    open3d 无法加载时返回 None
+    """
+    try:
+        import open3d as o3d
+    except (ImportError, OSError):
+        return None
+    pcd = o3d.geometry.PointCloud()
+    pcd.points = o3d.utility.Vector3dVector(xyz)
+    _, ind = getattr(pcd, method)(*params)
+    return np.asarray(ind, dtype=np.int64)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离群点滤波：open3d（可加载时）与 common/outliers.py 单线程/多线程的耗时，"
+                                                 "默认参数下保留点的一致性，以及按标签滤波对标签1吊具点的影响")
+    parser.add_argument('--points', type=int, nargs='+', default=[50000, 200000, 1000000])
+    parser.add_argument('--threads', type=int, default=os.cpu_count() or 1, help="多线程查询的线程数")
+    parser.add_argument('--radius', type=float, default=0.5, help="半径滤波的半径")
+    parser.add_argument('--nb_points', type=int, default=5, help="半径滤波的最少点数")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'点数':>10}{'滤波':>8}{'open3d':>10}{'单线程':>10}{f'{args.threads}线程':>10}{'与open3d':>10}"
+          f"{'标签1去除(全帧)':>16}{'标签1去除(分标签)':>18}")
+    for num_points in args.points:
+        xyz, labels = make_aqc_scene(num_points, seed=num_points % 97)
+        xyz = xyz.astype(np.float64)
+        radius_params = {'nb_points': args.nb_points, 'radius': args.radius}
+        cases = [
+            ('统计', lambda: outlier_keep_indices(xyz),
+             ('remove_statistical_outlier', DEFAULT_NB_NEIGHBORS, DEFAULT_STD_RATIO),
+             {1: None}),
+            ('半径', lambda: np.flatnonzero(radius_outlier_mask(xyz, args.nb_points, args.radius)),
+             ('remove_radius_outlier', args.nb_points, args.radius),
+             {0: radius_params, 1: None, 2: radius_params}),
+        ]
+        for name, native, o3d_args, label_params in cases:
+            single, t_single = timed(lambda: with_threads(1, native))
+            multi, t_multi = timed(lambda: with_threads(args.threads, native))
+            reference, t_o3d = timed(lambda: open3d_keep_indices(xyz, *o3d_args))
+            if not np.array_equal(single, multi):
+                print(f"❌ {num_points} {name}：单线程与多线程结果不同")
+                failed = True
+            agree = '-'
+            if reference is not None:
+                mismatched = np.setxor1d(reference, single).shape[0]
+                agree = str(mismatched)
+                failed |= mismatched > 0
+            # 全帧滤波与按标签滤波（标签1不过滤，其余标签用同样的参数在本标签内滤波）去除的标签1点数
+            by_label = outlier_keep_indices(xyz, labels, label_params)
+            removed_global = np.count_nonzero(labels == 1) - np.count_nonzero(labels[single] == 1)
+            removed_by_label = np.count_nonzero(labels == 1) - np.count_nonzero(labels[by_label] == 1)
+            o3d_cell = f"{t_o3d * 1000:>8.0f}ms" if reference is not None else f"{'-':>10}"
+            print(f"{num_points:>10}{name:>8}{o3d_cell}{t_single * 1000:>8.0f}ms{t_multi * 1000:>8.0f}ms{agree:>10}"
+                  f"{removed_global:>16}{removed_by_label:>18}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.pcd_io import read_pcd_points, write_pcd_points
+
+PCD_HEADER = """# .PCD v0.7 - Point Cloud Data file format
+VERSION 0.7
+FIELDS x y z intensity
+SIZE 4 4 4 4
+TYPE F F F I
+COUNT 1 1 1 1
+WIDTH {n}
+HEIGHT 1
+VIEWPOINT 0 0 0 1 0 0 0
+POINTS {n}
+DATA ascii
+"""
+
+def legacy_read_pcd_ascii(file_path):
+    """原 improve*.py 中逐行解析的实现，作为对照"""
+    with open(file_path, 'r') as f:
+        lines = f.readlines()
+    for i, line in enumerate(lines):
+        if line.strip().startswith('DATA'):
+            data_start = i + 1
+            break
+    header = lines[:data_start]
+    data = []
+    for line in lines[data_start:]:
+        if line.strip() == '':
+            continue
+        vals = line.strip().split()
+        if len(vals) == 4:
+            data.append([float(vals[0]), float(vals[1]), float(vals[2]), int(vals[3])])
+    points = np.array(data)
+    return header, points
+
+def legacy_write_pcd_ascii(file_path, header, points):
+    """原 improve*.py 中逐点 f.write 的实现，作为对照"""
+    with open(file_path, 'w') as f:
+        for line in header:
+            if line.startswith('POINTS'):
+                f.write(f'POINTS {points.shape[0]}\n')
+            elif line.startswith('WIDTH'):
+                f.write(f'WIDTH {points.shape[0]}\n')
+            else:
+                f.write(line)
+        for pt in points:
+            f.write(f"{pt[0]:.6f} {pt[1]:.6f} {pt[2]:.6f} {int(pt[3])}\n")
+
+def write_synthetic_ascii_pcd(file_path, num_points, seed=0):
+    rng = np.random.default_rng(seed)
+    xyz = rng.uniform([-20, -12, 5], [20, 12, 60], size=(num_points, 3))
+    labels = rng.integers(0, 3, size=num_points)
+    with open(file_path, 'w') as f:
+        f.write(PCD_HEADER.format(n=num_points))
+        np.savetxt(f, np.column_stack([xyz, labels]), fmt="%.6f %.6f %.6f %d")
+
+def time_per_frame(func, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="PCD 读写性能对比")
+    parser.add_argument('--points', type=int, nargs='+', default=[10000, 100000, 300000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for num_points in args.points:
+            file_path = os.path.join(tmp_dir, f"synthetic_{num_points}.pcd")
+            write_synthetic_ascii_pcd(file_path, num_points)
+
+            _, old_points = legacy_read_pcd_ascii(file_path)
+            _, new_points = read_pcd_points(file_path)
+            assert np.allclose(old_points, new_points), "新旧读取结果不一致"
+
+            t_old = time_per_frame(legacy_read_pcd_ascii, file_path, repeat=args.repeat)
+            t_new = time_per_frame(read_pcd_points, file_path, repeat=args.repeat)
+            print(f"{num_points:>8} 点: 逐行解析 {t_old * 1000:8.1f} ms/帧 | "
+                  f"向量化读取 {t_new * 1000:8.1f} ms/帧 | 加速 {t_old / t_new:5.1f}x")
+
+            header, points = read_pcd_points(file_path)
+            old_path = os.path.join(tmp_dir, "legacy_out.pcd")
+            new_path = os.path.join(tmp_dir, "bulk_out.pcd")
+            t_old = time_per_frame(legacy_write_pcd_ascii, old_path, header['lines'], points, repeat=args.repeat)
+            t_new = time_per_frame(write_pcd_points, new_path, points, header, repeat=args.repeat)
+            print(f"{num_points:>8} 点: 逐点写入 {t_old * 1000:8.1f} ms/帧 | "
+                  f"批量写入   {t_new * 1000:8.1f} ms/帧 | 加速 {t_old / t_new:5.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'process_data', 'scripts'))
+from common.spatial import FrameIndex
+from synthetic_scene import make_aqc_scene
+import scan
+
+
+def timed(func):
+    start = time.perf_counter()
+    value = func()
+    return value, time.perf_counter() - start
+
+
+def make_frame(num_points, duplicate_ratio, seed):
+    """
+    合成场景（float32，与 .bin 相同），随机把 duplicate_ratio 比例的点改成其他点的副本，部分坐标取 -0.0
+    """
+    xyz, _ = make_aqc_scene(num_points, seed=seed)
+    rng = np.random.default_rng(seed)
+    num_duplicates = int(num_points * duplicate_ratio)
+    xyz[rng.choice(num_points, num_duplicates)] = xyz[rng.choice(num_points, num_duplicates)]
+    xyz[:2] = 0.0
+    xyz[1, 0] = -0.0
+    return xyz
+
+
+def sorted_duplicates(xyz):
+    """
+    原实现：np.unique(axis=0) 对整帧按行排序，首次出现之外的点为重复点
+    """
+    _, first = np.unique(xyz, axis=0, return_index=True)
+    return np.setdiff1d(np.arange(xyz.shape[0]), first)
+
+
+def plain_isolated(xyz):
+    """
+    原实现：按输入顺序一次批量 k=2 查询
+    """
+    dist, _ = FrameIndex(xyz).knn(xyz, 2)
+    return np.flatnonzero(dist[:, 1] > scan.ISOLATION_DISTANCE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="scan.py 单帧检查：np.unique 按行排序与哈希查重、输入顺序与叶节点顺序的孤立点查询的耗时和一致性")
+    parser.add_argument('--points', type=int, nargs='+', default=[120000, 500000, 2000000])
+    parser.add_argument('--duplicate_ratio', type=float, default=0.01)
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'点数':>10}{'重复点':>8}{'按行排序':>10}{'哈希查重':>10}{'孤立点':>8}{'输入顺序':>10}{'叶节点顺序':>12}{'结果不同':>10}")
+    for num_points in args.points:
+        xyz = make_frame(num_points, args.duplicate_ratio, num_points % 97)
+        expected_dup, t_sorted = timed(lambda: sorted_duplicates(xyz))
+        dup, t_hashed = timed(lambda: scan.duplicate_indices(xyz))
+        expected_iso, t_plain = timed(lambda: plain_isolated(xyz))
+        iso, t_leaf = timed(lambda: scan.isolated_indices(xyz))
+        mismatched = int(not np.array_equal(expected_dup, dup)) + int(not np.array_equal(expected_iso, iso))
+        failed |= mismatched > 0
+        print(f"{num_points:>10}{dup.shape[0]:>8}{t_sorted * 1000:>8.0f}ms{t_hashed * 1000:>8.0f}ms{iso.shape[0]:>8}"
+              f"{t_plain * 1000:>8.0f}ms{t_leaf * 1000:>10.0f}ms{mismatched:>10}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.kitti_index import indexed_frames
+from common.kitti_shards import ShardedSequence, pack_sequence, unpack_sequence
+from synthetic_scene import make_aqc_scene, write_scene_kitti
+
+
+def loose_epoch(frames):
+    """
+    原布局：每帧分别读取 .bin 和 .label 两个小文件
+    """
+    total = 0
+    for _, bin_path, label_path, _ in frames:
+        xyz = np.fromfile(bin_path, dtype=np.float32).reshape(-1, 3)
+        labels = np.fromfile(label_path, dtype=np.uint32)
+        total += int(labels.sum()) + xyz.shape[0]
+    return total
+
+
+def packed_epoch(pack_dir):
+    """
+    打包布局：打开偏移表后按帧取分片上的视图（同样读到每个点）
+    """
+    sequence = ShardedSequence(pack_dir)
+    total = 0
+    for i in range(len(sequence)):
+        xyz, labels = sequence.frame(i)
+        total += int(labels.sum()) + np.ascontiguousarray(xyz).shape[0]
+    return total
+
+
+def same_tree(dir_a, dir_b):
+    """
+    两个序列目录中 velodyne / labels 下的文件名和内容是否完全相同
+    """
+    for sub in ('velodyne', 'labels'):
+        names = sorted(os.listdir(os.path.join(dir_a, sub)))
+        if names != sorted(os.listdir(os.path.join(dir_b, sub))):
+            return False
+        for name in names:
+            with open(os.path.join(dir_a, sub, name), 'rb') as fa, open(os.path.join(dir_b, sub, name), 'rb') as fb:
+                if fa.read() != fb.read():
+                    return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SemanticKITTI 序列：逐帧小文件与打包分片（common/kitti_shards.py）的整轮读取耗时，"
+                                                 "打包后逐帧数据与还原后逐字节一致性检查")
+    parser.add_argument('--frames', type=int, default=500)
+    parser.add_argument('--points', type=int, default=20000, help="每帧点数")
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--shard_mb', type=int, default=64)
+    parser.add_argument('--work_dir', default=None, help="生成数据的目录（放在网络存储上可测真实的小文件开销），默认临时目录")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(dir=args.work_dir)
+    failed = False
+    try:
+        seq_dir = os.path.join(work_dir, 'sequences', '00')
+        os.makedirs(os.path.join(seq_dir, 'velodyne'))
+        os.makedirs(os.path.join(seq_dir, 'labels'))
+        xyz, labels = make_aqc_scene(args.points)
+        rng = np.random.default_rng(0)
+        for i in range(args.frames):
+            # 同一场景加小扰动，帧间点数略有不同
+            keep = rng.random(args.points) > 0.05
+            write_scene_kitti(os.path.join(seq_dir, 'velodyne', f"{i:06d}.bin"),
+                              os.path.join(seq_dir, 'labels', f"{i:06d}.label"), xyz[keep], labels[keep])
+        frames = indexed_frames(seq_dir)
+
+        pack_dir = os.path.join(work_dir, 'packed', '00')
+        start = time.perf_counter()
+        table = pack_sequence(seq_dir, pack_dir, args.shard_mb << 20)
+        t_pack = time.perf_counter() - start
+        print(f"{len(frames)} 帧、每帧约 {args.points} 点：打包为 {len(table['shards'])} 个分片，耗时 {t_pack:.2f} s")
+
+        # 逐帧核对打包后的视图
+        sequence = ShardedSequence(pack_dir)
+        for i, (name, bin_path, label_path, _) in enumerate(frames):
+            xyz_p, labels_p = sequence.frame(name)
+            if not (np.array_equal(xyz_p, np.fromfile(bin_path, dtype=np.float32).reshape(-1, 3))
+                    and np.array_equal(labels_p, np.fromfile(label_path, dtype=np.uint32))):
+                print(f"❌ 帧 {name} 打包后的数据与原文件不同")
+                failed = True
+
+        print(f"{'轮次':>6}{'逐帧文件':>12}{'打包分片':>12}{'加速':>8}")
+        for epoch in range(args.epochs):
+            start = time.perf_counter()
+            expected = loose_epoch(frames)
+            t_loose = time.perf_counter() - start
+            start = time.perf_counter()
+            got = packed_epoch(pack_dir)
+            t_packed = time.perf_counter() - start
+            failed |= expected != got
+            print(f"{epoch:>6}{t_loose * 1000:>10.0f}ms{t_packed * 1000:>10.0f}ms{t_loose / t_packed:>7.1f}x")
+
+        restored = os.path.join(work_dir, 'restored', '00')
+        unpack_sequence(pack_dir, restored)
+        if not same_tree(seq_dir, restored):
+            print("❌ 还原后的文件与原文件不同")
+            failed = True
+        else:
+            print("还原后的 velodyne / labels 与原文件逐字节相同")
+    finally:
+        shutil.rmtree(work_dir)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
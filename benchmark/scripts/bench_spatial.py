@@ -0,0 +1,67 @@
+import io
+import os
+import sys
+import time
+import argparse
+import contextlib
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'process_data', 'scripts'))
+from common.spatial import FrameIndex
+from common.outliers import statistical_outlier_mask
+from synthetic_scene import make_aqc_scene
+import DBSCAN as dbscan_stage
+import improve2
+import scan
+
+
+def consumers(xyz, labels, make_index):
+    """
+    同一帧上的各个近邻查询步骤，make_index() 给出每一步使用的 FrameIndex；返回 (各步结果, 总耗时, 建树棵数)
+    """
+    indexes = []
+
+    def index():
+        indexes.append(make_index())
+        return indexes[-1]
+
+    points = np.column_stack([xyz, labels]).astype(np.float64)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        values = [
+            statistical_outlier_mask(xyz, index=index()),
+            index().knn(xyz, 2)[0][:, 1] > scan.ISOLATION_DISTANCE,
+            dbscan_stage.largest_label1_cluster_mask(xyz, labels, 2, 5, index=index())[0],
+            improve2.filter_label2_by_normal_cluster(points, cos_threshold=0.8, dbscan_eps=0.5,
+                                                     dbscan_min_samples=3, index=index())[0][:, 3],
+        ]
+    seconds = time.perf_counter() - start
+    return values, seconds, sum(ix.num_built for ix in set(indexes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="同一帧的统计滤波、孤立点检查、标签1聚类、标签2法向细化：各自建树与共用 FrameIndex 的耗时和一致性")
+    parser.add_argument('--points', type=int, nargs='+', default=[50000, 200000, 500000])
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'点数':>10}{'各自建树':>12}{'棵数':>6}{'共用索引':>12}{'棵数':>6}{'结果不同':>10}")
+    for num_points in args.points:
+        xyz, labels = make_aqc_scene(num_points, seed=num_points % 97)
+        xyz = xyz.astype(np.float64)
+        separate, t_separate, n_separate = consumers(xyz, labels, lambda: FrameIndex(xyz, labels))
+        shared_index = FrameIndex(xyz, labels)
+        shared, t_shared, n_shared = consumers(xyz, labels, lambda: shared_index)
+        mismatched = sum(not np.array_equal(a, b) for a, b in zip(separate, shared))
+        failed |= mismatched > 0
+        print(f"{num_points:>10}{t_separate * 1000:>10.0f}ms{n_separate:>6}{t_shared * 1000:>10.0f}ms{n_shared:>6}"
+              f"{mismatched:>10}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
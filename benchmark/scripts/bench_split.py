@@ -0,0 +1,127 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.splits import assign_splits, load_split_manifest, materialize_splits, source_frames, split_sizes
+from synthetic_scene import make_aqc_scene, write_scene_kitti
+
+SPLIT_COUNTS = {"01": 100, "02": 100, "00": None}
+
+
+def copy_splits(frames, assignment, out_root):
+    """
+    原做法：每个划分把帧逐个拷贝一份
+    """
+    for split, names in assignment.items():
+        for sub, ext, column in (('velodyne', '.bin', 0), ('labels', '.label', 1)):
+            out_dir = os.path.join(out_root, 'sequences', split, sub)
+            os.makedirs(out_dir, exist_ok=True)
+            for name in names:
+                shutil.copyfile(frames[name][column], os.path.join(out_dir, name + ext))
+
+
+def check_splits(frames, assignment, out_root, linked):
+    """
+    out_root/sequences 下每个划分的文件名与分配一致，且内容与来源相同（链接时为同一文件），返回不一致的描述
+    """
+    problems = []
+    for split, names in assignment.items():
+        for sub, ext, column in (('velodyne', '.bin', 0), ('labels', '.label', 1)):
+            out_dir = os.path.join(out_root, 'sequences', split, sub)
+            found = sorted(f for f in os.listdir(out_dir) if f.endswith(ext))
+            if found != sorted(name + ext for name in names):
+                problems.append(f"{split}/{sub} 的文件与分配不符")
+                continue
+            for name in names:
+                src, dst = frames[name][column], os.path.join(out_dir, name + ext)
+                if linked:
+                    same = os.path.samefile(src, dst)
+                else:
+                    with open(src, 'rb') as fa, open(dst, 'rb') as fb:
+                        same = fa.read() == fb.read()
+                if not same:
+                    problems.append(f"{split}/{sub}/{name}{ext} 与来源不同")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="训练/验证/测试划分：逐帧拷贝与硬链接、符号链接（common/splits.py）的耗时，"
+                                                 "换种子重新划分的耗时，划分结果一致性检查")
+    parser.add_argument('--frames', type=int, default=900)
+    parser.add_argument('--points', type=int, default=100000, help="每帧点数")
+    parser.add_argument('--seed', type=int, default=2023)
+    parser.add_argument('--work_dir', default=None, help="生成数据的目录，默认临时目录")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(dir=args.work_dir)
+    failed = False
+    try:
+        pool = os.path.join(work_dir, 'frames')
+        os.makedirs(os.path.join(pool, 'velodyne'))
+        os.makedirs(os.path.join(pool, 'labels'))
+        xyz, labels = make_aqc_scene(args.points)
+        rng = np.random.default_rng(0)
+        for i in range(args.frames):
+            keep = rng.random(args.points) > 0.05
+            write_scene_kitti(os.path.join(pool, 'velodyne', f"{i:06d}.bin"),
+                              os.path.join(pool, 'labels', f"{i:06d}.label"), xyz[keep], labels[keep])
+        frames = source_frames([pool])
+        source_stats = {p: os.stat(p).st_mtime_ns for pair in frames.values() for p in pair}
+        assignment = assign_splits(frames, split_sizes(len(frames), counts=SPLIT_COUNTS), args.seed)
+        print(f"{len(frames)} 帧、每帧约 {args.points} 点，划分 "
+              + " / ".join(f"{split}:{len(names)}" for split, names in assignment.items()))
+
+        print(f"{'方式':>10}{'耗时':>10}")
+        start = time.perf_counter()
+        copy_splits(frames, assignment, os.path.join(work_dir, 'copy'))
+        t_copy = time.perf_counter() - start
+        print(f"{'copy':>10}{t_copy * 1000:>8.0f}ms")
+        for problem in check_splits(frames, assignment, os.path.join(work_dir, 'copy'), False):
+            print(f"❌ copy：{problem}")
+            failed = True
+
+        for mode in ('hardlink', 'symlink', 'manifest'):
+            out_root = os.path.join(work_dir, mode)
+            start = time.perf_counter()
+            materialize_splits(frames, assignment, out_root, mode, {'seed': args.seed})
+            elapsed = time.perf_counter() - start
+            print(f"{mode:>10}{elapsed * 1000:>8.0f}ms{t_copy / elapsed:>7.1f}x")
+            if load_split_manifest(out_root) != assignment:
+                print(f"❌ {mode}：划分清单与分配不符")
+                failed = True
+            if mode != 'manifest':
+                for problem in check_splits(frames, assignment, out_root, True):
+                    print(f"❌ {mode}：{problem}")
+                    failed = True
+
+        # 换种子在已有的硬链接划分上重新划分，只增删有变化的链接
+        out_root = os.path.join(work_dir, 'hardlink')
+        resplit = assign_splits(frames, split_sizes(len(frames), counts=SPLIT_COUNTS), args.seed + 1)
+        start = time.perf_counter()
+        created, removed = materialize_splits(frames, resplit, out_root, 'hardlink', {'seed': args.seed + 1})
+        elapsed = time.perf_counter() - start
+        print(f"换种子重新划分（hardlink）：新建 {created} 个、删除 {removed} 个链接，耗时 {elapsed * 1000:.0f} ms")
+        for problem in check_splits(frames, resplit, out_root, True):
+            print(f"❌ 重新划分：{problem}")
+            failed = True
+        if created != removed:
+            print("❌ 重新划分新建与删除的链接数不同")
+            failed = True
+
+        if any(os.stat(p).st_mtime_ns != mtime for p, mtime in source_stats.items()):
+            print("❌ 来源文件被改写")
+            failed = True
+    finally:
+        shutil.rmtree(work_dir)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.profiling import load_profile, summarize_profile, print_profile_summary
+
+def main():
+    parser = argparse.ArgumentParser(description="汇总各脚本 --profile 写出的 JSONL：每个步骤的 p50/p95 耗时、RSS 增量与进程峰值内存")
+    parser.add_argument('jsonl')
+    parser.add_argument('--run', default='last', help="运行 ID，默认最后一次运行，all 为全部记录")
+    args = parser.parse_args()
+
+    records = load_profile(args.jsonl, None if args.run == 'all' else args.run)
+    if not records:
+        print("没有匹配的记录")
+        return
+    runs = sorted({r['run'] for r in records})
+    print(f"运行: {', '.join(runs)}，共 {len({(r['run'], r['frame']) for r in records})} 帧")
+    print_profile_summary(summarize_profile(records))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import os
+import sys
+import argparse
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.pcd_io import PCD_DATA_FORMATS, write_pcd_xyz_label
+
+# 场景范围参考 process_data/range.txt（相机坐标系：x 横向，y 竖直向下，z 为深度）
+SCENE_MIN = np.array([-17.0, -11.0, 9.0])
+SCENE_MAX = np.array([17.0, 9.0, 57.0])
+GROUND_Y = 8.0
+
+# 各类点所占比例（其余为标签0）
+SPREADER_RATIO = 0.15
+RAIL_RATIO = 0.10
+
+
+def _box_surface(rng, n, center, size):
+    """
+    在长方体表面上均匀采样 n 个点
+    """
+    center, size = np.asarray(center, dtype=np.float64), np.asarray(size, dtype=np.float64)
+    pts = rng.uniform(-0.5, 0.5, size=(n, 3)) * size
+    axis = rng.integers(0, 3, size=n)
+    side = rng.choice([-0.5, 0.5], size=n)
+    pts[np.arange(n), axis] = side * size[axis]
+    return pts + center
+
+
+def make_aqc_scene(num_points, seed=0, noise_ratio=0.02, num_rails=4, nan_ratio=0.0):
+    """
+    生成与岸桥场景形状相近的点云，返回 (xyz float32 (N, 3), 标签 int32 (N,))：
+    标签0为地面和集装箱，标签1为吊具（一个致密的长方体簇加少量分散碎片），
+    标签2为沿深度方向的轨道（细长直线簇，另有少量法向不一致的杂点），
+    noise_ratio 为场景范围内随机标签的噪声点比例（含少量远处离群点），nan_ratio 为坐标为 NaN 的点比例
+    """
+    rng = np.random.default_rng(seed)
+    n_noise = int(num_points * noise_ratio)
+    n_spreader = int(num_points * SPREADER_RATIO)
+    n_rail = int(num_points * RAIL_RATIO)
+    n_background = num_points - n_noise - n_spreader - n_rail
+
+    # 标签0：地面 + 若干集装箱
+    n_ground = n_background // 2
+    ground = np.column_stack([rng.uniform(SCENE_MIN[0], SCENE_MAX[0], n_ground),
+                              GROUND_Y + rng.normal(0, 0.05, n_ground),
+                              rng.uniform(SCENE_MIN[2], SCENE_MAX[2], n_ground)])
+    n_box = n_background - n_ground
+    num_containers = 6
+    sizes = np.full(num_containers, n_box // num_containers)
+    sizes[:n_box - sizes.sum()] += 1
+    containers = [_box_surface(rng, n, [rng.uniform(-14, 14), GROUND_Y - 1.3, rng.uniform(15, 55)], [2.4, 2.6, 12.0])
+                  for n in sizes]
+    background = np.vstack([ground] + containers)
+
+    # 标签1：吊具，95% 在一个致密长方体上，其余为分散碎片（DBSCAN 只保留最大簇）
+    n_main = int(n_spreader * 0.95)
+    spreader = np.vstack([
+        _box_surface(rng, n_main, [0.0, -3.5, 26.0], [12.0, 0.6, 2.5]),
+        rng.uniform(SCENE_MIN, SCENE_MAX, size=(n_spreader - n_main, 3)),
+    ])
+
+    # 标签2：轨道，沿 z 方向的细长直线，10% 为竖直方向的杂点（法向与轨道不一致）
+    rail_x = np.linspace(-8.0, 8.0, num_rails)
+    rail_id = rng.integers(0, num_rails, n_rail)
+    rail = np.column_stack([rail_x[rail_id] + rng.normal(0, 0.04, n_rail),
+                            GROUND_Y - 0.15 + rng.normal(0, 0.02, n_rail),
+                            rng.uniform(30.0, SCENE_MAX[2], n_rail)])
+    n_clutter = n_rail // 10
+    rail[:n_clutter, 1] = GROUND_Y - rng.uniform(0, 1.5, n_clutter)
+
+    # 噪声：场景内随机点，其中 5% 在场景外很远处（百分位裁剪的对象）
+    noise = rng.uniform(SCENE_MIN, SCENE_MAX, size=(n_noise, 3))
+    n_far = n_noise // 20
+    noise[:n_far] = rng.uniform(SCENE_MIN * 4, SCENE_MAX * 4, size=(n_far, 3))
+
+    noise_labels = rng.integers(0, 3, n_noise)
+    # 远处离群点记为标签0；标签1不参与百分位裁剪，远处的标签1会把边界撑大
+    noise_labels[:n_far] = 0
+
+    xyz = np.vstack([background, spreader, rail, noise]).astype(np.float32)
+    labels = np.concatenate([np.zeros(len(background)), np.ones(n_spreader), np.full(n_rail, 2),
+                             noise_labels]).astype(np.int32)
+
+    # 打乱点序，和实际数据一样标签交错
+    order = rng.permutation(num_points)
+    xyz, labels = xyz[order], labels[order]
+
+    n_nan = int(num_points * nan_ratio)
+    if n_nan:
+        xyz[rng.choice(num_points, n_nan, replace=False), rng.integers(0, 3, n_nan)] = np.nan
+    return xyz, labels
+
+
+def write_scene_pcd(file_path, xyz, labels, data_format='ascii'):
+    write_pcd_xyz_label(file_path, xyz, labels, data_format=data_format)
+
+
+def write_scene_kitti(bin_path, label_path, xyz, labels):
+    """
+    写出 SemanticKITTI 格式：.bin 为 float32 xyz，.label 为 uint32
+    """
+    np.asarray(xyz, dtype=np.float32).tofile(bin_path)
+    np.asarray(labels, dtype=np.uint32).tofile(label_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成岸桥场景的合成点云（PCD 与 KITTI .bin/.label）")
+    parser.add_argument('--out_dir', default="benchmark/data/synthetic")
+    parser.add_argument('--points', type=int, nargs='+', default=[10000, 100000, 500000, 2000000])
+    parser.add_argument('--frames', type=int, default=1, help="每种点数生成的帧数")
+    parser.add_argument('--formats', nargs='+', default=list(PCD_DATA_FORMATS), choices=PCD_DATA_FORMATS)
+    parser.add_argument('--noise_ratio', type=float, default=0.02)
+    parser.add_argument('--nan_ratio', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    for num_points in args.points:
+        for data_format in args.formats:
+            os.makedirs(os.path.join(args.out_dir, f"{num_points}", data_format), exist_ok=True)
+        velo_dir = os.path.join(args.out_dir, f"{num_points}", "velodyne")
+        label_dir = os.path.join(args.out_dir, f"{num_points}", "labels")
+        os.makedirs(velo_dir, exist_ok=True)
+        os.makedirs(label_dir, exist_ok=True)
+
+        for i in range(args.frames):
+            xyz, labels = make_aqc_scene(num_points, args.seed + i, args.noise_ratio, nan_ratio=args.nan_ratio)
+            name = f"{i:06d}"
+            for data_format in args.formats:
+                write_scene_pcd(os.path.join(args.out_dir, f"{num_points}", data_format, f"{name}.pcd"),
+                                xyz, labels, data_format)
+            write_scene_kitti(os.path.join(velo_dir, f"{name}.bin"), os.path.join(label_dir, f"{name}.label"),
+                              xyz, labels)
+        print(f"✅ {num_points} 点 × {args.frames} 帧 已写入 {os.path.join(args.out_dir, str(num_points))}")
+
+
+if __name__ == "__main__":
+    main()
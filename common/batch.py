@@ -0,0 +1,205 @@
+import io
+import os
+import sys
+import time
+import traceback
+import contextlib
+import multiprocessing
+from collections import namedtuple, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from common import pcd_io, profiling
+from common.prefetch import DEFAULT_PREFETCH_DEPTH, FramePrefetcher, AsyncWriter
+
+# BLAS / OpenMP（open3d 使用 OpenMP）读取的线程数环境变量
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'VECLIB_MAXIMUM_THREADS',
+                   'NUMEXPR_NUM_THREADS')
+
+# 单个文件的处理结果；log 为子进程中捕获的 print 输出，profile 为子进程中的计时记录
+TaskResult = namedtuple('TaskResult', ['name', 'ok', 'value', 'error', 'log', 'seconds', 'profile'],
+                        defaults=(None,))
+
+
+def add_batch_arguments(parser):
+    """
+    给脚本的 argparse 加上 --workers / --threads_per_worker
+    """
+    parser.add_argument('--workers', type=int, default=1, help="并行进程数，1 为在当前进程中顺序处理")
+    parser.add_argument('--threads_per_worker', type=int, default=1,
+                        help="每个进程内 BLAS / OpenMP 的线程数上限，避免多进程时线程过量")
+    parser.add_argument('--prefetch', type=int, default=DEFAULT_PREFETCH_DEPTH,
+                        help="顺序处理时后台预读的帧数（同时也是后台写队列长度），0 为关闭")
+    parser.add_argument('--profile', default=None, help="记录每帧各步骤的耗时/内存，追加写入该 JSONL 文件")
+    return parser
+
+
+def limit_threads(num_threads):
+    """
+    限制当前进程内 BLAS / OpenMP 的线程数。环境变量只对之后启动的进程和尚未初始化的库生效，
+    已加载的线程池在装了 threadpoolctl 时一并限制
+    """
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(num_threads)
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return
+    threadpool_limits(num_threads)
+
+
+def thread_budget():
+    """
+    当前进程可用的线程数：run_batch / limit_threads 限制过时取其上限，否则为全部 CPU。
+    给不读取上述环境变量的多线程实现（如 cKDTree 查询的 workers）使用
+    """
+    value = os.environ.get(THREAD_ENV_VARS[0])
+    return max(int(value), 1) if value else (os.cpu_count() or 1)
+
+
+def _init_worker(num_threads, frame_cache, profile_run_id):
+    limit_threads(num_threads)
+    # spawn 出的子进程不继承模块全局状态，解析缓存和计时需要重新设置
+    if frame_cache is not None:
+        pcd_io.set_frame_cache(frame_cache)
+    if profile_run_id is not None:
+        # 子进程只在内存中记录，随结果交给父进程写入
+        profiling.enable_profiling(None, profile_run_id)
+
+
+def _run_task(func, name, args, capture):
+    """
+    执行单个任务并捕获异常，一个文件出错不影响其他文件
+    """
+    log = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(log) if capture else contextlib.nullcontext():
+        try:
+            with profiling.frame(name):
+                value, error = func(*args), None
+        except Exception:
+            value, error = None, traceback.format_exc()
+    recorder = profiling.get_recorder()
+    profile = recorder.take() if capture and recorder is not None else None
+    return TaskResult(name, error is None, value, error, log.getvalue(), time.perf_counter() - start, profile)
+
+
+def _echo(result):
+    if result.log:
+        sys.stdout.write(result.log)
+    if not result.ok:
+        print(f"❌ {result.name} 处理失败：\n{result.error}")
+
+
+def _run_overlapped(func, tasks, inputs, depth, on_result):
+    """
+    顺序处理，但后台线程预读接下来 depth 个任务的输入 PCD，输出交给后台写队列，读写与计算重叠。
+    一个任务的写入全部落盘后才打印其结果并调用 on_result（清单记录的是已写完的输出）
+    """
+    saved_cache = pcd_io._frame_cache
+    prefetcher = FramePrefetcher(depth, inner=saved_cache)
+    writer = AsyncWriter(depth)
+    pcd_io.set_frame_cache(prefetcher)
+    pcd_io.set_async_writer(writer)
+    results, waiting = [], deque()
+
+    def finish(result, writes):
+        for future in writes:
+            try:
+                future.result()
+            except Exception:
+                if result.ok:
+                    result = result._replace(ok=False, value=None, error=traceback.format_exc())
+        _echo(result)
+        if on_result is not None:
+            on_result(result)
+        results.append(result)
+
+    try:
+        for i, (name, args) in enumerate(tasks):
+            prefetcher.schedule([p for paths in inputs[i:i + 1 + depth] for p in paths if p.endswith('.pcd')])
+            result = _run_task(func, name, args, capture=False)
+            waiting.append((result, writer.take_submitted()))
+            while waiting and all(future.done() for future in waiting[0][1]):
+                finish(*waiting.popleft())
+        while waiting:
+            finish(*waiting.popleft())
+    finally:
+        pcd_io.set_frame_cache(saved_cache)
+        pcd_io.set_async_writer(None)
+        prefetcher.close()
+        writer.close()
+    return results
+
+
+def run_batch(func, tasks, workers=1, threads_per_worker=1, on_result=None, inputs=None,
+              prefetch=DEFAULT_PREFETCH_DEPTH):
+    """
+    对 tasks 中的每个 (名称, 参数元组) 调用 func(*参数)，返回与 tasks 同序的 TaskResult 列表。
+    workers > 1 时使用 spawn 进程池；子进程的输出先捕获，再按任务顺序打印，不会交错。
+    func 必须是模块顶层函数（可被 pickle）。on_result 不为空时按任务顺序对每个结果调用一次。
+    顺序处理且给出 inputs（与 tasks 对应的输入路径列表）时，按 prefetch 预读输入、后台写出
+    """
+    tasks = list(tasks)
+    if (workers <= 1 or len(tasks) <= 1) and inputs is not None and prefetch > 0:
+        return _run_overlapped(func, tasks, list(inputs), prefetch, on_result)
+    if workers <= 1 or len(tasks) <= 1:
+        results = []
+        for name, args in tasks:
+            result = _run_task(func, name, args, capture=False)
+            _echo(result)
+            if on_result is not None:
+                on_result(result)
+            results.append(result)
+        return results
+
+    # 子进程启动时读取环境变量，先在父进程中设置，进程池建好后恢复
+    saved_env = {name: os.environ.get(name) for name in THREAD_ENV_VARS}
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads_per_worker)
+    recorder = profiling.get_recorder()
+    results = []
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)),
+                                 mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker,
+                                 initargs=(threads_per_worker, pcd_io._frame_cache,
+                                           recorder.run_id if recorder is not None else None)) as executor:
+            futures = [(name, executor.submit(_run_task, func, name, args, True)) for name, args in tasks]
+            for name, future in futures:
+                try:
+                    result = future.result()
+                except Exception:
+                    # 子进程崩溃或参数无法 pickle
+                    result = TaskResult(name, False, None, traceback.format_exc(), '', 0.0)
+                if recorder is not None and result.profile:
+                    recorder.flush(result.profile)
+                _echo(result)
+                if on_result is not None:
+                    on_result(result)
+                results.append(result)
+    finally:
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+    return results
+
+
+def report_batch(results):
+    """
+    打印成功/失败汇总，返回失败的结果列表
+    """
+    failed = [r for r in results if not r.ok]
+    total_seconds = sum(r.seconds for r in results)
+    print(f"共 {len(results)} 个文件，成功 {len(results) - len(failed)} 个，失败 {len(failed)} 个，"
+          f"累计处理耗时 {total_seconds:.1f} s")
+    for r in failed:
+        print(f" - {r.name}: {r.error.strip().splitlines()[-1]}")
+    recorder = profiling.get_recorder()
+    if recorder is not None and recorder.path is not None:
+        recorder.flush()
+        print(f"各步骤耗时（本次运行 {recorder.run_id}，明细见 {recorder.path}）：")
+        profiling.print_profile_summary(profiling.summarize_profile(
+            profiling.load_profile(recorder.path, recorder.run_id)))
+    return failed
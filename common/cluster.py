@@ -0,0 +1,260 @@
+import numpy as np
+from scipy.spatial import cKDTree
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+# sklearn：通用 DBSCAN；exact：网格 + 并查集，结果与 DBSCAN 的核心点/边界点规则一致；voxel：体素连通近似
+CLUSTER_METHODS = ('sklearn', 'exact', 'voxel')
+
+# 两个格子间精确判断连通时，点对数超过该值改用 KD 树
+_PAIRWISE_LIMIT = 1 << 16
+# 精确模式的格子边长为 eps/√d（d 为坐标维数，格内任意两点距离不超过 eps），略微缩小以吸收浮点误差
+_EXACT_CELL_SHRINK = 1 - 1e-6
+
+
+def _grid(xyz, cell_size, pad):
+    """
+    把点分到边长为 cell_size 的格子，返回 (按格子排序的点下标, 各格的键, 各格在排序后的起始位置, 各格点数, 键编码函数)。
+    键为各维格子坐标编码成的 int64，pad 为允许的最大偏移（邻格的键不会越界）
+    """
+    cells = np.floor((xyz - xyz.min(axis=0)) / cell_size).astype(np.int64) + pad
+    dims = cells.max(axis=0) + 1 + pad
+
+    def encode(c):
+        key = c[..., 0]
+        for axis in range(1, dims.shape[0]):
+            key = key * dims[axis] + c[..., axis]
+        return key
+
+    keys = encode(cells)
+    order = np.argsort(keys, kind='stable')
+    cell_keys, starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+    return order, cell_keys, starts, counts, encode
+
+
+def _neighbor_offsets(reach, half=True, ndim=3):
+    """
+    [-reach, reach]^ndim 内除自身以外的偏移；half 时只取字典序为正的一半（每对格子只出现一次）
+    """
+    r = np.arange(-reach, reach + 1)
+    offsets = np.stack(np.meshgrid(*[r] * ndim, indexing='ij'), axis=-1).reshape(-1, ndim)
+    offsets = offsets[np.any(offsets != 0, axis=1)]
+    if half:
+        first = np.argmax(offsets != 0, axis=1)
+        offsets = offsets[offsets[np.arange(offsets.shape[0]), first] > 0]
+    return offsets
+
+
+def _cell_pairs(cell_keys, encode, offsets):
+    """
+    所有相邻（按 offsets）且都非空的格子对，返回两列格子下标
+    """
+    rows, cols = [], []
+    zero = encode(np.zeros(offsets.shape[1], dtype=np.int64))
+    for offset in offsets:
+        shifted = cell_keys + (encode(offset) - zero)
+        pos = np.searchsorted(cell_keys, shifted)
+        pos_clipped = np.minimum(pos, cell_keys.shape[0] - 1)
+        hit = (pos < cell_keys.shape[0]) & (cell_keys[pos_clipped] == shifted)
+        rows.append(np.flatnonzero(hit))
+        cols.append(pos_clipped[hit])
+    return np.concatenate(rows), np.concatenate(cols)
+
+
+def _squared_distances(data, rows, cols):
+    return ((data[rows] - data[cols]) ** 2).sum(axis=1)
+
+
+def dbscan_core_mask(xyz, eps, min_samples, tree=None):
+    """
+    DBSCAN 的核心点：eps 邻域内（含自身）至少 min_samples 个点。
+    所在格子（边长 eps/√d）已有 min_samples 个点的直接判为核心，其余用 KD 树查第 min_samples 近邻，工作量有上界。
+    tree 为 xyz 上已建好的 cKDTree 时直接使用
+    """
+    xyz = np.asarray(xyz, dtype=np.float64)
+    n = xyz.shape[0]
+    core = np.zeros(n, dtype=bool)
+    if n == 0:
+        return core
+    order, _, starts, counts, _ = _grid(xyz, eps / np.sqrt(xyz.shape[1]) * _EXACT_CELL_SHRINK, 0)
+    dense = np.repeat(counts >= min_samples, counts)
+    core[order[dense]] = True
+    sparse = order[~dense]
+    if sparse.shape[0] and min_samples <= n:
+        if tree is None:
+            tree = cKDTree(xyz)
+        _, idx = tree.query(xyz[sparse], k=min_samples, distance_upper_bound=np.nextafter(eps, np.inf))
+        kth = idx.reshape(sparse.shape[0], -1)[:, -1]
+        found = kth < n
+        # 与 sklearn 一样比较平方距离：开方后恰好等于 eps 的距离，平方可能略大于 eps²
+        core[sparse[found]] = _squared_distances(tree.data, sparse[found], kth[found]) <= eps * eps
+    return core
+
+
+def _cells_touch(a, b, eps):
+    """
+    两组点中是否存在距离不超过 eps 的点对；先各自去掉离对方包围盒超过 eps 的点
+    """
+    a = a[np.all((a >= b.min(axis=0) - eps) & (a <= b.max(axis=0) + eps), axis=1)]
+    if a.shape[0] == 0:
+        return False
+    b = b[np.all((b >= a.min(axis=0) - eps) & (b <= a.max(axis=0) + eps), axis=1)]
+    if b.shape[0] == 0:
+        return False
+    if a.shape[0] * b.shape[0] <= _PAIRWISE_LIMIT:
+        d2 = ((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=-1)
+        return bool(d2.min() <= eps * eps)
+    tree = cKDTree(b)
+    _, idx = tree.query(a, k=1, distance_upper_bound=np.nextafter(eps, np.inf))
+    found = idx < b.shape[0]
+    return bool(np.any(((a[found] - tree.data[idx[found]]) ** 2).sum(axis=1) <= eps * eps))
+
+
+def _core_components(core_xyz, eps):
+    """
+    核心点的连通分量（距离不超过 eps 的核心点相连）。同一格子内必然相连；相邻格子先按包围盒的最近/最远距离
+    批量判定，只有无法判定且尚未连通的格子对才逐对计算点间距离。返回每个核心点的分量编号
+    """
+    ndim = core_xyz.shape[1]
+    order, cell_keys, starts, counts, encode = _grid(core_xyz, eps / np.sqrt(ndim) * _EXACT_CELL_SHRINK, 2)
+    num_cells = cell_keys.shape[0]
+    pts = core_xyz[order]
+    box_min = np.minimum.reduceat(pts, starts, axis=0)
+    box_max = np.maximum.reduceat(pts, starts, axis=0)
+
+    rows, cols = _cell_pairs(cell_keys, encode, _neighbor_offsets(2, ndim=ndim))
+    gap = np.maximum(np.maximum(box_min[cols] - box_max[rows], box_min[rows] - box_max[cols]), 0)
+    far = np.maximum(np.abs(box_max[cols] - box_min[rows]), np.abs(box_max[rows] - box_min[cols]))
+    near_ok = (gap ** 2).sum(axis=1) <= eps * eps
+    all_ok = (far ** 2).sum(axis=1) <= eps * eps
+    sure = near_ok & all_ok
+    graph = coo_matrix((np.ones(np.count_nonzero(sure), dtype=np.int8), (rows[sure], cols[sure])),
+                       shape=(num_cells, num_cells))
+    _, comp = connected_components(graph, directed=False)
+
+    # 无法批量判定的格子对：并查集跳过已经连通的，其余逐对精确判断
+    parent = list(range(comp.max() + 1 if num_cells else 0))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    ends = starts + counts
+    for a, b in zip(rows[near_ok & ~all_ok], cols[near_ok & ~all_ok]):
+        ra, rb = find(comp[a]), find(comp[b])
+        if ra != rb and _cells_touch(pts[starts[a]:ends[a]], pts[starts[b]:ends[b]], eps):
+            parent[rb] = ra
+    cell_comp = np.array([find(c) for c in comp], dtype=np.int64)
+
+    labels = np.empty(core_xyz.shape[0], dtype=np.int64)
+    labels[order] = np.repeat(cell_comp, counts)
+    return labels
+
+
+def eps_neighbor_counts(xyz, eps, tree=None):
+    """
+    每个点 eps 邻域内（含自身）的点数。同一 eps 下换 min_samples 时把它交给 dbscan_labels_exact，
+    核心点只需重新比较计数，不再查询邻域（参数扫描用）
+    """
+    xyz = np.asarray(xyz, dtype=np.float64)
+    if tree is None:
+        tree = cKDTree(xyz)
+    return tree.query_ball_point(xyz, eps, return_length=True)
+
+
+def dbscan_labels_exact(xyz, eps, min_samples, tree=None, neighbor_counts=None):
+    """
+    与 sklearn DBSCAN 相同的聚类结果（簇编号也相同）：核心点按连通分量成簇，簇按其下标最小的核心点排序编号；
+    边界点归入能到达它的簇中编号最小的一个（DBSCAN 按下标顺序扩展簇，先扩展的簇先占据边界点）。噪声为 -1。
+    xyz 可以是任意维（如只取 xy 聚类）；tree 为 xyz 上已建好的 cKDTree 时核心点判断和边界点查询都直接使用；
+    neighbor_counts 为同一 eps 的 eps_neighbor_counts 结果时直接据此判定核心点。
+    距离一律在 float64 下逐坐标求平方和（与 sklearn 的 kd_tree / ball_tree 相同），float32 输入中距离恰好等于 eps 的点对取舍也一致；
+    sklearn 对很小的输入会自动改用 brute，按 |a|²-2a·b+|b|² 展开计算距离，恰在 eps 上的点对可能与此不同
+    """
+    xyz = np.asarray(xyz, dtype=np.float64)
+    n = xyz.shape[0]
+    labels = np.full(n, -1, dtype=np.int64)
+    if n == 0:
+        return labels
+    if neighbor_counts is not None:
+        core = neighbor_counts >= min_samples
+    else:
+        core = dbscan_core_mask(xyz, eps, min_samples, tree)
+    core_idx = np.flatnonzero(core)
+    if core_idx.shape[0] == 0:
+        return labels
+    comp = _core_components(xyz[core_idx], eps)
+    # 分量按最小核心点下标排序即为 DBSCAN 的簇编号
+    first = np.full(comp.max() + 1, n, dtype=np.int64)
+    np.minimum.at(first, comp, core_idx)
+    used = np.flatnonzero(first < n)
+    number = np.full(first.shape[0], -1, dtype=np.int64)
+    number[used[np.argsort(first[used])]] = np.arange(used.shape[0])
+    labels[core_idx] = number[comp]
+
+    # 边界点：非核心点的 eps 邻域内（含非核心点）不足 min_samples 个点，逐点查询的结果都很短，取其中核心点的最小簇编号
+    border_idx = np.flatnonzero(~core)
+    if border_idx.shape[0]:
+        if tree is None:
+            tree = cKDTree(xyz)
+        neighbors = tree.query_ball_point(xyz[border_idx], eps)
+        lengths = np.fromiter((len(x) for x in neighbors), dtype=np.int64, count=border_idx.shape[0])
+        flat = np.fromiter((j for x in neighbors for j in x), dtype=np.int64, count=lengths.sum())
+        owner = np.repeat(np.arange(border_idx.shape[0]), lengths)
+        reach = core[flat]
+        best = np.full(border_idx.shape[0], n, dtype=np.int64)
+        np.minimum.at(best, owner[reach], labels[flat[reach]])
+        has = best < n
+        labels[border_idx[has]] = best[has]
+    return labels
+
+
+def _voxel_largest(xyz, eps, min_samples):
+    """
+    近似：边长 eps 的体素，3×3×3 邻域内点数不足 min_samples 的体素视为噪声，其余按 26 邻接连通，取点数最多的分量
+    """
+    order, cell_keys, starts, counts, encode = _grid(xyz, eps, 1)
+    num_cells = cell_keys.shape[0]
+    rows, cols = _cell_pairs(cell_keys, encode, _neighbor_offsets(1, ndim=xyz.shape[1]))
+    neighborhood = counts.copy()
+    np.add.at(neighborhood, rows, counts[cols])
+    np.add.at(neighborhood, cols, counts[rows])
+    dense = neighborhood >= min_samples
+    keep = dense[rows] & dense[cols]
+    graph = coo_matrix((np.ones(np.count_nonzero(keep), dtype=np.int8), (rows[keep], cols[keep])),
+                       shape=(num_cells, num_cells))
+    _, comp = connected_components(graph, directed=False)
+    mask = np.zeros(xyz.shape[0], dtype=bool)
+    if not dense.any():
+        return mask
+    sizes = np.bincount(comp[dense], weights=counts[dense], minlength=comp.max() + 1)
+    best_cells = dense & (comp == np.argmax(sizes))
+    mask[order[np.repeat(best_cells, counts)]] = True
+    return mask
+
+
+def largest_cluster_mask(xyz, eps, min_samples, method='exact', tree=None):
+    """
+    xyz 中最大簇的点掩码（没有簇时全为 False）。method 见 CLUSTER_METHODS：
+    sklearn 与 exact 结果一致（并列最大时取 DBSCAN 编号小的簇），voxel 为近似，速度最快。
+    tree 为 xyz 上已建好的 cKDTree（如 common.spatial.FrameIndex 中缓存的），exact 直接使用
+    """
+    n = xyz.shape[0]
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+    if method == 'voxel':
+        return _voxel_largest(xyz, eps, min_samples)
+    if method == 'exact':
+        labels = dbscan_labels_exact(xyz, eps, min_samples, tree)
+    elif method == 'sklearn':
+        from sklearn.cluster import DBSCAN
+        labels = DBSCAN(eps=eps, min_samples=min_samples).fit(xyz).labels_
+    else:
+        raise ValueError(f"未知的聚类方法：{method}，可选 {CLUSTER_METHODS}")
+    clustered = labels >= 0
+    if not clustered.any():
+        return np.zeros(n, dtype=bool)
+    # 簇编号即 DBSCAN 的扩展顺序，argmax 在并列时取编号小的，与原来按字典取最大一致
+    return labels == np.argmax(np.bincount(labels[clustered]))
@@ -0,0 +1,221 @@
+import os
+import json
+from collections import namedtuple
+import numpy as np
+
+from common.sketch import AXIS_NAMES, TDigest
+from common.pcd_io import get_label_field, pcd_to_array, xyz_label_dtype, xyz_label_to_structured
+from common.pcd_stream import DEFAULT_CHUNK_POINTS, open_pcd_stream, iter_pcd_chunks, PCDStreamWriter
+
+# 百分位去离群的标签1豁免、X/Z 两轴的裁剪顺序与 cut.py / cut_new.py 原实现一致
+TRIM_AXES = (0, 2)
+# 标签2少于该点数时 X 轴退回固定范围策略
+MIN_LABEL2_FOR_X_WINDOW = 20
+
+# 百分位去离群之后、确定边界所需的统计量；可以分块计算后用 merge_crop_stats 合并
+CropStats = namedtuple('CropStats', ['num_points', 'min_bound', 'max_bound', 'label2_count', 'label2_x_min',
+                                     'label2_x_max'])
+
+
+def trim_quantiles(values, lower_percentile=1, upper_percentile=99, sample_size=None, seed=0):
+    """
+    values 的上下百分位（与 np.percentile 的线性插值一致）。values 应为可以改写的临时数组：
+    np.percentile 在其上原地做选择（np.partition），不排序也不再复制。
+    sample_size 不为空且点数更多时，在固定种子的随机子样本上估计（超大帧用，结果为近似值）
+    """
+    if sample_size is not None and values.shape[0] > sample_size:
+        rng = np.random.default_rng(seed)
+        values = values[rng.integers(0, values.shape[0], sample_size)]
+    # 分两次取标量：一次取两个百分位时结果会提升为 float64，与原来逐个计算的阈值不完全相同
+    low = np.percentile(values, lower_percentile, overwrite_input=True)
+    high = np.percentile(values, upper_percentile, overwrite_input=True)
+    return low, high
+
+
+def trim_mask(coords, labels, lower_percentile=1, upper_percentile=99, sample_size=None, thresholds=None):
+    """
+    百分位去离群的保留掩码：标签1不参与也始终保留，其余点先按 X、再在 X 裁剪后的点上按 Z 去掉两端。
+    只对参与裁剪的一列做一次取值，其余都是掩码运算。
+    thresholds 为 {'x': (下限, 上限), 'z': ...} 时直接使用（如 dataset_stats.py 统计出的全数据集百分位），不逐帧计算
+    """
+    exempt = labels == 1
+    keep = ~exempt
+    for axis in TRIM_AXES:
+        if not keep.any():
+            # 除标签1外没有点（空帧或只有标签1），没有可裁剪的点，也求不出百分位
+            break
+        column = coords[:, axis]
+        if thresholds is not None:
+            low, high = thresholds[AXIS_NAMES[axis]]
+        else:
+            low, high = trim_quantiles(column[keep], lower_percentile, upper_percentile, sample_size)
+        keep &= (column >= low) & (column <= high)
+    return keep | exempt
+
+
+def load_trim_thresholds(stats_path):
+    """
+    从 dataset_stats.py 写出的统计文件中读取去离群阈值
+    """
+    with open(stats_path, 'r') as f:
+        crop_params = json.load(f).get('crop')
+    if not crop_params or 'trim' not in crop_params:
+        raise ValueError(f"{stats_path} 中没有裁剪参数，请用 dataset_stats.py 重新生成")
+    return {axis: tuple(bounds) for axis, bounds in crop_params['trim'].items()}
+
+
+def _masked_min_max(column, mask):
+    # 按列用 np.where 填充 ±inf 后规约，比 min(where=) 或先取出子集都快得多；没有点时为 (inf, -inf)
+    return np.where(mask, column, np.inf).min(initial=np.inf), np.where(mask, column, -np.inf).max(initial=-np.inf)
+
+
+def crop_stats(coords, labels, mask=None):
+    """
+    mask 内点的范围以及标签2的点数和 X 范围，逐列规约，不取出子集
+    """
+    if mask is None:
+        mask = np.ones(coords.shape[0], dtype=bool)
+    min_bound = np.full(3, np.inf, dtype=coords.dtype)
+    max_bound = np.full(3, -np.inf, dtype=coords.dtype)
+    for axis in range(3):
+        min_bound[axis], max_bound[axis] = _masked_min_max(coords[:, axis], mask)
+    mask2 = mask & (labels == 2)
+    label2_x_min, label2_x_max = _masked_min_max(coords[:, 0], mask2)
+    return CropStats(int(np.count_nonzero(mask)), min_bound, max_bound, int(np.count_nonzero(mask2)),
+                     label2_x_min, label2_x_max)
+
+
+def merge_crop_stats(a, b):
+    if a is None:
+        return b
+    return CropStats(a.num_points + b.num_points, np.minimum(a.min_bound, b.min_bound),
+                     np.maximum(a.max_bound, b.max_bound), a.label2_count + b.label2_count,
+                     min(a.label2_x_min, b.label2_x_min), max(a.label2_x_max, b.label2_x_max))
+
+
+def _z_floor(stats, new_min):
+    range_ = stats.max_bound - stats.min_bound
+    if range_[2] > 30:
+        new_min[2] = max(stats.min_bound[2] + range_[2] * 0.3, 30.0)
+
+
+def fixed_x_band_bounds(stats):
+    """
+    cut.py 的边界策略：X 轴保留中间 70%，但至少覆盖 ±14 m；Y 轴不变；Z 轴下边界上移
+    """
+    range_ = stats.max_bound - stats.min_bound
+    new_min = stats.min_bound.copy()
+    new_max = stats.max_bound.copy()
+    new_min[0] = min(-14, stats.min_bound[0] + range_[0] * 0.15)
+    new_max[0] = max(14, stats.max_bound[0] - range_[0] * 0.15)
+    _z_floor(stats, new_min)
+    return new_min, new_max
+
+
+def label2_x_window_bounds(stats):
+    """
+    cut_new.py 的边界策略：X 轴取标签2的范围各外扩 3 m，标签2太少时退回 fixed_x_band_bounds
+    """
+    if stats.label2_count < MIN_LABEL2_FOR_X_WINDOW:
+        print(f"⚠️ 标签为2的点太少（仅 {stats.label2_count} 个），X轴使用默认裁剪策略")
+        return fixed_x_band_bounds(stats)
+    new_min = stats.min_bound.copy()
+    new_max = stats.max_bound.copy()
+    new_min[0] = stats.label2_x_min - 3
+    new_max[0] = stats.label2_x_max + 3
+    _z_floor(stats, new_min)
+    return new_min, new_max
+
+
+def crop_bounds(stats, bounds_policy):
+    """
+    bounds_policy(stats) 给出的边界；去离群后没有点时范围为空，不调用 bounds_policy，返回 (inf, -inf) 的空边界
+    """
+    if stats.num_points == 0:
+        return stats.min_bound.copy(), stats.max_bound.copy()
+    return bounds_policy(stats)
+
+
+def bounds_keep_mask(coords, labels, new_min, new_max, mask=None):
+    """
+    标签1始终保留，标签0和2只保留边界内的点，其他标签丢弃；mask 为之前的保留掩码
+    """
+    in_bound = (labels == 0) | (labels == 2)
+    for axis in range(3):
+        column = coords[:, axis]
+        in_bound &= column >= new_min[axis]
+        in_bound &= column <= new_max[axis]
+    keep = in_bound | (labels == 1)
+    return keep if mask is None else keep & mask
+
+
+def crop_mask(coords, labels, bounds_policy, lower_percentile=1, upper_percentile=99, sample_size=None,
+              trim_thresholds=None):
+    """
+    百分位去离群 + 按 bounds_policy(CropStats) 给出的边界裁剪，合成为一个保留掩码。
+    trim_thresholds 不为空时用固定的去离群阈值（见 trim_mask）。
+    不移动、不复制点，调用方最后只做一次 points[mask]（或写出时传 mask），原始点序不变。
+    空帧返回全 False 的掩码和空边界（见 crop_bounds），只有标签1的帧原样保留。
+    返回 (保留掩码, 去离群后的点数, 边界下限, 边界上限)
+    """
+    trimmed = trim_mask(coords, labels, lower_percentile, upper_percentile, sample_size, trim_thresholds)
+    stats = crop_stats(coords, labels, trimmed)
+    new_min, new_max = crop_bounds(stats, bounds_policy)
+    return bounds_keep_mask(coords, labels, new_min, new_max, trimmed), stats.num_points, new_min, new_max
+
+
+def _iter_coords_labels(input_file, label_field, chunk_points):
+    for chunk in iter_pcd_chunks(input_file, chunk_points):
+        yield pcd_to_array(chunk, ('x', 'y', 'z'), dtype=np.float32), chunk[label_field].astype(int)
+
+
+def crop_pcd_stream(input_file, output_file, bounds_policy, data_format='ascii', chunk_points=DEFAULT_CHUNK_POINTS,
+                    lower_percentile=1, upper_percentile=99, trim_thresholds=None):
+    """
+    流式版本的 crop_mask + 写出：分四遍顺序扫描文件，内存中只有一块点和两个 t-digest，与帧大小无关。
+    第1、2遍把标签1以外的 X、再把 X 裁剪后的 Z 逐块加入 t-digest 求去离群阈值（近似值，与 np.percentile
+    在 1% / 99% 处相差很小；需要与整帧处理完全相同时传入 trim_thresholds，并省去这两遍），
+    第3遍逐块合并 CropStats 后由 bounds_policy 给出边界，第4遍逐块写出。分块写出只支持 ascii / binary。
+    空帧、只有标签1的帧与 crop_mask 的处理相同（写出空文件 / 原样写出）。
+    返回 (去离群后的点数, 输出点数, {标签: 点数}, 边界下限, 边界上限)
+    """
+    header, _ = open_pcd_stream(input_file)
+    label_field = get_label_field(header)
+
+    def chunks():
+        return _iter_coords_labels(input_file, label_field, chunk_points)
+
+    # 第1、2遍：标签1以外的点先按 X、再按 Z 做百分位裁剪（与 trim_mask 顺序一致）
+    if trim_thresholds is not None:
+        (x_low, x_high), (z_low, z_high) = trim_thresholds['x'], trim_thresholds['z']
+    else:
+        # 除标签1外没有点时 t-digest 为空，阈值为 nan，标签1以外不保留任何点（本来也没有）
+        digest = TDigest()
+        for coords, labels in chunks():
+            digest.add(coords[labels != 1, 0])
+        x_low, x_high = digest.percentile([lower_percentile, upper_percentile])
+        digest = TDigest()
+        for coords, labels in chunks():
+            digest.add(coords[(labels != 1) & (coords[:, 0] >= x_low) & (coords[:, 0] <= x_high), 2])
+        z_low, z_high = digest.percentile([lower_percentile, upper_percentile])
+
+    def trimmed_mask(coords, labels):
+        return (labels == 1) | ((coords[:, 0] >= x_low) & (coords[:, 0] <= x_high) &
+                                (coords[:, 2] >= z_low) & (coords[:, 2] <= z_high))
+
+    # 第3遍：裁剪后点云的范围，以及标签2的点数和 X 范围，逐块合并
+    stats = crop_stats(np.empty((0, 3), dtype=np.float32), np.empty(0, dtype=int))
+    for coords, labels in chunks():
+        stats = merge_crop_stats(stats, crop_stats(coords, labels, trimmed_mask(coords, labels)))
+    new_min, new_max = crop_bounds(stats, bounds_policy)
+
+    # 第4遍：标签1始终保留，标签0和2只保留范围内的点，逐块写出
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    label_counts = {}
+    with PCDStreamWriter(output_file, xyz_label_dtype(header), data_format, header.get('viewpoint')) as writer:
+        for coords, labels in chunks():
+            mask_keep = bounds_keep_mask(coords, labels, new_min, new_max, trimmed_mask(coords, labels))
+            writer.write(xyz_label_to_structured(coords, labels, header), mask_keep)
+            for label, count in zip(*np.unique(labels[mask_keep], return_counts=True)):
+                label_counts[int(label)] = label_counts.get(int(label), 0) + int(count)
+    return stats.num_points, writer.num_points, label_counts, new_min, new_max
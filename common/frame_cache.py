@@ -0,0 +1,163 @@
+import os
+import json
+import hashlib
+import tempfile
+import numpy as np
+
+from common import pcd_io
+
+# 缓存格式版本，解析逻辑变化时递增以作废旧缓存
+CACHE_VERSION = 2
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'pcd_frames')
+DEFAULT_MAX_BYTES = 20 * 1024 ** 3
+
+
+def file_content_hash(file_path, block_size=1 << 20):
+    """
+    文件内容的 blake2b 摘要（只读字节，不解析）
+    """
+    h = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+class FrameCache:
+    """
+    PCD 解析结果的持久缓存：每帧一个 .npy（结构化数组）加一个 .json（头部），放在同一个缓存目录。
+    键由绝对路径、大小、mtime 以及可选的内容摘要组成；总大小超过 max_bytes 时按最近访问时间（LRU）淘汰
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES, use_content_hash=False):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.use_content_hash = use_content_hash
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(self, file_path):
+        st = os.stat(file_path)
+        parts = [str(CACHE_VERSION), os.path.abspath(file_path), str(st.st_size), str(st.st_mtime_ns)]
+        if self.use_content_hash:
+            parts.append(file_content_hash(file_path))
+        return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + '.npy', base + '.json'
+
+    def get(self, file_path):
+        """
+        命中时返回 (头部字典, 结构化数组)，否则返回 None
+        """
+        npy_path, json_path = self._paths(self.key(file_path))
+        try:
+            with open(json_path, 'r') as f:
+                header = json.load(f)['header']
+            data = np.load(npy_path)
+        except (OSError, ValueError, KeyError):
+            return None
+        # 更新 mtime 作为 LRU 的访问时间
+        os.utime(npy_path)
+        return header, data
+
+    def put(self, file_path, header, data):
+        npy_path, json_path = self._paths(self.key(file_path))
+        # 先写临时文件再改名，并发的进程不会读到半个文件
+        self._atomic_write(npy_path, lambda f: np.save(f, np.ascontiguousarray(data)))
+        meta = {'source': os.path.abspath(file_path), 'header': header}
+        self._atomic_write(json_path, lambda f: f.write(json.dumps(meta).encode('utf-8')))
+        self.evict()
+
+    def _atomic_write(self, path, write):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def load(self, file_path, parse):
+        """
+        有缓存则直接加载，否则调用 parse(file_path) 解析并写入缓存
+        """
+        cached = self.get(file_path)
+        if cached is not None:
+            return cached
+        header, data = parse(file_path)
+        self.put(file_path, header, data)
+        return header, data
+
+    def _entries(self):
+        """
+        返回 [(访问时间, 大小, key)]，大小包含 .npy 和 .json
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.npy'):
+                continue
+            key = name[:-4]
+            npy_path, json_path = self._paths(key)
+            try:
+                st = os.stat(npy_path)
+                size = st.st_size + (os.path.getsize(json_path) if os.path.exists(json_path) else 0)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, size, key))
+        return entries
+
+    def _remove(self, key):
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # 其他线程/进程已删除
+
+    def evict(self):
+        """
+        按 LRU 删除条目直到总大小不超过 max_bytes
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(key)
+            total -= size
+
+    def invalidate(self, file_path):
+        """
+        删除某个源文件的所有缓存条目（包括旧 mtime 的条目）
+        """
+        source = os.path.abspath(file_path)
+        for _, _, key in self._entries():
+            try:
+                with open(self._paths(key)[1], 'r') as f:
+                    if json.load(f)['source'] != source:
+                        continue
+            except (OSError, ValueError, KeyError):
+                pass  # 元数据损坏的条目一并清理
+            self._remove(key)
+
+    def clear(self):
+        for _, _, key in self._entries():
+            self._remove(key)
+
+    def total_bytes(self):
+        return sum(size for _, size, _ in self._entries())
+
+
+def enable_frame_cache(cache_dir=None, max_bytes=DEFAULT_MAX_BYTES, use_content_hash=False):
+    """
+    让 common.pcd_io.read_pcd（以及基于它的所有读取函数）使用解析缓存
+    """
+    cache = FrameCache(cache_dir, max_bytes, use_content_hash)
+    pcd_io.set_frame_cache(cache)
+    return cache
+
+
+def disable_frame_cache():
+    pcd_io.set_frame_cache(None)
@@ -0,0 +1,85 @@
+import os
+import numpy as np
+from numpy.lib import recfunctions
+
+from common.pcd_io import parse_pcd_header, pcd_dtype, read_pcd
+
+# SemanticKITTI 格式：我们导出的 .bin 只有 xyz（float32），.label 为 uint32
+KITTI_XYZ_DTYPE = np.dtype([('x', '<f4'), ('y', '<f4'), ('z', '<f4')])
+KITTI_XYZI_DTYPE = np.dtype([('x', '<f4'), ('y', '<f4'), ('z', '<f4'), ('intensity', '<f4')])
+KITTI_LABEL_DTYPE = np.dtype('<u4')
+
+
+def _memmap(file_path, dtype, offset=0, count=None, mode='r'):
+    """
+    以 np.memmap 映射文件中从 offset 开始的 count 条记录，只有被访问的页才会读入内存
+    """
+    available = (os.path.getsize(file_path) - offset) // dtype.itemsize
+    if count is None:
+        count = available
+    elif count > available:
+        raise ValueError(f"{file_path} 数据不完整: 期望 {count} 条记录，实际 {available} 条")
+    if count == 0:
+        # 空文件无法 mmap
+        return np.empty(0, dtype=dtype)
+    return np.memmap(file_path, dtype=dtype, mode=mode, offset=offset, shape=(count,))
+
+
+def _record_dtype(with_intensity):
+    return KITTI_XYZI_DTYPE if with_intensity else KITTI_XYZ_DTYPE
+
+
+def kitti_point_count(file_path, with_intensity=False):
+    """
+    由文件大小得到 .bin 的点数，不读取数据
+    """
+    size = os.path.getsize(file_path)
+    itemsize = _record_dtype(with_intensity).itemsize
+    if size % itemsize != 0:
+        raise ValueError(f"{file_path} 大小 {size} 不是 {itemsize} 的整数倍")
+    return size // itemsize
+
+
+def kitti_label_count(file_path):
+    """
+    由文件大小得到 .label 的标签数，不读取数据
+    """
+    size = os.path.getsize(file_path)
+    if size % KITTI_LABEL_DTYPE.itemsize != 0:
+        raise ValueError(f"{file_path} 大小 {size} 不是 {KITTI_LABEL_DTYPE.itemsize} 的整数倍")
+    return size // KITTI_LABEL_DTYPE.itemsize
+
+
+def open_kitti_bin(file_path, with_intensity=False, mode='r'):
+    """
+    内存映射 .bin 点云，返回带 x/y/z(/intensity) 字段的结构化视图
+    """
+    return _memmap(file_path, _record_dtype(with_intensity), count=kitti_point_count(file_path, with_intensity),
+                   mode=mode)
+
+
+def open_kitti_label(file_path, mode='r'):
+    """
+    内存映射 .label 标签文件
+    """
+    return _memmap(file_path, KITTI_LABEL_DTYPE, count=kitti_label_count(file_path), mode=mode)
+
+
+def open_pcd(file_path, mode='r'):
+    """
+    打开 PCD 帧，返回 (头部字典, 结构化数组)。
+    DATA binary 时为数据块上的 np.memmap 零拷贝视图；ascii / binary_compressed 无法映射，退回完整读取
+    """
+    with open(file_path, 'rb') as f:
+        header = parse_pcd_header(f)
+    if header['data'] != 'binary':
+        return read_pcd(file_path)
+    data = _memmap(file_path, pcd_dtype(header), offset=header['data_offset'], count=header['points'], mode=mode)
+    return header, data
+
+
+def xyz_view(data):
+    """
+    把结构化数组的 x/y/z 字段视为 (N, 3) 数组；字段类型一致且等距时不拷贝
+    """
+    return recfunctions.structured_to_unstructured(data[['x', 'y', 'z']], copy=False)
@@ -0,0 +1,133 @@
+import os
+import json
+import tempfile
+import numpy as np
+
+from common.frames import KITTI_LABEL_DTYPE, KITTI_XYZ_DTYPE, open_kitti_label
+from common.frame_cache import file_content_hash
+
+# 索引放在每个 sequences/NN 目录中，以 . 开头，不会被当作序列数据
+INDEX_NAME = '.kitti_index.json'
+INDEX_VERSION = 1
+
+
+def _file_info(path, old, checksum):
+    """
+    文件的大小、mtime 和（可选的）内容摘要；大小和 mtime 都没变时沿用旧记录中的摘要，不再读文件
+    """
+    st = os.stat(path)
+    info = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'hash': None}
+    unchanged = old is not None and old['size'] == info['size'] and old['mtime_ns'] == info['mtime_ns']
+    if unchanged:
+        info['hash'] = old['hash']
+    if checksum and info['hash'] is None:
+        info['hash'] = file_content_hash(path)
+    return info, unchanged
+
+
+def _label_histogram(path):
+    values, counts = np.unique(open_kitti_label(path), return_counts=True)
+    return {str(v): int(c) for v, c in zip(values.tolist(), counts.tolist())}
+
+
+def load_sequence_index(seq_dir):
+    """
+    读取 seq_dir 中的索引，不存在或版本不符时返回 None
+    """
+    try:
+        with open(os.path.join(seq_dir, INDEX_NAME), 'r') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return index if index.get('version') == INDEX_VERSION else None
+
+
+def save_sequence_index(seq_dir, index):
+    fd, tmp_path = tempfile.mkstemp(dir=seq_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, os.path.join(seq_dir, INDEX_NAME))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def update_sequence_index(seq_dir, checksum=False, histogram=False, save=True):
+    """
+    建立或增量更新一个 sequences/NN 的帧索引，返回索引字典：
+    frames 按帧名（文件名去掉扩展名）排序，每帧记录 velodyne/<帧名>.bin 与 labels/<帧名>.label 的
+    大小 / mtime / 内容摘要（checksum 时）、由文件大小得到的点数与标签数、两类文件在整个序列依次拼接时的字节偏移，
+    以及标签直方图（histogram 时）。大小和 mtime 都没变的文件沿用旧记录，只有新增或改动的帧才会读取内容；
+    默认不要求摘要和直方图，只需 stat，不读取任何帧
+    """
+    old_frames = (load_sequence_index(seq_dir) or {}).get('frames', {})
+    sources = (('bin', 'velodyne', '.bin', KITTI_XYZ_DTYPE.itemsize),
+               ('label', 'labels', '.label', KITTI_LABEL_DTYPE.itemsize))
+    names = {}
+    for kind, sub, ext, _ in sources:
+        sub_dir = os.path.join(seq_dir, sub)
+        if os.path.isdir(sub_dir):
+            names[kind] = {f[:-len(ext)] for f in os.listdir(sub_dir) if f.endswith(ext)}
+        else:
+            names[kind] = set()
+
+    frames = {}
+    offsets = {'bin': 0, 'label': 0}
+    for name in sorted(names['bin'] | names['label']):
+        old = old_frames.get(name, {})
+        entry = {}
+        for kind, sub, ext, itemsize in sources:
+            if name not in names[kind]:
+                entry.update({kind: None, f'{kind}_count': None, f'{kind}_offset': None})
+                continue
+            path = os.path.join(seq_dir, sub, name + ext)
+            info, unchanged = _file_info(path, old.get(kind), checksum)
+            entry[kind] = info
+            entry[f'{kind}_count'] = info['size'] // itemsize if info['size'] % itemsize == 0 else None
+            entry[f'{kind}_offset'] = offsets[kind]
+            offsets[kind] += info['size']
+            if kind == 'label':
+                entry['histogram'] = old.get('histogram') if unchanged else None
+                if histogram and entry['histogram'] is None and entry['label_count'] is not None:
+                    entry['histogram'] = _label_histogram(path)
+        entry.setdefault('histogram', None)
+        frames[name] = entry
+
+    index = {'version': INDEX_VERSION, 'sequence': os.path.basename(os.path.normpath(seq_dir)), 'frames': frames}
+    if save:
+        save_sequence_index(seq_dir, index)
+    return index
+
+
+def index_problems(index):
+    """
+    按帧名配对检查索引，返回 [(帧名, 问题说明)]：缺少 .bin 或 .label、文件大小不是记录大小的整数倍、点数与标签数不一致
+    """
+    problems = []
+    for name, entry in index['frames'].items():
+        if entry['bin'] is None:
+            problems.append((name, "缺失 bin 文件"))
+        elif entry['bin_count'] is None:
+            problems.append((name, f"bin 文件大小 {entry['bin']['size']} 不是 {KITTI_XYZ_DTYPE.itemsize} 的整数倍"))
+        if entry['label'] is None:
+            problems.append((name, "缺失 label 文件"))
+        elif entry['label_count'] is None:
+            problems.append((name, f"label 文件大小 {entry['label']['size']} 不是 {KITTI_LABEL_DTYPE.itemsize} 的整数倍"))
+        if entry['bin_count'] is not None and entry['label_count'] is not None \
+                and entry['bin_count'] != entry['label_count']:
+            problems.append((name, f"点云行数={entry['bin_count']}, 标签行数={entry['label_count']}"))
+    return problems
+
+
+def indexed_frames(seq_dir, index=None):
+    """
+    索引中 .bin 与 .label 配对且点数一致的帧，返回 [(帧名, bin 路径, label 路径, 点数)]，按帧名排序；
+    训练数据加载可直接按此列表取帧，不必再逐个打开文件核对。未给出 index 时先按 stat 增量更新索引
+    """
+    if index is None:
+        index = update_sequence_index(seq_dir)
+    bad = {name for name, _ in index_problems(index)}
+    return [(name, os.path.join(seq_dir, 'velodyne', name + '.bin'), os.path.join(seq_dir, 'labels', name + '.label'),
+             entry['bin_count']) for name, entry in index['frames'].items() if name not in bad]
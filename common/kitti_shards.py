@@ -0,0 +1,143 @@
+import os
+import json
+import shutil
+import tempfile
+
+from common.frames import KITTI_XYZ_DTYPE, open_kitti_bin, open_kitti_label, xyz_view
+from common.kitti_index import indexed_frames
+
+# 打包目录中的偏移表；分片为 shard_XXXX.bin（各帧 xyz 依次拼接，与 KITTI .bin 格式相同）与 shard_XXXX.label
+SHARDS_NAME = 'shards.json'
+SHARDS_VERSION = 1
+# 每个分片点云部分的目标大小，帧不跨分片
+DEFAULT_SHARD_BYTES = 1 << 30
+
+
+def _shard_paths(pack_dir, shard):
+    return os.path.join(pack_dir, f"shard_{shard:04d}.bin"), os.path.join(pack_dir, f"shard_{shard:04d}.label")
+
+
+def pack_sequence(seq_dir, pack_dir, shard_bytes=DEFAULT_SHARD_BYTES, index=None):
+    """
+    把一个 sequences/NN 中配对且点数一致的帧（见 kitti_index.indexed_frames，按帧名排序）打包成若干分片，
+    只拷贝字节不解析。偏移表 shards.json 记录每帧的分片号、在分片中的点偏移和点数，最后写入；
+    打包过程中中断时目录中没有偏移表，不会被当作完整的打包结果读取。返回偏移表
+    """
+    frames = indexed_frames(seq_dir, index)
+    os.makedirs(pack_dir, exist_ok=True)
+    table_path = os.path.join(pack_dir, SHARDS_NAME)
+    if os.path.exists(table_path):
+        os.remove(table_path)
+
+    table = {'version': SHARDS_VERSION, 'sequence': os.path.basename(os.path.normpath(seq_dir)), 'shards': [],
+             'names': [], 'shard': [], 'offset': [], 'points': []}
+    bin_out = label_out = None
+    try:
+        for name, bin_path, label_path, num_points in frames:
+            full = bin_out is not None and table['shards'][-1] > 0 and \
+                (table['shards'][-1] + num_points) * KITTI_XYZ_DTYPE.itemsize > shard_bytes
+            if bin_out is None or full:
+                if bin_out is not None:
+                    bin_out.close()
+                    label_out.close()
+                shard_bin, shard_label = _shard_paths(pack_dir, len(table['shards']))
+                bin_out, label_out = open(shard_bin, 'wb'), open(shard_label, 'wb')
+                table['shards'].append(0)
+            with open(bin_path, 'rb') as f:
+                shutil.copyfileobj(f, bin_out)
+            with open(label_path, 'rb') as f:
+                shutil.copyfileobj(f, label_out)
+            table['names'].append(name)
+            table['shard'].append(len(table['shards']) - 1)
+            table['offset'].append(table['shards'][-1])
+            table['points'].append(num_points)
+            table['shards'][-1] += num_points
+    finally:
+        if bin_out is not None:
+            bin_out.close()
+            label_out.close()
+
+    # 上次打包留下的多余分片
+    for shard in range(len(table['shards']), 1 << 16):
+        stale = [p for p in _shard_paths(pack_dir, shard) if os.path.exists(p)]
+        if not stale:
+            break
+        for path in stale:
+            os.remove(path)
+
+    fd, tmp_path = tempfile.mkstemp(dir=pack_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(table, f)
+        os.replace(tmp_path, table_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return table
+
+
+class ShardedSequence:
+    """
+    打包后的一个序列：分片在第一次访问时内存映射，frame() 返回该帧 xyz (N, 3) 与标签 (N,) 的零拷贝视图，
+    只有被访问的页才会读入内存
+    """
+
+    def __init__(self, pack_dir):
+        self.pack_dir = pack_dir
+        with open(os.path.join(pack_dir, SHARDS_NAME), 'r') as f:
+            table = json.load(f)
+        if table.get('version') != SHARDS_VERSION:
+            raise ValueError(f"{pack_dir} 的偏移表版本 {table.get('version')} 不受支持")
+        self.sequence = table['sequence']
+        self.names = table['names']
+        self._table = table
+        self._positions = {name: i for i, name in enumerate(self.names)}
+        self._shards = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def _open_shard(self, shard):
+        if shard not in self._shards:
+            bin_path, label_path = _shard_paths(self.pack_dir, shard)
+            points, labels = open_kitti_bin(bin_path), open_kitti_label(label_path)
+            expected = self._table['shards'][shard]
+            if points.shape[0] != expected or labels.shape[0] != expected:
+                raise ValueError(f"{bin_path} 与偏移表不符：期望 {expected} 个点，"
+                                 f"实际 {points.shape[0]} 个点、{labels.shape[0]} 个标签")
+            self._shards[shard] = (points, labels)
+        return self._shards[shard]
+
+    def records(self, key):
+        """
+        第 key 帧（整数）或帧名为 key 的帧在分片中的 (结构化 xyz 记录, 标签) 视图
+        """
+        i = key if isinstance(key, int) else self._positions[key]
+        points, labels = self._open_shard(self._table['shard'][i])
+        start = self._table['offset'][i]
+        end = start + self._table['points'][i]
+        return points[start:end], labels[start:end]
+
+    def frame(self, key):
+        """
+        第 key 帧（整数）或帧名为 key 的帧，返回 (xyz (N, 3) float32, 标签 (N,) uint32)，都是分片上的视图
+        """
+        points, labels = self.records(key)
+        return xyz_view(points), labels
+
+
+def unpack_sequence(pack_dir, seq_dir):
+    """
+    把打包的序列还原为标准 KITTI 目录结构（seq_dir/velodyne/<帧名>.bin、seq_dir/labels/<帧名>.label），
+    写出的文件与打包前逐字节相同。返回帧数
+    """
+    sequence = ShardedSequence(pack_dir)
+    velo_dir, label_dir = os.path.join(seq_dir, 'velodyne'), os.path.join(seq_dir, 'labels')
+    os.makedirs(velo_dir, exist_ok=True)
+    os.makedirs(label_dir, exist_ok=True)
+    for i, name in enumerate(sequence.names):
+        points, labels = sequence.records(i)
+        points.tofile(os.path.join(velo_dir, f"{name}.bin"))
+        labels.tofile(os.path.join(label_dir, f"{name}.label"))
+    return len(sequence)
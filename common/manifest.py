@@ -0,0 +1,202 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import numpy as np
+
+from common.batch import TaskResult, run_batch
+from common.prefetch import DEFAULT_PREFETCH_DEPTH
+from common.frame_cache import file_content_hash
+
+# 清单放在各阶段的输出目录中；以 . 开头且不是 .pcd，不会被下一阶段当作输入
+MANIFEST_NAME = '.build_manifest.json'
+MANIFEST_VERSION = 1
+# 处理过程中清单至少间隔这么多秒才保存一次（结束或中断时总会保存），避免每帧重写整个清单
+MANIFEST_SAVE_INTERVAL = 5.0
+
+
+def add_manifest_arguments(parser):
+    """
+    给脚本的 argparse 加上 --resume / --force
+    """
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--resume', dest='resume', action='store_true', default=True,
+                       help="跳过输入、参数、代码都未变化且输出仍在的文件（默认）")
+    group.add_argument('--force', dest='resume', action='store_false', help="忽略清单，全部重新处理")
+    return parser
+
+
+def code_version(code_files):
+    """
+    参与处理的源文件内容摘要，脚本或公共模块改动后旧结果自动失效
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for path in sorted(os.path.abspath(p) for p in code_files):
+        h.update(path.encode('utf-8'))
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def common_code_files():
+    """
+    common 包中的全部源文件：各阶段直接或间接用到的公共模块都在其中，改动任一个都使旧结果失效
+    """
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    return [os.path.join(package_dir, f) for f in sorted(os.listdir(package_dir)) if f.endswith('.py')]
+
+
+def params_digest(params):
+    return hashlib.blake2b(json.dumps(params, sort_keys=True).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _stat(path):
+    st = os.stat(path)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def _jsonable(value):
+    """
+    把处理函数的返回值转换成可写入 JSON 的形式（numpy 标量/数组、元组）
+    """
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    return value
+
+
+class BuildManifest:
+    """
+    一个阶段的构建清单：每个文件记录输入摘要、参数摘要、代码版本、输出（存在时记录大小和 mtime）
+    以及处理函数的返回值。全部一致且输出未被改动时认为该文件已是最新，可以跳过。
+    未产生输出的文件（如 improve2.py 中标签2少于30点不保存）同样记录，下次不会重算。
+    代码版本除 code_files（阶段脚本本身）外总是包含整个 common 包（见 common_code_files），
+    不必逐个列出阶段用到的公共模块
+    """
+
+    def __init__(self, output_dir, params, code_files):
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.params = params_digest(params)
+        self.code = code_version(set(os.path.abspath(p) for p in code_files) | set(common_code_files()))
+        self.entries = {}
+        try:
+            with open(self.path, 'r') as f:
+                saved = json.load(f)
+            if saved.get('version') == MANIFEST_VERSION:
+                self.entries = saved['entries']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _input_digest(self, path, old=None):
+        """
+        大小和 mtime 都没变时沿用旧摘要，避免重复读取整个文件
+        """
+        info = _stat(path)
+        if old and old['size'] == info['size'] and old['mtime_ns'] == info['mtime_ns']:
+            info['hash'] = old['hash']
+        else:
+            info['hash'] = file_content_hash(path)
+        return info
+
+    def is_current(self, name, inputs, outputs):
+        entry = self.entries.get(name)
+        if entry is None or entry['params'] != self.params or entry['code'] != self.code:
+            return False
+        if sorted(entry['inputs']) != sorted(inputs) or sorted(entry['outputs']) != sorted(outputs):
+            return False
+        try:
+            for path in inputs:
+                old = entry['inputs'][path]
+                if self._input_digest(path, old)['hash'] != old['hash']:
+                    return False
+        except OSError:
+            return False
+        for path, recorded in entry['outputs'].items():
+            if recorded is None:
+                # 上次有意没有写出，文件也应当不存在
+                if os.path.exists(path):
+                    return False
+            elif not os.path.exists(path) or _stat(path) != recorded:
+                return False
+        return True
+
+    def record(self, name, inputs, outputs, value=None):
+        old = self.entries.get(name, {}).get('inputs', {})
+        self.entries[name] = {
+            'inputs': {path: self._input_digest(path, old.get(path)) for path in inputs},
+            'outputs': {path: _stat(path) if os.path.exists(path) else None for path in outputs},
+            'params': self.params,
+            'code': self.code,
+            'value': _jsonable(value),
+        }
+
+    def cached_value(self, name):
+        return self.entries[name]['value']
+
+    def prune(self, names):
+        """
+        删除不在 names 中的条目（输入文件已被删除）
+        """
+        names = set(names)
+        for name in list(self.entries):
+            if name not in names:
+                del self.entries[name]
+
+    def save(self):
+        out_dir = os.path.dirname(self.path)
+        os.makedirs(out_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=out_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'version': MANIFEST_VERSION, 'entries': self.entries}, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def run_incremental(func, tasks, manifest, resume=True, workers=1, threads_per_worker=1,
+                    prefetch=DEFAULT_PREFETCH_DEPTH):
+    """
+    tasks 为 (名称, 参数元组, 输入路径列表, 输出路径列表)。resume 时跳过清单中已是最新的文件，
+    其余交给 run_batch；每处理完一个文件就更新清单，每隔 MANIFEST_SAVE_INTERVAL 秒和结束（包括中断）时保存，
+    中途中断后重跑只处理剩下的文件。处理函数抛出异常的文件不记录，下次重跑。
+    返回与 tasks 同序的 TaskResult 列表，跳过的文件取清单中记录的返回值，汇总统计与全量运行一致
+    """
+    tasks = list(tasks)
+    io_paths = {name: (inputs, outputs) for name, _, inputs, outputs in tasks}
+    pending = [(name, args, inputs) for name, args, inputs, outputs in tasks
+               if not (resume and manifest.is_current(name, inputs, outputs))]
+    print(f"共 {len(tasks)} 个文件，{len(tasks) - len(pending)} 个已是最新，待处理 {len(pending)} 个")
+
+    last_save = [time.monotonic()]
+
+    def on_result(result):
+        if result.ok:
+            manifest.record(result.name, *io_paths[result.name], value=result.value)
+            if time.monotonic() - last_save[0] >= MANIFEST_SAVE_INTERVAL:
+                manifest.save()
+                last_save[0] = time.monotonic()
+
+    try:
+        done = {r.name: r for r in run_batch(func, [(name, args) for name, args, _ in pending], workers,
+                                             threads_per_worker, on_result, [inputs for _, _, inputs in pending],
+                                             prefetch)}
+        manifest.prune(io_paths)
+    finally:
+        manifest.save()
+
+    results = []
+    for name, _, _, _ in tasks:
+        if name in done:
+            results.append(done[name])
+        else:
+            results.append(TaskResult(name, True, manifest.cached_value(name), None, '', 0.0))
+    return results
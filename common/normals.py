@@ -0,0 +1,268 @@
+import numpy as np
+from common.spatial import FrameIndex
+from common.cluster import dbscan_labels_exact
+from common.profiling import stage
+
+# 与 open3d KDTreeSearchParamKNN 的常用取值一致
+DEFAULT_NORMAL_KNN = 20
+# 一次计算协方差的查询点数上限，(块大小, k, 3) 的近邻坐标常驻内存
+_CHUNK_POINTS = 1 << 16
+_TWO_THIRDS_PI = 2.09439510239319549
+# 法向一致性筛选中 DBSCAN 噪声点（簇编号 -1）的处理：keep 保留为标签2，drop 改为标签0
+NOISE_POLICIES = ('keep', 'drop')
+
+
+def _cross_rows(a, b):
+    # 比 np.cross 快：逐分量计算，输入输出都是 (M, 3)
+    return np.stack([a[:, 1] * b[:, 2] - a[:, 2] * b[:, 1],
+                     a[:, 2] * b[:, 0] - a[:, 0] * b[:, 2],
+                     a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0]], axis=1)
+
+
+def _eigenvector0(a, evals):
+    """
+    特征值 evals 对应的特征向量：(A - λI) 三行两两叉乘，取模最大的一个（并列时取靠前的）
+    """
+    rows = a - evals[:, None, None] * np.eye(3)
+    candidates = np.stack([_cross_rows(rows[:, 0], rows[:, 1]), _cross_rows(rows[:, 0], rows[:, 2]),
+                           _cross_rows(rows[:, 1], rows[:, 2])], axis=1)
+    lengths = (candidates ** 2).sum(axis=-1)
+    best = np.argmax(lengths, axis=1)
+    pick = np.arange(a.shape[0])
+    return candidates[pick, best] / np.sqrt(lengths[pick, best])[:, None]
+
+
+def _eigenvector1(a, evec0, eval1):
+    """
+    在与 evec0 正交的平面内求特征值 eval1 的特征向量
+    """
+    x, y, z = evec0[:, 0], evec0[:, 1], evec0[:, 2]
+    use_x = np.abs(x) > np.abs(y)
+    zeros = np.zeros_like(x)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inv_x = 1 / np.sqrt(x * x + z * z)
+        inv_y = 1 / np.sqrt(y * y + z * z)
+        u = np.where(use_x[:, None], np.stack([-z * inv_x, zeros, x * inv_x], axis=1),
+                     np.stack([zeros, z * inv_y, -y * inv_y], axis=1))
+    v = _cross_rows(evec0, u)
+    b = a - eval1[:, None, None] * np.eye(3)
+    bu = np.einsum('nij,nj->ni', b, u)
+    bv = np.einsum('nij,nj->ni', b, v)
+    m00, m01, m11 = (u * bu).sum(axis=1), (u * bv).sum(axis=1), (v * bv).sum(axis=1)
+    abs00, abs01, abs11 = np.abs(m00), np.abs(m01), np.abs(m11)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # |m00| >= |m11|：按 (m00, m01) 求解
+        r = np.where(abs00 >= abs01, m01 / m00, m00 / m01)
+        s = 1 / np.sqrt(1 + r * r)
+        c00 = np.where(abs00 >= abs01, s, r * s)
+        c01 = np.where(abs00 >= abs01, r * s, s)
+        # 否则按 (m11, m01) 求解
+        r = np.where(abs11 >= abs01, m01 / m11, m11 / m01)
+        s = 1 / np.sqrt(1 + r * r)
+        c11 = np.where(abs11 >= abs01, s, r * s)
+        c10 = np.where(abs11 >= abs01, r * s, s)
+    first = abs00 >= abs11
+    coef_u = np.where(first, c01, c11)
+    coef_v = np.where(first, c00, c10)
+    result = coef_u[:, None] * u - coef_v[:, None] * v
+    degenerate = np.where(first, np.maximum(abs00, abs01), np.maximum(abs11, abs01)) == 0
+    return np.where(degenerate[:, None], u, result)
+
+
+def smallest_eigenvectors(cov):
+    """
+    批量求 3×3 对称矩阵最小特征值的单位特征向量，(M, 3, 3) -> (M, 3)。
+    与 open3d estimate_normals 使用的闭式解法相同（Geometric Tools 的 RobustEigenSymmetric3x3），
+    方向与 np.linalg.eigh 一致，符号也与 open3d 的输出一致（eigh 的符号不确定，法向一致性筛选对符号敏感）。
+    全零矩阵（近邻点重合）与 open3d 一样返回 (0, 0, 1)
+    """
+    m = cov.shape[0]
+    out = np.tile(np.array([0.0, 0.0, 1.0]), (m, 1))
+    max_coeff = cov.reshape(m, 9).max(axis=1)
+    nonzero = max_coeff != 0
+    a = cov[nonzero] / max_coeff[nonzero, None, None]
+    norm = a[:, 0, 1] ** 2 + a[:, 0, 2] ** 2 + a[:, 1, 2] ** 2
+
+    # 非对角元全为 0：直接取对角元最小的坐标轴
+    diagonal = norm <= 0
+    d = a[diagonal][:, [0, 1, 2], [0, 1, 2]]
+    axis = np.where((d[:, 0] < d[:, 1]) & (d[:, 0] < d[:, 2]), 0,
+                    np.where((d[:, 1] < d[:, 0]) & (d[:, 1] < d[:, 2]), 1, 2))
+    res = np.zeros((a.shape[0], 3))
+    res[np.flatnonzero(diagonal), axis] = 1.0
+
+    general = np.flatnonzero(~diagonal)
+    g = a[general]
+    q = (g[:, 0, 0] + g[:, 1, 1] + g[:, 2, 2]) / 3
+    b00, b11, b22 = g[:, 0, 0] - q, g[:, 1, 1] - q, g[:, 2, 2] - q
+    a01, a02, a12 = g[:, 0, 1], g[:, 0, 2], g[:, 1, 2]
+    p = np.sqrt((b00 * b00 + b11 * b11 + b22 * b22 + norm[general] * 2) / 6)
+    c00 = b11 * b22 - a12 * a12
+    c01 = a01 * b22 - a12 * a02
+    c02 = a01 * a12 - b11 * a02
+    half_det = np.clip((b00 * c00 - a01 * c01 + a02 * c02) / (p * p * p) * 0.5, -1.0, 1.0)
+    angle = np.arccos(half_det) / 3
+    beta2 = np.cos(angle) * 2
+    beta0 = np.cos(angle + _TWO_THIRDS_PI) * 2
+    beta1 = -(beta0 + beta2)
+    eval0, eval1, eval2 = q + p * beta0, q + p * beta1, q + p * beta2
+
+    # eval0 <= eval1 <= eval2。half_det >= 0 时先求最大特征值的向量，再叉乘得到最小的；
+    # 否则直接求最小特征值的向量，与次小的相等时同样由另两个向量叉乘得到
+    vec = np.empty((general.shape[0], 3))
+    upper = half_det >= 0
+    if upper.any():
+        gu = g[upper]
+        evec2 = _eigenvector0(gu, eval2[upper])
+        evec1 = _eigenvector1(gu, evec2, eval1[upper])
+        vec[upper] = _cross_rows(evec1, evec2)
+    lower = np.flatnonzero(~upper)
+    if lower.shape[0]:
+        gl = g[lower]
+        evec0 = _eigenvector0(gl, eval0[lower])
+        tied = ~((eval0[lower] < eval1[lower]) & (eval0[lower] < eval2[lower]))
+        if tied.any():
+            evec1 = _eigenvector1(gl[tied], evec0[tied], eval1[lower][tied])
+            evec0[tied] = _cross_rows(evec0[tied], evec1)
+        vec[lower] = evec0
+    res[general] = vec
+    out[nonzero] = res
+    return out
+
+
+def neighbor_normals(xyz, neighbors):
+    """
+    由近邻下标 (M, k) 估算 M 个法向：近邻坐标的协方差取最小特征向量，与 open3d estimate_normals 相同
+    """
+    normals = np.empty((neighbors.shape[0], 3), dtype=np.float64)
+    for start in range(0, neighbors.shape[0], _CHUNK_POINTS):
+        nb = xyz[neighbors[start:start + _CHUNK_POINTS]].astype(np.float64)
+        nb -= nb.mean(axis=1, keepdims=True)
+        cov = np.matmul(nb.transpose(0, 2, 1), nb) / nb.shape[1]
+        normals[start:start + _CHUNK_POINTS] = smallest_eigenvectors(cov)
+    return normals
+
+
+def knn_normals(xyz, query_idx=None, knn=DEFAULT_NORMAL_KNN, index=None):
+    """
+    只为 query_idx 处的点估算法向（为空时为全部点），近邻在全部点中查询，结果与对全部点调用
+    open3d estimate_normals(KDTreeSearchParamKNN(knn)) 后取出这些点相同（近邻距离并列时取到的点可能不同）。
+    index 为同一帧的 common.spatial.FrameIndex 时共用其全部点的树
+    """
+    if query_idx is None:
+        query_idx = np.arange(xyz.shape[0])
+    if query_idx.shape[0] == 0 or xyz.shape[0] == 0:
+        return np.zeros((query_idx.shape[0], 3), dtype=np.float64)
+    if index is None:
+        index = FrameIndex(xyz)
+    _, neighbors = index.knn(xyz[query_idx], min(knn, xyz.shape[0]))
+    return neighbor_normals(xyz, neighbors)
+
+
+def cluster_normal_consistency(normals, cluster_labels):
+    """
+    各点法向与所在簇平均法向（簇内求均值后归一化，分母加 1e-8）的余弦相似度，按簇编号分组一次算完，
+    不逐簇循环；噪声点（编号 < 0）为 nan
+    """
+    cos_sim = np.full(cluster_labels.shape[0], np.nan)
+    clustered = cluster_labels >= 0
+    if not clustered.any():
+        return cos_sim
+    ids = cluster_labels[clustered]
+    nrm = normals[clustered]
+    k = ids.max() + 1
+    # bincount 按点序逐个累加，与逐簇 np.mean(axis=0) 的求和顺序相同
+    sums = np.stack([np.bincount(ids, weights=nrm[:, j], minlength=k) for j in range(3)], axis=1)
+    with np.errstate(invalid='ignore'):
+        mean = sums / np.bincount(ids, minlength=k)[:, None]
+    mean /= (np.linalg.norm(mean, axis=1) + 1e-8)[:, None]
+    cos_sim[clustered] = (nrm * mean[ids]).sum(axis=1)
+    return cos_sim
+
+
+def normal_consistency_labels(normals, cluster_labels, cos_threshold, noise_policy='keep', cos_sim=None):
+    """
+    标签2点按法向一致性筛选后的新标签（2 或 0）与逐点余弦：簇内余弦大于 cos_threshold 的保留为 2，其余改为 0；
+    噪声点按 noise_policy（见 NOISE_POLICIES）处理。cos_sim 为已算好的 cluster_normal_consistency 结果时
+    直接使用（参数扫描中同一组聚类和法向只换阈值）
+    """
+    if noise_policy not in NOISE_POLICIES:
+        raise ValueError(f"未知的噪声点处理方式：{noise_policy}，可选 {NOISE_POLICIES}")
+    if cos_sim is None:
+        cos_sim = cluster_normal_consistency(normals, cluster_labels)
+    new_labels = np.where(cos_sim > cos_threshold, 2, 0)
+    if noise_policy == 'keep':
+        new_labels[cluster_labels < 0] = 2
+    return new_labels, cos_sim
+
+
+def label2_normals(xyz, mask2, normal_knn=DEFAULT_NORMAL_KNN, index=None):
+    """
+    标签2点的法向，近邻在全部点中查询（index 为本帧的 FrameIndex 时共用其树），
+    只对标签2点求协方差和特征向量（结果与对全部点估算后取出标签2相同）
+    """
+    with stage('normals', np.count_nonzero(mask2)):
+        return knn_normals(xyz, np.flatnonzero(mask2), normal_knn, index)
+
+
+def print_cluster_consistency(cluster_labels, cos_sim, new_labels, noise_policy='keep'):
+    """
+    逐簇打印余弦范围和保留点数（只用于查看，统计按簇编号分组一次算完）
+    """
+    noise = cluster_labels < 0
+    if noise.any():
+        print(f"簇-1（噪声）: {np.count_nonzero(noise)} 个点" + ("保留为2" if noise_policy == 'keep' else "被设为0"))
+    ids = cluster_labels[~noise]
+    if ids.shape[0] == 0:
+        return
+    k = ids.max() + 1
+    cos_min = np.full(k, np.inf)
+    cos_max = np.full(k, -np.inf)
+    np.minimum.at(cos_min, ids, cos_sim[~noise])
+    np.maximum.at(cos_max, ids, cos_sim[~noise])
+    totals = np.bincount(ids, minlength=k)
+    kept = np.bincount(ids, weights=new_labels[~noise] == 2, minlength=k).astype(int)
+    for clu in range(k):
+        print(f"簇{clu} cos_sim范围: {cos_min[clu]:.3f} ~ {cos_max[clu]:.3f}")
+        print(f"簇{clu} 保留点数: {kept[clu]}, 总点数: {totals[clu]}")
+
+
+def filter_label2_by_normal_cluster(points, normal_knn=DEFAULT_NORMAL_KNN, cos_threshold=0.8, dbscan_eps=0.5,
+                                    dbscan_min_samples=6, index=None, noise_policy='keep', verbose=False):
+    """
+    标签2按 xy 聚成轨道簇，簇内法向与簇平均法向不一致的点改为标签0，噪声点按 noise_policy 保留或改为标签0。
+    improve2.py / improve.py / improve_all.py / pipeline.py 共用，各自传入自己的阈值和 noise_policy。
+    法向只对标签2点估算（见 label2_normals）。
+    xy 聚类与法向近邻都通过本帧的 FrameIndex 查询（index 为空时新建），聚类结果与 sklearn DBSCAN 相同。
+    verbose 时逐簇打印余弦范围和保留点数。就地改写 points 的标签列，
+    返回 (points, 簇编号分布, 处理前标签2点数, 处理后标签2点数)
+    """
+    xyz = points[:, :3]
+    labels = points[:, 3].copy()
+    mask2 = labels == 2
+    if index is None:
+        index = FrameIndex(xyz, labels)
+    num_label2_before = np.sum(mask2)
+    if num_label2_before == 0:
+        return points, None, num_label2_before, num_label2_before
+
+    # 只用xy坐标聚类
+    xy2 = index.points(2, dims=2)
+    with stage('clustering', xy2.shape[0]):
+        cluster_labels = dbscan_labels_exact(xy2, dbscan_eps, dbscan_min_samples, index.tree(2, dims=2))
+    cluster_info = np.unique(cluster_labels, return_counts=True)
+    print(f"聚类簇分布: {cluster_info}")
+
+    # 只估算标签2点的法向量，近邻在所有点中查询
+    normals2 = label2_normals(xyz, mask2, normal_knn, index)
+
+    # 所有轨道簇一次分组筛选
+    with stage('consistency', xy2.shape[0]):
+        new_labels, cos_sim = normal_consistency_labels(normals2, cluster_labels, cos_threshold, noise_policy)
+        labels[mask2] = new_labels
+    if verbose:
+        print_cluster_consistency(cluster_labels, cos_sim, new_labels, noise_policy)
+    points[:, 3] = labels
+    num_label2_after = np.sum(points[:, 3] == 2)
+    return points, cluster_info, num_label2_before, num_label2_after
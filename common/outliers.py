@@ -0,0 +1,108 @@
+import numpy as np
+from common.batch import thread_budget
+from common.spatial import FrameIndex
+
+# 与 open3d remove_statistical_outlier 的常用取值一致
+DEFAULT_NB_NEIGHBORS = 20
+DEFAULT_STD_RATIO = 2.0
+# 一次查询近邻的点数上限，(块大小, k) 的距离常驻内存
+_CHUNK_POINTS = 1 << 16
+
+
+def mean_neighbor_distances(xyz, nb_neighbors=DEFAULT_NB_NEIGHBORS, index=None, label=None):
+    """
+    每个点到其 nb_neighbors 近邻（含自身，点数不足时取全部点）的平均距离。
+    label 不为 None 时 xyz 为 index.points(label)，只在该标签的点中查近邻；查询按 thread_budget() 多线程执行
+    """
+    if index is None:
+        index = FrameIndex(xyz)
+    k = min(nb_neighbors, xyz.shape[0])
+    workers = thread_budget()
+    avg = np.empty(xyz.shape[0], dtype=np.float64)
+    for start in range(0, xyz.shape[0], _CHUNK_POINTS):
+        dist, _ = index.knn(xyz[start:start + _CHUNK_POINTS], k, label, workers=workers)
+        avg[start:start + _CHUNK_POINTS] = dist.mean(axis=1)
+    return avg
+
+
+def statistical_outlier_mask(xyz, nb_neighbors=DEFAULT_NB_NEIGHBORS, std_ratio=DEFAULT_STD_RATIO, index=None,
+                             label=None):
+    """
+    统计滤波的保留掩码，与 open3d remove_statistical_outlier 的规则相同：
+    平均近邻距离的均值（除以全部点数，距离为 0 的点不计入分子）加 std_ratio 倍标准差（只统计距离大于 0 的点，
+    除以 点数-1）为阈值，保留平均距离大于 0 且小于阈值的点（与其近邻全部重合的点也会被去除）。
+    label 同 mean_neighbor_distances
+    """
+    n = xyz.shape[0]
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+    if nb_neighbors < 1 or std_ratio <= 0:
+        raise ValueError(f"nb_neighbors 需不小于 1、std_ratio 需大于 0：{nb_neighbors}, {std_ratio}")
+    avg = mean_neighbor_distances(xyz, nb_neighbors, index, label)
+    positive = avg > 0
+    cloud_mean = avg[positive].sum() / n
+    std_dev = np.sqrt(((avg[positive] - cloud_mean) ** 2).sum() / (n - 1)) if n > 1 else np.nan
+    return positive & (avg < cloud_mean + std_ratio * std_dev)
+
+
+def radius_outlier_mask(xyz, nb_points, radius, index=None, label=None):
+    """
+    半径滤波的保留掩码，与 open3d remove_radius_outlier 的规则相同：距离小于 radius 的点（含自身）多于 nb_points
+    个时保留。label 同 mean_neighbor_distances
+    """
+    if nb_points < 1 or radius <= 0:
+        raise ValueError(f"nb_points 需不小于 1、radius 需大于 0：{nb_points}, {radius}")
+    if index is None:
+        index = FrameIndex(xyz)
+    keep = np.zeros(xyz.shape[0], dtype=bool)
+    k = nb_points + 1
+    if xyz.shape[0] < k:
+        return keep
+    workers = thread_budget()
+    # 半径内多于 nb_points 个点 即 第 nb_points+1 近的点（含自身）在半径内，只需查这一个近邻，稠密区域不必数全邻域。
+    # 与 open3d 一样按 距离² < radius² 判断，查询上界放宽一个浮点间隔，边界上的点交给平方距离取舍
+    bound = np.nextafter(radius, np.inf)
+    for start in range(0, xyz.shape[0], _CHUNK_POINTS):
+        query = np.asarray(xyz[start:start + _CHUNK_POINTS], dtype=np.float64)
+        _, idx = index.knn(query, k, label, distance_upper_bound=bound, workers=workers)
+        found = np.flatnonzero(idx[:, -1] >= 0)
+        diff = np.asarray(index.xyz[idx[found, -1]], dtype=np.float64) - query[found]
+        keep[start + found] = (diff * diff).sum(axis=1) < radius * radius
+    return keep
+
+
+def label_outlier_mask(xyz, labels, label_params, nb_neighbors=DEFAULT_NB_NEIGHBORS, std_ratio=DEFAULT_STD_RATIO,
+                       index=None):
+    """
+    按标签分别滤波的保留掩码：每个标签只在本标签的点中查近邻、统计阈值，稀疏但成片的类别（如标签1吊具）
+    不会因为全帧的距离分布被当作离群点去除。label_params 为 {标签: 参数}：None 表示该标签不过滤，
+    {'nb_neighbors', 'std_ratio'} 为统计滤波（缺的键取函数参数），{'nb_points', 'radius'} 为半径滤波；
+    未列出的标签按 nb_neighbors / std_ratio 统计滤波
+    """
+    if index is None:
+        index = FrameIndex(xyz, labels)
+    keep = np.zeros(xyz.shape[0], dtype=bool)
+    for label in np.unique(labels):
+        params = label_params.get(label, {})
+        idx = index.indices(label)
+        if params is None:
+            keep[idx] = True
+        elif 'radius' in params:
+            keep[idx] = radius_outlier_mask(index.points(label), params['nb_points'], params['radius'], index, label)
+        else:
+            keep[idx] = statistical_outlier_mask(index.points(label), params.get('nb_neighbors', nb_neighbors),
+                                                 params.get('std_ratio', std_ratio), index, label)
+    return keep
+
+
+def outlier_keep_indices(xyz, labels=None, label_params=None, nb_neighbors=DEFAULT_NB_NEIGHBORS,
+                         std_ratio=DEFAULT_STD_RATIO, index=None):
+    """
+    离群点滤波后保留的点的下标（升序，对应 open3d remove_*_outlier 返回的 ind）：
+    label_params 为 None 时对全部点统计滤波（与 open3d 默认用法相同），否则按 label_outlier_mask 分标签滤波
+    """
+    if label_params is None:
+        keep = statistical_outlier_mask(xyz, nb_neighbors, std_ratio, index)
+    else:
+        keep = label_outlier_mask(xyz, labels, label_params, nb_neighbors, std_ratio, index)
+    return np.flatnonzero(keep)
@@ -0,0 +1,541 @@
+import struct
+import numpy as np
+
+try:
+    import lzf
+except ImportError:
+    lzf = None
+
+from common.profiling import stage
+
+# PCD TYPE/SIZE 到 numpy 类型的映射
+PCD_TYPE_MAP = {
+    ('F', 4): np.float32, ('F', 8): np.float64,
+    ('I', 1): np.int8, ('I', 2): np.int16, ('I', 4): np.int32, ('I', 8): np.int64,
+    ('U', 1): np.uint8, ('U', 2): np.uint16, ('U', 4): np.uint32, ('U', 8): np.uint64,
+}
+
+# 支持的 DATA 格式
+PCD_DATA_FORMATS = ('ascii', 'binary', 'binary_compressed')
+
+# ASCII 浮点字段解析后的类型，与 SIZE 无关
+ASCII_FLOAT_DTYPE = np.float64
+
+# read_pcd 使用的解析缓存，默认关闭
+_frame_cache = None
+
+# 写文件的后台队列（见 common.prefetch.AsyncWriter），默认同步写出
+_async_writer = None
+
+# 标签字段的候选名（我们的数据把语义标签存在 intensity 里）
+LABEL_FIELDS = ('label', 'intensity')
+
+
+def parse_pcd_header(f):
+    """
+    从二进制文件对象中解析 PCD 头部，读到 DATA 行为止。
+    返回头部字典，f 停在数据块起始位置。
+    """
+    header = {'lines': []}
+    while True:
+        raw = f.readline()
+        if not raw:
+            raise ValueError("PCD 头部缺少 DATA 行")
+        line = raw.decode('ascii', errors='replace')
+        header['lines'].append(line)
+        parts = line.split()
+        if not parts or parts[0].startswith('#'):
+            continue
+        key, values = parts[0].upper(), parts[1:]
+        if key == 'VERSION':
+            header['version'] = values[0] if values else ''
+        elif key == 'FIELDS':
+            header['fields'] = values
+        elif key == 'SIZE':
+            header['size'] = [int(v) for v in values]
+        elif key == 'TYPE':
+            header['type'] = [v.upper() for v in values]
+        elif key == 'COUNT':
+            header['count'] = [int(v) for v in values]
+        elif key in ('WIDTH', 'HEIGHT', 'POINTS'):
+            header[key.lower()] = int(values[0])
+        elif key == 'VIEWPOINT':
+            header['viewpoint'] = [float(v) for v in values]
+        elif key == 'DATA':
+            header['data'] = values[0].lower()
+            break
+
+    if 'fields' not in header:
+        raise ValueError("PCD 头部缺少 FIELDS 行")
+    n_fields = len(header['fields'])
+    header.setdefault('size', [4] * n_fields)
+    header.setdefault('type', ['F'] * n_fields)
+    header.setdefault('count', [1] * n_fields)
+    if not len(header['size']) == len(header['type']) == len(header['count']) == n_fields:
+        raise ValueError("PCD 头部 FIELDS/SIZE/TYPE/COUNT 数量不一致")
+    header.setdefault('height', 1)
+    if 'points' not in header:
+        header['points'] = header.get('width', 0) * header['height']
+    header.setdefault('width', header['points'])
+    header['data_offset'] = f.tell()
+    return header
+
+
+def pcd_dtype(header, float_dtype=None):
+    """
+    根据头部的 FIELDS/SIZE/TYPE/COUNT 构造结构化 dtype；float_dtype 不为空时浮点字段一律用该类型
+    """
+    descr = []
+    for name, size, type_, count in zip(header['fields'], header['size'], header['type'], header['count']):
+        try:
+            base = PCD_TYPE_MAP[(type_, size)]
+        except KeyError:
+            raise ValueError(f"不支持的 PCD 字段类型: {name} TYPE={type_} SIZE={size}")
+        if float_dtype is not None and type_ == 'F':
+            base = float_dtype
+        descr.append((name, base) if count == 1 else (name, base, (count,)))
+    return np.dtype(descr)
+
+
+def pcd_read_dtype(header):
+    """
+    读取后结构化数组的 dtype：binary / binary_compressed 与文件中存放的一致；
+    ascii 的浮点字段按 float64 解析（与原来逐行 float() 解析的精度相同，不因 SIZE 4 截断为 float32）
+    """
+    return pcd_dtype(header, ASCII_FLOAT_DTYPE if header['data'] == 'ascii' else None)
+
+
+def _parse_ascii(buf, header, dtype):
+    """
+    一次性把 ASCII 数据块解析为数值，再按列写入结构化数组
+    """
+    n_cols = sum(header['count'])
+    values = np.fromstring(buf, dtype=np.float64, sep=' ')
+    if values.size % n_cols != 0:
+        raise ValueError(f"ASCII 数据块的数值个数 {values.size} 不是列数 {n_cols} 的整数倍")
+    values = values.reshape(-1, n_cols)
+
+    data = np.empty(values.shape[0], dtype=dtype)
+    col = 0
+    for name, count in zip(header['fields'], header['count']):
+        if count == 1:
+            data[name] = values[:, col]
+        else:
+            data[name] = values[:, col:col + count]
+        col += count
+    return data
+
+
+def _require_lzf():
+    if lzf is None:
+        raise ImportError("binary_compressed 需要 python-lzf：pip install python-lzf")
+
+
+def _parse_binary_compressed(buf, header, dtype):
+    """
+    解压 LZF 数据块；解压后按字段连续存放（SoA），逐字段拷回结构化数组
+    """
+    compressed_size, uncompressed_size = struct.unpack('<II', buf[:8])
+    num_points = header['points']
+    data = np.empty(num_points, dtype=dtype)
+    if num_points == 0:
+        return data
+    _require_lzf()
+    raw = lzf.decompress(buf[8:8 + compressed_size], uncompressed_size)
+    if raw is None or len(raw) != dtype.itemsize * num_points:
+        raise ValueError("binary_compressed 数据块解压后大小不符")
+    offset = 0
+    for name in dtype.names:
+        field = dtype.fields[name][0]
+        nbytes = field.itemsize * num_points
+        data[name] = np.frombuffer(raw, dtype=field.base, count=nbytes // field.base.itemsize,
+                                   offset=offset).reshape((num_points,) + field.shape)
+        offset += nbytes
+    return data
+
+
+def set_frame_cache(cache):
+    """
+    设置 read_pcd 使用的解析缓存（见 common.frame_cache），传 None 关闭
+    """
+    global _frame_cache
+    _frame_cache = cache
+
+
+def read_pcd(file_path):
+    """
+    读取 PCD 文件，返回 (头部字典, 结构化数组)；启用了解析缓存时优先从缓存加载。
+    ascii 的浮点字段为 float64（见 pcd_read_dtype），需要其他类型时由 read_pcd_points 等的 dtype 参数转换
+    """
+    # 预读时在后台线程解析，这里记录的是调用方实际等待的时间
+    with stage('read') as s:
+        if _frame_cache is not None:
+            header, data = _frame_cache.load(file_path, _read_pcd_file)
+        else:
+            header, data = _read_pcd_file(file_path)
+        s.points_out = data.shape[0]
+    return header, data
+
+
+def _read_pcd_file(file_path):
+    with open(file_path, 'rb') as f:
+        header = parse_pcd_header(f)
+        dtype = pcd_read_dtype(header)
+        if header['data'] == 'ascii':
+            data = _parse_ascii(f.read(), header, dtype)
+        elif header['data'] == 'binary':
+            data = np.fromfile(f, dtype=dtype, count=header['points'])
+            if data.shape[0] != header['points']:
+                raise ValueError(f"binary 数据块不完整: 期望 {header['points']} 点，实际 {data.shape[0]} 点")
+        elif header['data'] == 'binary_compressed':
+            data = _parse_binary_compressed(f.read(), header, dtype)
+        else:
+            raise ValueError(f"不支持的 PCD DATA 格式: {header['data']}")
+    return header, data
+
+
+def get_label_field(header):
+    """
+    返回存放语义标签的字段名，优先 label，其次 intensity，否则取最后一个字段
+    """
+    for name in LABEL_FIELDS:
+        if name in header['fields']:
+            return name
+    return header['fields'][-1]
+
+
+def pcd_to_array(data, fields=None, dtype=np.float64):
+    """
+    把结构化数组的若干标量字段拼成 (N, k) 的普通数组
+    """
+    if fields is None:
+        fields = data.dtype.names
+    out = np.empty((data.shape[0], len(fields)), dtype=dtype)
+    for i, name in enumerate(fields):
+        out[:, i] = data[name]
+    return out
+
+
+def read_pcd_xyz_label(file_path, xyz_dtype=np.float64, label_dtype=np.int64):
+    """
+    读取 PCD，返回 (头部字典, xyz (N, 3), 标签 (N,))
+    """
+    header, data = read_pcd(file_path)
+    xyz = pcd_to_array(data, ('x', 'y', 'z'), dtype=xyz_dtype)
+    labels = data[get_label_field(header)].astype(label_dtype)
+    return header, xyz, labels
+
+
+def read_pcd_points(file_path, dtype=np.float64):
+    """
+    读取 PCD，返回 (头部字典, (N, 4) 数组)，列为 x, y, z, 标签
+    """
+    header, data = read_pcd(file_path)
+    points = pcd_to_array(data, ('x', 'y', 'z', get_label_field(header)), dtype=dtype)
+    return header, points
+
+
+def pcd_field_type(dtype):
+    """
+    numpy 标量类型 -> (PCD TYPE, SIZE)
+    """
+    dtype = np.dtype(dtype)
+    type_ = {'f': 'F', 'i': 'I', 'u': 'U'}.get(dtype.kind)
+    if (type_, dtype.itemsize) not in PCD_TYPE_MAP:
+        raise ValueError(f"无法写入 PCD 的字段类型: {dtype}")
+    return type_, dtype.itemsize
+
+
+def make_pcd_header(dtype, num_points, data_format='ascii', viewpoint=None):
+    """
+    根据结构化 dtype 生成 PCD 头部文本（不再拷贝、修补原文件头）
+    """
+    if data_format not in PCD_DATA_FORMATS:
+        raise ValueError(f"不支持的 PCD DATA 格式: {data_format}")
+    sizes, types, counts = [], [], []
+    for name in dtype.names:
+        field = dtype.fields[name][0]
+        type_, size = pcd_field_type(field.base)
+        types.append(type_)
+        sizes.append(str(size))
+        counts.append(str(_field_count(dtype, name)))
+    if viewpoint is None:
+        viewpoint = [0, 0, 0, 1, 0, 0, 0]
+    return (
+        "# .PCD v0.7 - Point Cloud Data file format\n"
+        "VERSION 0.7\n"
+        f"FIELDS {' '.join(dtype.names)}\n"
+        f"SIZE {' '.join(sizes)}\n"
+        f"TYPE {' '.join(types)}\n"
+        f"COUNT {' '.join(counts)}\n"
+        f"WIDTH {num_points}\n"
+        "HEIGHT 1\n"
+        f"VIEWPOINT {' '.join(f'{v:g}' for v in viewpoint)}\n"
+        f"POINTS {num_points}\n"
+        f"DATA {data_format}\n"
+    )
+
+
+def xyz_label_dtype(header=None):
+    """
+    x, y, z, 标签 的结构化 dtype。
+    给定源文件头部时沿用其坐标类型和标签字段名，否则为 x y z intensity (F F F I)
+    """
+    xyz_type, label_field, label_type = np.float32, 'intensity', np.int32
+    if header is not None:
+        src = pcd_dtype(header)
+        xyz_type = src['x']
+        label_field = get_label_field(header)
+        if src[label_field].kind in 'iu':
+            label_type = src[label_field]
+    return np.dtype([('x', xyz_type), ('y', xyz_type), ('z', xyz_type), (label_field, label_type)])
+
+
+def xyz_label_to_structured(xyz, labels, header=None):
+    """
+    把 xyz (N, 3) 和标签 (N,) 组合为结构化数组
+    """
+    dtype = xyz_label_dtype(header)
+    data = np.empty(xyz.shape[0], dtype=dtype)
+    data['x'] = xyz[:, 0]
+    data['y'] = xyz[:, 1]
+    data['z'] = xyz[:, 2]
+    data[dtype.names[3]] = np.asarray(labels).reshape(-1)
+    return data
+
+
+def _field_count(dtype, name):
+    field = dtype.fields[name][0]
+    return int(np.prod(field.shape)) if field.shape else 1
+
+
+# ASCII 输出：浮点保留 6 位小数，整数按 %d；分块格式化以限制临时内存
+ASCII_FLOAT_DECIMALS = 6
+ASCII_CHUNK_POINTS = 1 << 18
+_FIXED_POINT_LIMIT = 1e12
+
+
+def _digit_chars(mag, width):
+    """
+    非负整数 -> (n, width) 的右对齐十进制字符矩阵，以及去掉前导零后的有效位掩码
+    """
+    powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    chars = (mag[:, None] // powers % 10).astype(np.uint8) + ord('0')
+    n_digits = np.ones(mag.shape[0], dtype=np.int64)
+    for k in range(1, width):
+        n_digits += mag >= 10 ** k
+    valid = np.arange(width) >= (width - n_digits)[:, None]
+    return chars, valid
+
+
+def _format_column_fallback(values, kind):
+    """
+    含 NaN/Inf 或超出定点范围时，逐元素格式化为定长字节矩阵
+    """
+    fmt = f'%.{ASCII_FLOAT_DECIMALS}f' if kind == 'f' else '%d'
+    text = np.char.mod(fmt, values).astype('S')
+    chars = text.view(np.uint8).reshape(values.shape[0], -1)
+    return chars, chars != 0
+
+
+def _fixed_point(magnitude):
+    """
+    非负浮点数 -> 保留 ASCII_FLOAT_DECIMALS 位小数的 (整数部分, 小数部分)，舍入与 %.6f 相同。
+    放大后用 np.rint 取整；乘法本身有舍入误差，放大值与 .5 的距离在误差以内（以及超出 2^53、
+    不再能精确表示整数）的少数元素改用 %.6f 逐个格式化后取回，避免与 printf 按精确十进制值舍入的结果差一位
+    """
+    scaled = magnitude * 10 ** ASCII_FLOAT_DECIMALS
+    rounded = np.rint(scaled)
+    ambiguous = (np.abs(np.abs(scaled - rounded) - 0.5) <= np.spacing(scaled)) | (scaled >= 2.0 ** 53)
+    int_part, frac = np.divmod(rounded.astype(np.int64), 10 ** ASCII_FLOAT_DECIMALS)
+    for i in np.flatnonzero(ambiguous):
+        text_int, text_frac = (f'%.{ASCII_FLOAT_DECIMALS}f' % magnitude[i]).split('.')
+        int_part[i], frac[i] = int(text_int), int(text_frac)
+    return int_part, frac
+
+
+def _format_column(values, kind):
+    """
+    把一列数值向量化地格式化为字符矩阵 + 有效字符掩码（与 %.6f / %d 的输出逐字节一致）
+    """
+    n = values.shape[0]
+    if kind == 'f':
+        values = values.astype(np.float64, copy=False)
+        if not np.all(np.isfinite(values)) or (n and np.abs(values).max() >= _FIXED_POINT_LIMIT):
+            return _format_column_fallback(values, kind)
+        sign = np.signbit(values)
+        int_part, frac = _fixed_point(np.abs(values))
+    else:
+        values = values.astype(np.int64, copy=False)
+        sign = values < 0
+        int_part, frac = np.abs(values), None
+
+    width = len(str(int(int_part.max()))) if n else 1
+    digits, digits_valid = _digit_chars(int_part, width)
+    chars = [np.full((n, 1), ord('-'), dtype=np.uint8), digits]
+    valid = [sign[:, None], digits_valid]
+    if frac is not None:
+        frac_digits, _ = _digit_chars(frac, ASCII_FLOAT_DECIMALS)
+        chars += [np.full((n, 1), ord('.'), dtype=np.uint8), frac_digits]
+        valid += [np.ones((n, 1 + ASCII_FLOAT_DECIMALS), dtype=bool)]
+    return np.hstack(chars), np.hstack(valid)
+
+
+def _format_ascii_block(columns, kinds):
+    """
+    一块点一次性格式化：拼接所有列的字符矩阵后按掩码压缩，行优先顺序即输出顺序
+    """
+    n = columns[0].shape[0]
+    chars, valid = [], []
+    for values, kind in zip(columns, kinds):
+        values = values.reshape(n, -1)
+        for j in range(values.shape[1]):
+            if chars:
+                chars.append(np.full((n, 1), ord(' '), dtype=np.uint8))
+                valid.append(np.ones((n, 1), dtype=bool))
+            c, v = _format_column(values[:, j], kind)
+            chars.append(c)
+            valid.append(v)
+    chars.append(np.full((n, 1), ord('\n'), dtype=np.uint8))
+    valid.append(np.ones((n, 1), dtype=bool))
+    return np.hstack(chars)[np.hstack(valid)].tobytes()
+
+
+def _encode_ascii(columns, dtype, mask):
+    kinds = [dtype.fields[name][0].base.kind for name in dtype.names]
+    n = columns[0].shape[0]
+    chunks = []
+    for start in range(0, n, ASCII_CHUNK_POINTS):
+        stop = min(start + ASCII_CHUNK_POINTS, n)
+        if mask is None:
+            block = [values[start:stop] for values in columns]
+        else:
+            block = [np.compress(mask[start:stop], values[start:stop], axis=0) for values in columns]
+        chunks.append(_format_ascii_block(block, kinds))
+    return chunks
+
+
+def _fill_field(out, values, mask):
+    if mask is None:
+        out[...] = values.reshape(out.shape)
+    elif np.can_cast(values.dtype, out.dtype, 'safe'):
+        np.compress(mask, values, axis=0, out=out)
+    else:
+        # 需要截断转换（如浮点标签 -> 整型字段）时只能先收集这一列
+        out[...] = np.compress(mask, values, axis=0).reshape(out.shape)
+
+
+def _encode_binary(columns, dtype, mask, num_points):
+    """
+    把各列直接写入记录布局（AoS）的输出缓冲区，带掩码时用 np.compress 原地收集
+    """
+    buf = bytearray(dtype.itemsize * num_points)
+    records = np.frombuffer(buf, dtype=dtype, count=num_points)
+    for name, values in zip(dtype.names, columns):
+        _fill_field(records[name], values, mask)
+    return [buf]
+
+
+def _encode_binary_compressed(columns, dtype, mask, num_points):
+    """
+    按字段连续存放（SoA）后 LZF 压缩，前置压缩/原始大小
+    """
+    if num_points == 0:
+        return [struct.pack('<II', 0, 0)]
+    _require_lzf()
+    raw = bytearray(dtype.itemsize * num_points)
+    offset = 0
+    for name, values in zip(dtype.names, columns):
+        field = dtype.fields[name][0]
+        out = np.frombuffer(raw, dtype=field.base, count=num_points * _field_count(dtype, name),
+                            offset=offset).reshape((num_points,) + field.shape)
+        _fill_field(out, values, mask)
+        offset += field.itemsize * num_points
+    raw = bytes(raw)
+    compressed = lzf.compress(raw, len(raw) + len(raw) // 16 + 64)
+    return [struct.pack('<II', len(compressed), len(raw)), compressed]
+
+
+def _encode_body(columns, dtype, data_format, mask, num_points):
+    if data_format == 'ascii':
+        return _encode_ascii(columns, dtype, mask)
+    if data_format == 'binary':
+        return _encode_binary(columns, dtype, mask, num_points)
+    return _encode_binary_compressed(columns, dtype, mask, num_points)
+
+
+def _write_columns(file_path, columns, dtype, data_format, viewpoint, mask):
+    """
+    生成完整文件内容后一次写出
+    """
+    if mask is not None:
+        mask = np.asarray(mask, dtype=bool)
+        num_points = int(np.count_nonzero(mask))
+    else:
+        num_points = columns[0].shape[0]
+    with stage('write', num_points):
+        header = make_pcd_header(dtype, num_points, data_format, viewpoint).encode('ascii')
+        body = _encode_body(columns, dtype, data_format, mask, num_points)
+        write_file_bytes(file_path, [header] + body)
+
+
+def set_async_writer(writer):
+    """
+    设置后台写队列，之后 write_file_bytes（以及所有 write_pcd*）只编码不等待磁盘；传 None 恢复同步写出
+    """
+    global _async_writer
+    _async_writer = writer
+
+
+def write_file_bytes(file_path, pieces):
+    """
+    把字节片段写成一个文件；设置了后台写队列时交给队列后立即返回
+    """
+    if _async_writer is not None:
+        _async_writer.submit(file_path, pieces)
+    else:
+        _write_pieces(file_path, pieces)
+
+
+def _write_pieces(file_path, pieces):
+    with open(file_path, 'wb') as f:
+        f.write(b''.join(pieces))
+
+
+def encode_pcd_body(data, data_format='ascii', mask=None):
+    """
+    把结构化数组编码为数据块（不含头部），返回字节片段列表，供分块写出使用
+    """
+    if mask is not None:
+        mask = np.asarray(mask, dtype=bool)
+        num_points = int(np.count_nonzero(mask))
+    else:
+        num_points = data.shape[0]
+    columns = [data[name] for name in data.dtype.names]
+    return _encode_body(columns, data.dtype, data_format, mask, num_points)
+
+
+def write_pcd(file_path, data, data_format='ascii', viewpoint=None, mask=None):
+    """
+    写入 PCD 文件，data 为结构化数组，头部由 dtype 重新生成。
+    data_format 为 ascii / binary / binary_compressed；mask 为布尔数组时只写入选中的点，不生成过滤后的副本
+    """
+    columns = [data[name] for name in data.dtype.names]
+    _write_columns(file_path, columns, data.dtype, data_format, viewpoint, mask)
+
+
+def write_pcd_xyz_label(file_path, xyz, labels, header=None, data_format='ascii', mask=None):
+    """
+    写入 xyz (N, 3) 和标签 (N,)，字段类型见 xyz_label_dtype；各列直接写出，不先组合成结构化数组
+    """
+    dtype = xyz_label_dtype(header)
+    viewpoint = header.get('viewpoint') if header else None
+    columns = [xyz[:, 0], xyz[:, 1], xyz[:, 2], np.asarray(labels).reshape(-1)]
+    _write_columns(file_path, columns, dtype, data_format, viewpoint, mask)
+
+
+def write_pcd_points(file_path, points, header=None, data_format='ascii', mask=None):
+    """
+    写入 (N, 4) 的 x, y, z, 标签数组
+    """
+    write_pcd_xyz_label(file_path, points[:, :3], points[:, 3], header, data_format, mask)
@@ -0,0 +1,128 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+
+from common.pcd_io import (parse_pcd_header, pcd_read_dtype, make_pcd_header, encode_pcd_body, _parse_ascii,
+                           _parse_binary_compressed)
+
+DEFAULT_CHUNK_POINTS = 1 << 16
+# ASCII 每次读取的字节数按每行约 40 字节估算
+_ASCII_BYTES_PER_POINT = 40
+
+
+def open_pcd_stream(file_path, chunk_points=DEFAULT_CHUNK_POINTS):
+    """
+    流式读取 PCD：立即返回头部，以及按 chunk_points 个点分块产出结构化数组的生成器。
+    ascii / binary 任意时刻只保留一块数据；binary_compressed 是整块 LZF，只能整体解压后再分块
+    """
+    with open(file_path, 'rb') as f:
+        header = parse_pcd_header(f)
+    return header, _iter_chunks(file_path, header, chunk_points)
+
+
+def iter_pcd_chunks(file_path, chunk_points=DEFAULT_CHUNK_POINTS):
+    """
+    只需要数据块时的简写
+    """
+    return open_pcd_stream(file_path, chunk_points)[1]
+
+
+def _iter_chunks(file_path, header, chunk_points):
+    dtype = pcd_read_dtype(header)
+    with open(file_path, 'rb') as f:
+        f.seek(header['data_offset'])
+        if header['data'] == 'binary':
+            remaining = header['points']
+            while remaining > 0:
+                chunk = np.fromfile(f, dtype=dtype, count=min(chunk_points, remaining))
+                if chunk.shape[0] == 0:
+                    raise ValueError(f"binary 数据块不完整: 还差 {remaining} 点")
+                remaining -= chunk.shape[0]
+                yield chunk
+        elif header['data'] == 'ascii':
+            yield from _iter_ascii_chunks(f, header, dtype, chunk_points)
+        elif header['data'] == 'binary_compressed':
+            data = _parse_binary_compressed(f.read(), header, dtype)
+            for start in range(0, data.shape[0], chunk_points):
+                yield data[start:start + chunk_points]
+        else:
+            raise ValueError(f"不支持的 PCD DATA 格式: {header['data']}")
+
+
+def _iter_ascii_chunks(f, header, dtype, chunk_points):
+    """
+    按固定字节数读取，在最后一个换行处截断后整块解析，不完整的行留到下一次
+    """
+    block_bytes = chunk_points * _ASCII_BYTES_PER_POINT
+    tail = b''
+    pending, pending_count = [], 0
+    eof = False
+    while not eof:
+        buf = f.read(block_bytes)
+        if buf:
+            buf = tail + buf
+            cut = buf.rfind(b'\n') + 1
+            buf, tail = buf[:cut], buf[cut:]
+        else:
+            buf, tail, eof = tail, b'', True
+        if buf.strip():
+            parsed = _parse_ascii(buf, header, dtype)
+            pending.append(parsed)
+            pending_count += parsed.shape[0]
+        while pending_count >= chunk_points or (eof and pending_count > 0):
+            merged = np.concatenate(pending) if len(pending) > 1 else pending[0]
+            yield merged[:chunk_points]
+            rest = merged[chunk_points:]
+            pending, pending_count = ([rest], rest.shape[0]) if rest.shape[0] else ([], 0)
+
+
+class PCDStreamWriter:
+    """
+    分块写出 PCD。数据块先写入同目录的临时文件，close 时按最终点数生成头部再拼接，
+    因此不需要预先知道点数。binary_compressed 是整块压缩，不支持分块写出
+    """
+
+    def __init__(self, file_path, dtype, data_format='ascii', viewpoint=None):
+        if data_format not in ('ascii', 'binary'):
+            raise ValueError(f"分块写出只支持 ascii / binary，不支持 {data_format}")
+        self.file_path = file_path
+        self.dtype = np.dtype(dtype)
+        self.data_format = data_format
+        self.viewpoint = viewpoint
+        self.num_points = 0
+        out_dir = os.path.dirname(os.path.abspath(file_path))
+        self._body = tempfile.NamedTemporaryFile(dir=out_dir, suffix='.part', delete=False)
+
+    def write(self, chunk, mask=None):
+        """
+        追加一块点，mask 为布尔数组时只写入选中的点；字段按位置对应到 dtype
+        """
+        if chunk.dtype != self.dtype:
+            chunk = chunk.astype(self.dtype)
+        self._body.writelines(encode_pcd_body(chunk, self.data_format, mask))
+        self.num_points += chunk.shape[0] if mask is None else int(np.count_nonzero(mask))
+
+    def close(self):
+        header = make_pcd_header(self.dtype, self.num_points, self.data_format, self.viewpoint)
+        try:
+            self._body.seek(0)
+            with open(self.file_path, 'wb') as f:
+                f.write(header.encode('ascii'))
+                shutil.copyfileobj(self._body, f, 1 << 20)
+        finally:
+            self._discard()
+
+    def _discard(self):
+        self._body.close()
+        if os.path.exists(self._body.name):
+            os.remove(self._body.name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._discard()
@@ -0,0 +1,84 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from common import pcd_io
+
+# 默认提前读取的帧数，也是后台写队列中未完成写入的上限
+DEFAULT_PREFETCH_DEPTH = 2
+
+
+class FramePrefetcher:
+    """
+    用后台线程提前读取并解析接下来的 PCD 帧。实现与 FrameCache 相同的 load(file_path, parse) 接口，
+    用 pcd_io.set_frame_cache 安装后 read_pcd 对已预取的文件直接取结果；原来的解析缓存作为 inner 继续使用
+    """
+
+    def __init__(self, depth=DEFAULT_PREFETCH_DEPTH, inner=None):
+        self.depth = depth
+        self.inner = inner
+        self._executor = ThreadPoolExecutor(max_workers=max(depth, 1), thread_name_prefix='pcd-prefetch')
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def _parse(self, file_path):
+        if self.inner is not None:
+            return self.inner.load(file_path, pcd_io._read_pcd_file)
+        return pcd_io._read_pcd_file(file_path)
+
+    def schedule(self, paths):
+        """
+        保证 paths 中的文件都在预取，不在其中的预取结果丢弃（内存中最多 len(paths) 帧）
+        """
+        wanted = [os.path.abspath(p) for p in paths]
+        with self._lock:
+            for key in list(self._futures):
+                if key not in wanted:
+                    self._futures.pop(key).cancel()
+            for key in wanted:
+                if key not in self._futures:
+                    self._futures[key] = self._executor.submit(self._parse, key)
+
+    def load(self, file_path, parse):
+        with self._lock:
+            future = self._futures.pop(os.path.abspath(file_path), None)
+        if future is None:
+            return self.inner.load(file_path, parse) if self.inner is not None else parse(file_path)
+        # 读取出错时异常在这里抛出，和同步读取一样由调用方处理
+        return future.result()
+
+    def close(self):
+        with self._lock:
+            for future in self._futures.values():
+                future.cancel()
+            self._futures.clear()
+        self._executor.shutdown(wait=True)
+
+
+class AsyncWriter:
+    """
+    单个后台线程按提交顺序写文件。未完成的写入最多 max_pending 个，超过时 submit 阻塞，
+    待写数据占用的内存有上限；take_submitted 取出一个任务期间提交的写入，用于等待它们落盘
+    """
+
+    def __init__(self, max_pending=DEFAULT_PREFETCH_DEPTH):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pcd-writer')
+        self._slots = threading.BoundedSemaphore(max(max_pending, 1))
+        self._submitted = []
+
+    def submit(self, file_path, pieces):
+        self._slots.acquire()
+        future = self._executor.submit(pcd_io._write_pieces, file_path, pieces)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._submitted.append(future)
+        return future
+
+    def take_submitted(self):
+        """
+        返回并清空上次调用以来提交的写入
+        """
+        submitted, self._submitted = self._submitted, []
+        return submitted
+
+    def close(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,329 @@
+import os
+import json
+import time
+import threading
+import numpy as np
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# 当前进程的记录器，未启用时为 None，stage() 直接返回空操作对象
+_recorder = None
+
+
+class _NullStage:
+    """
+    未启用时 stage() / frame() 返回的共享空对象，不计时也不记录
+    """
+    points_in = None
+    points_out = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def _process_peak_rss_mb():
+    """
+    进程启动以来的峰值 RSS（ru_maxrss）：只增不减，最大的一帧之后每条记录都是同一个值，只能看整个进程。
+    清零 VmHWM 也会清掉 ru_maxrss，因此再与每次清零前读到的 VmHWM 取最大
+    """
+    if resource is None:
+        return None
+    # Linux 上 ru_maxrss 单位为 KB
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    return max(peak, _hwm_before_reset)
+
+
+try:
+    _PAGE_MB = os.sysconf('SC_PAGE_SIZE') / (1024.0 * 1024.0)
+except (AttributeError, ValueError, OSError):
+    _PAGE_MB = None
+
+
+def _current_rss_mb():
+    """
+    当前 RSS（/proc/self/statm 第二列，单位为页），不支持的平台返回 None
+    """
+    if _PAGE_MB is None:
+        return None
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * _PAGE_MB
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _read_hwm_mb():
+    """
+    /proc/self/status 中的 VmHWM（上次清零以来的峰值 RSS，单位 KB），读不到时返回 None
+    """
+    try:
+        with open('/proc/self/status', 'rb') as f:
+            for line in f:
+                if line.startswith(b'VmHWM:'):
+                    return int(line.split()[1]) / 1024.0
+    except (OSError, IndexError, ValueError):
+        pass
+    return None
+
+
+def _reset_hwm():
+    """
+    向 /proc/self/clear_refs 写入 5，把 VmHWM 重置为当前 RSS（Linux 4.0+），不支持时返回 False
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+# 进程内正在进行的 stage；VmHWM 是整个进程的，某个 stage 清零前先把当前峰值并入所有进行中的 stage
+_active_stages = set()
+_active_lock = threading.Lock()
+_hwm_supported = None
+# 历次清零前读到的 VmHWM 的最大值
+_hwm_before_reset = 0.0
+
+
+def _enter_peak(current):
+    """
+    stage 进入时调用：清零 VmHWM 并登记 current，返回是否支持逐 stage 峰值
+    """
+    global _hwm_supported, _hwm_before_reset
+    with _active_lock:
+        if _hwm_supported is False:
+            return False
+        hwm = _read_hwm_mb()
+        if hwm is not None:
+            for s in _active_stages:
+                s._peak = max(s._peak, hwm)
+            _hwm_before_reset = max(_hwm_before_reset, hwm)
+        if hwm is None or not _reset_hwm():
+            _hwm_supported = False
+            return False
+        _hwm_supported = True
+        current._peak = 0.0
+        _active_stages.add(current)
+        return True
+
+
+def _exit_peak(current):
+    """
+    stage 退出时调用：返回进入以来的峰值 RSS（MB）
+    """
+    with _active_lock:
+        _active_stages.discard(current)
+        hwm = _read_hwm_mb()
+        return max(current._peak, hwm) if hwm is not None else None
+
+
+class _Stage:
+    __slots__ = ('recorder', 'name', 'frame', 'points_in', 'points_out', '_wall', '_cpu', '_rss', '_peak',
+                 '_track_peak')
+
+    def __init__(self, recorder, name, frame, points_in):
+        self.recorder = recorder
+        self.name = name
+        self.frame = frame
+        self.points_in = points_in
+        self.points_out = None
+
+    def __enter__(self):
+        self._track_peak = _enter_peak(self)
+        self._rss = _current_rss_mb()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        rss_end = _current_rss_mb()
+        peak = _exit_peak(self) if self._track_peak else None
+        self.recorder.add({
+            'run': self.recorder.run_id,
+            'pid': os.getpid(),
+            'frame': self.frame if self.frame is not None else self.recorder.frame,
+            'stage': self.name,
+            'wall_s': wall,
+            'cpu_s': cpu,
+            'rss_start_mb': self._rss,
+            'rss_end_mb': rss_end,
+            'rss_delta_mb': rss_end - self._rss if rss_end is not None and self._rss is not None else None,
+            'peak_rss_mb': peak,
+            'process_peak_rss_mb': _process_peak_rss_mb(),
+            'points_in': _as_int(self.points_in),
+            'points_out': _as_int(self.points_out),
+            'ok': exc_type is None,
+        })
+        return False
+
+
+class _Frame(_Stage):
+    """
+    一帧的总耗时，记为 stage 'total'；期间的 stage 记录都归到这一帧
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        self.recorder.frame = self.frame
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        super().__exit__(exc_type, exc, tb)
+        self.recorder.frame = None
+        self.recorder.flush()
+        return False
+
+
+def _as_int(value):
+    return None if value is None else int(value)
+
+
+class Recorder:
+    """
+    记录 stage 的墙钟时间、CPU 时间（含进程内所有线程）、输入/输出点数，以及内存：
+    rss_start_mb / rss_end_mb 为进入和退出 stage 时的当前 RSS，rss_delta_mb 为两者之差（stage 结束后仍占用的增量，
+    stage 内部的瞬时峰值看不到）；peak_rss_mb 为本 stage 期间的峰值 RSS（进入时清零 VmHWM，退出时读取，
+    嵌套的 stage 清零前先并入外层；VmHWM 按进程统计，预读线程等并发工作的占用也计在内），
+    不支持 clear_refs 的平台为 None，只能看前面几项；process_peak_rss_mb 为进程启动以来的峰值（ru_maxrss）。
+    path 为 None 时只缓存在内存中（进程池子进程），由父进程统一写入 JSONL
+    """
+
+    def __init__(self, path=None, run_id=None):
+        self.path = path
+        self.run_id = run_id or time.strftime('%Y%m%d-%H%M%S') + f'-{os.getpid()}'
+        self.frame = None
+        self.records = []
+
+    def add(self, record):
+        # 预读线程也会写入；list.append 本身是线程安全的
+        self.records.append(record)
+
+    def take(self):
+        records, self.records = self.records, []
+        return records
+
+    def flush(self, records=None):
+        """
+        把记录追加写入 JSONL；records 为 None 时写出并清空自身缓存的记录
+        """
+        if records is None:
+            if self.path is None:
+                return
+            records = self.take()
+        if not records or self.path is None:
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records))
+
+
+def enable_profiling(path=None, run_id=None):
+    """
+    启用计时；path 为 JSONL 输出文件（按行追加，每行一条 stage 记录）
+    """
+    global _recorder
+    _recorder = Recorder(path, run_id)
+    return _recorder
+
+
+def disable_profiling():
+    global _recorder
+    if _recorder is not None:
+        _recorder.flush()
+    _recorder = None
+
+
+def get_recorder():
+    return _recorder
+
+
+def stage(name, points_in=None, frame=None):
+    """
+    with stage('clustering', points_in=n) as s: ...; s.points_out = m
+    未启用时返回共享的空对象，开销只有一次全局变量判断
+    """
+    if _recorder is None:
+        return _NULL_STAGE
+    return _Stage(_recorder, name, frame, points_in)
+
+
+def frame(name):
+    if _recorder is None:
+        return _NULL_STAGE
+    return _Frame(_recorder, 'total', name, None)
+
+
+def load_profile(path, run_id=None):
+    """
+    读取 JSONL 记录；run_id 为 'last' 时只取最后一次运行
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if run_id == 'last' and records:
+        run_id = records[-1]['run']
+    if run_id is not None:
+        records = [r for r in records if r['run'] == run_id]
+    return records
+
+
+def summarize_profile(records):
+    """
+    按 stage 汇总：次数、墙钟/CPU 时间的 p50/p95 与总和、stage 峰值 RSS 与 RSS 增量的 p50/p95、
+    退出时 RSS 的最大值、进程峰值 RSS 的最大值、点数合计
+    """
+    by_stage = {}
+    for r in records:
+        by_stage.setdefault(r['stage'], []).append(r)
+    summary = {}
+    for name, rows in by_stage.items():
+        wall = np.array([r['wall_s'] for r in rows])
+        cpu = np.array([r['cpu_s'] for r in rows])
+        delta = np.array([r['rss_delta_mb'] for r in rows if r.get('rss_delta_mb') is not None])
+        stage_peak = np.array([r['peak_rss_mb'] for r in rows if r.get('peak_rss_mb') is not None])
+        rss_end = [r['rss_end_mb'] for r in rows if r.get('rss_end_mb') is not None]
+        peak = [r['process_peak_rss_mb'] for r in rows if r.get('process_peak_rss_mb') is not None]
+        summary[name] = {
+            'count': len(rows),
+            'wall_p50': float(np.percentile(wall, 50)), 'wall_p95': float(np.percentile(wall, 95)),
+            'wall_total': float(wall.sum()),
+            'cpu_p50': float(np.percentile(cpu, 50)), 'cpu_p95': float(np.percentile(cpu, 95)),
+            'cpu_total': float(cpu.sum()),
+            'peak_rss_p50': float(np.percentile(stage_peak, 50)) if stage_peak.shape[0] else None,
+            'peak_rss_p95': float(np.percentile(stage_peak, 95)) if stage_peak.shape[0] else None,
+            'rss_delta_p50': float(np.percentile(delta, 50)) if delta.shape[0] else None,
+            'rss_delta_p95': float(np.percentile(delta, 95)) if delta.shape[0] else None,
+            'rss_end_max': max(rss_end) if rss_end else None,
+            'process_peak_rss_mb': max(peak) if peak else None,
+            'points_in': sum(r['points_in'] or 0 for r in rows),
+            'points_out': sum(r['points_out'] or 0 for r in rows),
+        }
+    return summary
+
+
+def _mb(value):
+    return f"{value:.0f}" if value is not None else '-'
+
+
+def print_profile_summary(summary):
+    print(f"{'stage':<20}{'次数':>6}{'wall p50':>11}{'wall p95':>11}{'wall 合计':>11}"
+          f"{'cpu p50':>10}{'cpu p95':>10}{'峰值 p50':>10}{'峰值 p95':>10}{'ΔRSS p50':>10}{'ΔRSS p95':>10}"
+          f"{'RSS 最大':>10}")
+    for name, s in sorted(summary.items(), key=lambda item: -item[1]['wall_total']):
+        print(f"{name:<20}{s['count']:>6}{s['wall_p50']:>10.3f}s{s['wall_p95']:>10.3f}s{s['wall_total']:>10.1f}s"
+              f"{s['cpu_p50']:>9.3f}s{s['cpu_p95']:>9.3f}s{_mb(s['peak_rss_p50']):>10}{_mb(s['peak_rss_p95']):>10}"
+              f"{_mb(s['rss_delta_p50']):>10}{_mb(s['rss_delta_p95']):>10}"
+              f"{_mb(s['rss_end_max']):>10}")
+    peak = [s['process_peak_rss_mb'] for s in summary.values() if s['process_peak_rss_mb'] is not None]
+    if peak:
+        print(f"进程峰值 RSS（ru_maxrss，整个进程，不分 stage）：{max(peak):.0f} MB")
@@ -0,0 +1,306 @@
+import os
+import json
+import tempfile
+import numpy as np
+
+# t-digest 的压缩参数，质心数约为其一半；越大分位数越准、统计文件越大
+DEFAULT_COMPRESSION = 400
+AXIS_NAMES = ('x', 'y', 'z')
+# 各轴直方图的固定范围与格宽（米），超出范围的点计入两端的溢出格；固定格点才能直接相加合并
+HIST_RANGES = ((-50.0, 50.0), (-30.0, 30.0), (0.0, 100.0))
+HIST_BIN_WIDTH = 0.25
+STATS_VERSION = 1
+
+
+class TDigest:
+    """
+    可合并的分位数草图（合并式 t-digest，k1 尺度函数）。质心按均值排序，每个质心覆盖的分位区间
+    在两端更窄，1% / 99% 这类尾部分位数误差很小。add / merge 都是整批向量化的排序 + 分组求和
+    """
+
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    def _compress(self, means, weights):
+        """
+        means 已排序。按累计权重中点的 k1(q) = δ/2π·asin(2q-1) 取整分组，每组合并成一个质心
+        """
+        total = weights.sum()
+        q_mid = (np.cumsum(weights) - weights / 2) / total
+        k = np.floor(self.compression / (2 * np.pi) * np.arcsin(2 * q_mid - 1))
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(k)) + 1])
+        group_weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / group_weights
+        self.weights = group_weights
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[np.isfinite(values)]
+        if values.shape[0] == 0:
+            return self
+        values = np.sort(values)
+        self.min = min(self.min, values[0])
+        self.max = max(self.max, values[-1])
+        # 先把新数据单独压缩成质心，再与已有质心合并，排序的代价只在新数据上
+        batch = TDigest(self.compression)
+        batch._compress(values, np.ones(values.shape[0]))
+        batch.min, batch.max = values[0], values[-1]
+        return self.merge(batch)
+
+    def merge(self, other):
+        if other.weights.shape[0] == 0:
+            return self
+        means = np.concatenate([self.means, other.means])
+        weights = np.concatenate([self.weights, other.weights])
+        order = np.argsort(means, kind='stable')
+        self._compress(means[order], weights[order])
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q):
+        """
+        q 为 0~1 的标量或数组；在质心的累计权重中点之间线性插值，两端用精确的最小/最大值
+        """
+        if self.weights.shape[0] == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        total = self.weights.sum()
+        mids = np.cumsum(self.weights) - self.weights / 2
+        positions = np.concatenate([[0.0], mids, [total]])
+        values = np.concatenate([[self.min], self.means, [self.max]])
+        return np.interp(np.asarray(q, dtype=np.float64) * total, positions, values)
+
+    def percentile(self, p):
+        return self.quantile(np.asarray(p, dtype=np.float64) / 100.0)
+
+    def to_dict(self):
+        return {'compression': self.compression, 'min': _finite_or_none(self.min), 'max': _finite_or_none(self.max),
+                'means': self.means.tolist(), 'weights': self.weights.tolist()}
+
+    @classmethod
+    def from_dict(cls, d):
+        digest = cls(d['compression'])
+        digest.means = np.asarray(d['means'], dtype=np.float64)
+        digest.weights = np.asarray(d['weights'], dtype=np.float64)
+        digest.min = np.inf if d['min'] is None else d['min']
+        digest.max = -np.inf if d['max'] is None else d['max']
+        return digest
+
+
+def _finite_or_none(value):
+    return float(value) if np.isfinite(value) else None
+
+
+def _hist_bins(axis):
+    low, high = HIST_RANGES[axis]
+    return int(round((high - low) / HIST_BIN_WIDTH))
+
+
+def histogram_counts(values, axis):
+    """
+    固定格点直方图，返回长度为 格数+2 的计数（第一格为下溢，最后一格为上溢）
+    """
+    low, _ = HIST_RANGES[axis]
+    bins = _hist_bins(axis)
+    index = np.floor((values - low) / HIST_BIN_WIDTH)
+    index = np.clip(index, -1, bins).astype(np.int64) + 1
+    return np.bincount(index, minlength=bins + 2)
+
+
+class LabelStats:
+    """
+    一个标签（或全部点）的统计：点数、各轴最小/最大值、和与平方和（均值/标准差）、t-digest 与直方图
+    """
+
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        self.count = 0
+        self.min = np.full(3, np.inf)
+        self.max = np.full(3, -np.inf)
+        self.sum = np.zeros(3)
+        self.sumsq = np.zeros(3)
+        self.digests = [TDigest(compression) for _ in range(3)]
+        self.hists = [np.zeros(_hist_bins(axis) + 2, dtype=np.int64) for axis in range(3)]
+
+    def add(self, xyz):
+        xyz = xyz[np.isfinite(xyz).all(axis=1)]
+        if xyz.shape[0] == 0:
+            return
+        self.count += xyz.shape[0]
+        self.min = np.minimum(self.min, xyz.min(axis=0))
+        self.max = np.maximum(self.max, xyz.max(axis=0))
+        xyz64 = xyz.astype(np.float64)
+        self.sum += xyz64.sum(axis=0)
+        self.sumsq += np.einsum('ij,ij->j', xyz64, xyz64)
+        for axis in range(3):
+            column = xyz64[:, axis]
+            self.digests[axis].add(column)
+            self.hists[axis] += histogram_counts(column, axis)
+
+    def merge(self, other):
+        self.count += other.count
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        self.sum += other.sum
+        self.sumsq += other.sumsq
+        for axis in range(3):
+            self.digests[axis].merge(other.digests[axis])
+            self.hists[axis] += other.hists[axis]
+        return self
+
+    def mean(self):
+        return self.sum / max(self.count, 1)
+
+    def std(self):
+        mean = self.mean()
+        return np.sqrt(np.maximum(self.sumsq / max(self.count, 1) - mean * mean, 0.0))
+
+    def to_dict(self):
+        return {'count': self.count, 'min': self.min.tolist(), 'max': self.max.tolist(), 'sum': self.sum.tolist(),
+                'sumsq': self.sumsq.tolist(), 'digests': [d.to_dict() for d in self.digests],
+                'hists': [h.tolist() for h in self.hists]}
+
+    @classmethod
+    def from_dict(cls, d):
+        stats = cls()
+        stats.count = d['count']
+        stats.min, stats.max = np.asarray(d['min']), np.asarray(d['max'])
+        stats.sum, stats.sumsq = np.asarray(d['sum']), np.asarray(d['sumsq'])
+        stats.digests = [TDigest.from_dict(x) for x in d['digests']]
+        stats.hists = [np.asarray(h, dtype=np.int64) for h in d['hists']]
+        return stats
+
+
+class DatasetStats:
+    """
+    全数据集的统计，可逐帧累加，也可把各进程/各批的结果合并（结果与处理顺序无关，t-digest 为近似）。
+    按标签分别统计，另记录每帧点数分布和每帧范围（与 removeisolated.py 打印的平均范围含义相同）
+    """
+
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.labels = {}
+        self.num_frames = 0
+        self.frame_points = TDigest(compression)
+        self.frame_min_sum = np.zeros(3)
+        self.frame_max_sum = np.zeros(3)
+
+    def _label(self, label):
+        if label not in self.labels:
+            self.labels[label] = LabelStats(self.compression)
+        return self.labels[label]
+
+    def add_frame(self, xyz, labels):
+        finite = np.isfinite(xyz).all(axis=1)
+        self.num_frames += 1
+        self.frame_points.add([xyz.shape[0]])
+        if finite.any():
+            self.frame_min_sum += xyz[finite].min(axis=0)
+            self.frame_max_sum += xyz[finite].max(axis=0)
+        # 按标签排序后切片，每个标签只取一次子集
+        order = np.argsort(labels, kind='stable')
+        sorted_labels = labels[order]
+        values, starts = np.unique(sorted_labels, return_index=True)
+        ends = np.append(starts[1:], sorted_labels.shape[0])
+        for label, start, end in zip(values, starts, ends):
+            self._label(int(label)).add(xyz[order[start:end]])
+        return self
+
+    def merge(self, other):
+        for label, stats in other.labels.items():
+            self._label(label).merge(stats)
+        self.num_frames += other.num_frames
+        self.frame_points.merge(other.frame_points)
+        self.frame_min_sum += other.frame_min_sum
+        self.frame_max_sum += other.frame_max_sum
+        return self
+
+    def combined(self, include=None, exclude=()):
+        """
+        把若干标签的统计合并成一个 LabelStats（include 为 None 时取全部标签）
+        """
+        out = LabelStats(self.compression)
+        for label, stats in self.labels.items():
+            if (include is None or label in include) and label not in exclude:
+                out.merge(stats)
+        return out
+
+    def average_bounds(self):
+        n = max(self.num_frames, 1)
+        return self.frame_min_sum / n, self.frame_max_sum / n
+
+    def to_dict(self):
+        return {'version': STATS_VERSION, 'compression': self.compression, 'num_frames': self.num_frames,
+                'frame_points': self.frame_points.to_dict(), 'frame_min_sum': self.frame_min_sum.tolist(),
+                'frame_max_sum': self.frame_max_sum.tolist(),
+                'hist': {'ranges': HIST_RANGES, 'bin_width': HIST_BIN_WIDTH},
+                'labels': {str(k): v.to_dict() for k, v in sorted(self.labels.items())}}
+
+    @classmethod
+    def from_dict(cls, d):
+        if d.get('version') != STATS_VERSION:
+            raise ValueError(f"统计文件版本不匹配：{d.get('version')}")
+        stats = cls(d['compression'])
+        stats.num_frames = d['num_frames']
+        stats.frame_points = TDigest.from_dict(d['frame_points'])
+        stats.frame_min_sum = np.asarray(d['frame_min_sum'])
+        stats.frame_max_sum = np.asarray(d['frame_max_sum'])
+        stats.labels = {int(k): LabelStats.from_dict(v) for k, v in d['labels'].items()}
+        return stats
+
+
+def suggest_crop_params(stats, lower_percentile=1, upper_percentile=99, label2_margin=3.0):
+    """
+    由数据集统计给出裁剪参数的参考值：
+    trim 为标签1以外的点在 X / Z 上的全数据集百分位（各轴分别统计，与逐帧先 X 后 Z 的裁剪略有差别），
+    label2_x 为标签2的 X 范围（0.5%~99.5% 分位）外扩 label2_margin，frame_points 为每帧点数的分位数
+    """
+    others = stats.combined(exclude=(1,))
+    params = {
+        'lower_percentile': lower_percentile,
+        'upper_percentile': upper_percentile,
+        'trim': {AXIS_NAMES[axis]: others.digests[axis].percentile([lower_percentile, upper_percentile]).tolist()
+                 for axis in (0, 2)},
+        'z_percentiles': {str(p): float(others.digests[2].percentile(p)) for p in (5, 25, 50, 75, 95)},
+        'frame_points': {str(p): float(stats.frame_points.percentile(p)) for p in (1, 5, 50)},
+    }
+    if 2 in stats.labels and stats.labels[2].count:
+        low, high = stats.labels[2].digests[0].percentile([0.5, 99.5])
+        params['label2_x'] = [float(low - label2_margin), float(high + label2_margin)]
+    return params
+
+
+def save_dataset_stats(path, stats, crop_params=None):
+    """
+    写出统计文件（紧凑 JSON，原子替换）；crop_params 一并写入，裁剪阶段直接读取
+    """
+    d = stats.to_dict()
+    if crop_params is not None:
+        d['crop'] = crop_params
+    out_dir = os.path.dirname(os.path.abspath(path))
+    os.makedirs(out_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=out_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(d, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_dataset_stats(path):
+    """
+    返回 (DatasetStats, 裁剪参数字典或 None)
+    """
+    with open(path, 'r') as f:
+        d = json.load(f)
+    return DatasetStats.from_dict(d), d.get('crop')
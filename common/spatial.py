@@ -0,0 +1,101 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+class FrameIndex:
+    """
+    一帧点云的近邻索引：全部点、或某个标签的点（可只取前 dims 个坐标，如 xy 投影）各自在第一次查询时
+    建一棵 cKDTree 并缓存，同一帧上的各个处理步骤（法向、聚类、离群点、孤立点检查）共用。
+    knn / radius 返回的都是点在整帧中的下标
+    """
+
+    def __init__(self, xyz, labels=None):
+        self.xyz = xyz
+        self.labels = labels
+        self.num_built = 0
+        self._indices = {}
+        self._points = {}
+        self._trees = {}
+
+    def indices(self, label=None):
+        """
+        标签为 label 的点在整帧中的下标（升序），label 为 None 时为全部点
+        """
+        if label not in self._indices:
+            if label is None:
+                self._indices[None] = np.arange(self.xyz.shape[0])
+            else:
+                self._indices[label] = np.flatnonzero(self.labels == label)
+        return self._indices[label]
+
+    def points(self, label=None, dims=3):
+        """
+        建树用的坐标：标签为 label 的点（None 为全部点）的前 dims 列，顺序与 indices(label) 相同
+        """
+        key = (label, dims)
+        if key not in self._points:
+            pts = self.xyz if label is None else self.xyz[self.indices(label)]
+            self._points[key] = pts[:, :dims]
+        return self._points[key]
+
+    def tree(self, label=None, dims=3):
+        """
+        points(label, dims) 上的 cKDTree，只建一次
+        """
+        key = (label, dims)
+        if key not in self._trees:
+            self._trees[key] = cKDTree(self.points(label, dims))
+            self.num_built += 1
+        return self._trees[key]
+
+    def _to_frame(self, idx, label):
+        return idx if label is None else self.indices(label)[idx]
+
+    def knn(self, query, k, label=None, dims=3, distance_upper_bound=np.inf, workers=1):
+        """
+        query（M×dims）在标签 label 的点中的 k 近邻（含距离为 0 的自身），返回 (距离, 整帧下标)，形状都是 (M, k)，
+        按距离升序。不足 k 个或超出 distance_upper_bound 的位置距离为 inf、下标为 -1。workers 为查询线程数
+        """
+        tree = self.tree(label, dims)
+        dist, idx = tree.query(query, k=k, distance_upper_bound=distance_upper_bound, workers=workers)
+        dist = dist.reshape(query.shape[0], k)
+        idx = idx.reshape(query.shape[0], k)
+        missing = idx >= tree.n
+        if missing.any():
+            idx = np.where(missing, 0, idx)
+            idx = self._to_frame(idx, label)
+            idx[missing] = -1
+            return dist, idx
+        return dist, self._to_frame(idx, label)
+
+    def radius(self, query, r, label=None, dims=3):
+        """
+        query 中每个点距离不超过 r 的点（标签 label 中），返回整帧下标数组的列表
+        """
+        neighbors = self.tree(label, dims).query_ball_point(query, r)
+        return [self._to_frame(np.asarray(x, dtype=np.int64), label) for x in neighbors]
+
+    def radius_count(self, query, r, label=None, dims=3, workers=1):
+        """
+        query 中每个点距离不超过 r 的点数（标签 label 中，含自身），workers 为查询线程数
+        """
+        return self.tree(label, dims).query_ball_point(query, r, return_length=True, workers=workers)
+
+    def select(self, mask):
+        """
+        只保留 mask 为真的点，得到新帧的 FrameIndex（下标按新帧重新编号）。
+        某个标签的点全部保留时，该标签已建好的树原样沿用；全部点的树只在没有点被删除时沿用
+        """
+        if mask.all():
+            return self
+        sub = FrameIndex(self.xyz[mask], None if self.labels is None else self.labels[mask])
+        position = np.cumsum(mask) - 1
+        for (label, dims), tree in self._trees.items():
+            if label is None:
+                continue
+            kept = self.indices(label)
+            if mask[kept].all():
+                sub._indices[label] = position[kept]
+                sub._points[(label, dims)] = self._points[(label, dims)]
+                sub._trees[(label, dims)] = tree
+        return sub
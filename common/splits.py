@@ -0,0 +1,229 @@
+import os
+import json
+import tempfile
+import numpy as np
+
+from common.kitti_index import indexed_frames
+from common.kitti_shards import SHARDS_NAME, ShardedSequence
+
+# hardlink / symlink 在 sequences/<划分>/ 下为每帧建立链接，manifest 只写划分清单（打包格式用）
+SPLIT_MODES = ('hardlink', 'symlink', 'manifest')
+# 划分清单，写在输出根目录中
+SPLIT_MANIFEST_NAME = 'splits.json'
+SPLIT_MANIFEST_VERSION = 1
+
+
+def split_sizes(total, counts=None, ratios=None):
+    """
+    各划分的帧数，返回 {划分名: 帧数}（顺序与输入相同）。counts 为 {划分名: 帧数}，至多一个为 None，
+    表示取剩下的全部；ratios 为 {划分名: 比例}，按比例取整后余数按最大余数法分配，总和等于 total
+    """
+    if (counts is None) == (ratios is None):
+        raise ValueError("counts 与 ratios 需且只需给出一个")
+    if counts is not None:
+        rest = [name for name, n in counts.items() if n is None]
+        fixed = sum(n for n in counts.values() if n is not None)
+        if len(rest) > 1 or fixed > total or (not rest and fixed != total):
+            raise ValueError(f"划分帧数 {counts} 与总帧数 {total} 不符")
+        return {name: total - fixed if n is None else n for name, n in counts.items()}
+    weights = np.array(list(ratios.values()), dtype=np.float64)
+    if (weights < 0).any() or weights.sum() <= 0:
+        raise ValueError(f"划分比例无效：{ratios}")
+    exact = weights / weights.sum() * total
+    sizes = np.floor(exact).astype(np.int64)
+    sizes[np.argsort(sizes - exact, kind='stable')[:total - sizes.sum()]] += 1
+    return dict(zip(ratios, sizes.tolist()))
+
+
+def assign_splits(names, sizes, seed=None):
+    """
+    按 split_sizes 的帧数把帧名分到各划分：seed 为 None 时按帧名排序后依次切分，否则按 seed 打乱后切分；
+    各划分内按帧名排序。返回 {划分名: [帧名]}
+    """
+    names = sorted(names)
+    if seed is not None:
+        names = [names[i] for i in np.random.default_rng(seed).permutation(len(names))]
+    assignment, start = {}, 0
+    for split, n in sizes.items():
+        assignment[split] = sorted(names[start:start + n])
+        start += n
+    return assignment
+
+
+def source_frames(source_dirs):
+    """
+    划分的帧来源，返回 {帧名: (bin 路径, label 路径)}。source_dirs 中每个目录可以是标准的序列目录
+    （取索引中配对且点数一致的帧），也可以是 kitti_shards 的打包目录（路径为 None，只能写划分清单）；帧名重复时报错
+    """
+    frames = {}
+    for source in source_dirs:
+        if os.path.exists(os.path.join(source, SHARDS_NAME)):
+            found = [(name, None, None) for name in ShardedSequence(source).names]
+        else:
+            found = [(name, bin_path, label_path) for name, bin_path, label_path, _ in indexed_frames(source)]
+        for name, bin_path, label_path in found:
+            if name in frames:
+                raise ValueError(f"帧名 {name} 在多个来源中出现")
+            frames[name] = (bin_path, label_path)
+    return frames
+
+
+def add_split_arguments(parser, default_seed=None):
+    """
+    给脚本的 argparse 加上 --counts / --ratios（二选一）与 --seed，用 split_arguments 解析
+    """
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--counts', nargs='+', default=None,
+                       help="各划分帧数，如 01=100 02=100 00=rest（按给出的顺序切分，rest 取剩下的全部）")
+    group.add_argument('--ratios', nargs='+', default=None, help="各划分比例，如 00=7 01=1 02=1")
+    parser.add_argument('--seed', type=int, default=default_seed, help="随机种子，不给时按帧名顺序切分")
+    return parser
+
+
+def _parse_split_values(items, allow_rest):
+    values = {}
+    for item in items:
+        name, sep, value = item.partition('=')
+        if not sep or not name:
+            raise ValueError(f"无法解析 {item}，应为 划分名=值")
+        if allow_rest and value == 'rest':
+            values[name] = None
+        else:
+            values[name] = int(value) if allow_rest else float(value)
+    return values
+
+
+def split_arguments(args, default_ratios):
+    """
+    从 add_split_arguments 的参数得到 (counts, ratios)，都没给出时用 default_ratios
+    """
+    if args.counts:
+        return _parse_split_values(args.counts, True), None
+    if args.ratios:
+        return None, _parse_split_values(args.ratios, False)
+    return None, dict(default_ratios)
+
+
+def migrate_sequences_to_pool(out_root, pool_dir):
+    """
+    旧布局（帧是 out_root/sequences/<划分>/ 下的普通文件，如旧 split.py 移动后的结果）迁移为单一帧目录：
+    pool_dir 不存在时把各划分 velodyne / labels 中的普通文件移动（os.rename，只改元数据）到
+    pool_dir/velodyne、labels，之后各划分由 materialize_splits 重新建立链接。返回移动的文件数
+    """
+    seq_root = os.path.join(out_root, 'sequences')
+    if os.path.exists(pool_dir) or not os.path.isdir(seq_root):
+        return 0
+    moves = []
+    for split in sorted(os.listdir(seq_root)):
+        for sub, ext in (('velodyne', '.bin'), ('labels', '.label')):
+            src_dir = os.path.join(seq_root, split, sub)
+            if not os.path.isdir(src_dir):
+                continue
+            for fname in sorted(os.listdir(src_dir)):
+                path = os.path.join(src_dir, fname)
+                if fname.endswith(ext) and not os.path.islink(path):
+                    moves.append((path, os.path.join(pool_dir, sub, fname)))
+    targets = [dst for _, dst in moves]
+    if len(set(targets)) != len(targets):
+        raise ValueError(f"{seq_root} 的多个划分中有同名帧，无法合并到一个帧目录")
+    if not moves:
+        return 0
+    os.makedirs(os.path.join(pool_dir, 'velodyne'))
+    os.makedirs(os.path.join(pool_dir, 'labels'))
+    for src, dst in moves:
+        os.rename(src, dst)
+    return len(moves)
+
+
+def _file_id(path):
+    st = os.stat(path)
+    return st.st_dev, st.st_ino
+
+
+def _remove_link(path, source_ids):
+    """
+    删除以前建立的链接：符号链接，或与某个来源文件是同一 inode 的硬链接；其他文件不删除，避免误删数据
+    """
+    if not os.path.islink(path) and _file_id(path) not in source_ids:
+        raise ValueError(f"{path} 不是划分建立的链接，为避免删除数据不予覆盖，请先移走该文件")
+    os.remove(path)
+
+
+def _link(src, dst, mode, source_ids):
+    """
+    在 dst 建立指向 src 的链接，已是同一文件的同类链接时不动，返回是否新建
+    """
+    if os.path.lexists(dst):
+        if os.path.islink(dst) == (mode == 'symlink') and os.path.exists(dst) and os.path.samefile(src, dst):
+            return False
+        _remove_link(dst, source_ids)
+    if mode == 'symlink':
+        os.symlink(os.path.abspath(src), dst)
+    else:
+        os.link(src, dst)
+    return True
+
+
+def write_split_manifest(out_root, assignment, params):
+    os.makedirs(out_root, exist_ok=True)
+    manifest = {'version': SPLIT_MANIFEST_VERSION, 'params': params, 'splits': assignment}
+    fd, tmp_path = tempfile.mkstemp(dir=out_root, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, os.path.join(out_root, SPLIT_MANIFEST_NAME))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_split_manifest(out_root):
+    """
+    读取划分清单，返回 {划分名: [帧名]}；打包格式按帧名从 ShardedSequence.frame 取帧
+    """
+    with open(os.path.join(out_root, SPLIT_MANIFEST_NAME), 'r') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != SPLIT_MANIFEST_VERSION:
+        raise ValueError(f"{out_root} 的划分清单版本 {manifest.get('version')} 不受支持")
+    return manifest['splits']
+
+
+def materialize_splits(frames, assignment, out_root, mode='hardlink', params=None):
+    """
+    按 assignment 在 out_root/sequences/<划分>/velodyne、labels 下建立指向 frames 中来源文件的链接，
+    并写出划分清单。重新划分时只增删有变化的链接（不在本次划分中的旧链接删除，上次清单中有、本次没有的划分
+    的链接全部删除），只有元数据操作，不读写帧数据。mode 为 manifest 时只写清单。返回 (新建链接数, 删除链接数)
+    """
+    if mode not in SPLIT_MODES:
+        raise ValueError(f"未知的划分方式 {mode}，可选 {SPLIT_MODES}")
+    created = removed = 0
+    if mode != 'manifest':
+        paths = [p for pair in frames.values() for p in pair]
+        if any(p is None for p in paths):
+            raise ValueError("打包格式的来源只能写划分清单（mode='manifest'）")
+        source_ids = {_file_id(p) for p in paths}
+        # 来源本身是链接时，链接所在目录和被指向的目录都不能作为输出
+        source_dirs = {os.path.realpath(os.path.dirname(p)) for p in paths} | \
+            {os.path.dirname(os.path.realpath(p)) for p in paths}
+        wanted_splits = dict(assignment)
+        if os.path.exists(os.path.join(out_root, SPLIT_MANIFEST_NAME)):
+            for split in load_split_manifest(out_root):
+                wanted_splits.setdefault(split, [])
+        for split, names in wanted_splits.items():
+            for sub, ext, column in (('velodyne', '.bin', 0), ('labels', '.label', 1)):
+                out_dir = os.path.join(out_root, 'sequences', split, sub)
+                if split not in assignment and not os.path.isdir(out_dir):
+                    continue
+                if os.path.realpath(out_dir) in source_dirs:
+                    raise ValueError(f"{out_dir} 是来源目录，不能作为划分的输出")
+                os.makedirs(out_dir, exist_ok=True)
+                wanted = {name + ext: frames[name][column] for name in names}
+                for entry in os.listdir(out_dir):
+                    if entry.endswith(ext) and entry not in wanted:
+                        _remove_link(os.path.join(out_dir, entry), source_ids)
+                        removed += 1
+                for fname, src in wanted.items():
+                    created += _link(src, os.path.join(out_dir, fname), mode, source_ids)
+    write_split_manifest(out_root, assignment, dict(params or {}, mode=mode))
+    return created, removed
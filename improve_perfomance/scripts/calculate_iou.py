@@ -1,22 +1,20 @@
 import os
+import sys
 import numpy as np
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.pcd_io import read_pcd_points, get_label_field
+from common.frame_cache import enable_frame_cache
+from common.frames import open_pcd
+
 def load_pcd(file_path):
-    with open(file_path, 'r') as f:
-        lines = f.readlines()
-    # 找到数据起始行
-    for i, line in enumerate(lines):
-        if line.strip().startswith('DATA'):
-            data_start = i + 1
-            break
-    data = []
-    for line in lines[data_start:]:
-        if line.strip() == '':
-            continue
-        vals = line.strip().split()
-        if len(vals) == 4:
-            data.append([float(vals[0]), float(vals[1]), float(vals[2]), int(float(vals[3]))])
-    return np.array(data)
+    _, points = read_pcd_points(file_path)
+    return points
+
+def load_labels(file_path):
+    # 评估只需要标签列；binary PCD 走内存映射，不解析坐标
+    header, data = open_pcd(file_path)
+    return np.asarray(data[get_label_field(header)]).astype(int)
 
 def compute_iou(labels1, labels2, target_label=2):
     mask1 = labels1 == target_label
@@ -40,6 +38,9 @@ def compute_accuracy(labels1, labels2, target_label=2):
 # ...existing code...
 
 if __name__ == "__main__":
+    cache_dir = None  # 设为目录后启用 PCD 解析缓存，重复运行时直接加载解析结果
+    if cache_dir:
+        enable_frame_cache(cache_dir)
     raw_dir = "/home/may/data/improve_perfomance/data/raw"
     improve_dir = "/home/may/data/improve_perfomance/data/improved"
     files = [f for f in os.listdir(raw_dir) if f.endswith('.pcd')]
@@ -51,14 +52,14 @@ if __name__ == "__main__":
         improve_path = os.path.join(improve_dir, fname)
         if not os.path.exists(improve_path):
             continue
-        raw_points = load_pcd(raw_path)
-        improve_points = load_pcd(improve_path)
-        if raw_points.shape[0] != improve_points.shape[0]:
+        raw_labels = load_labels(raw_path)
+        improve_labels = load_labels(improve_path)
+        if raw_labels.shape[0] != improve_labels.shape[0]:
             continue
-        if np.sum(improve_points[:, 3] == 2) == 0:
+        if np.sum(improve_labels == 2) == 0:
             continue
-        iou, intersection, union = compute_iou(raw_points[:, 3], improve_points[:, 3])
-        acc, correct, total = compute_accuracy(raw_points[:, 3], improve_points[:, 3])
+        iou, intersection, union = compute_iou(raw_labels, improve_labels)
+        acc, correct, total = compute_accuracy(raw_labels, improve_labels)
         print(f"{fname} 标签2 IOU: {iou:.4f} (交集: {intersection}, 并集: {union}) | Accuracy: {acc:.4f} ({correct}/{total})")
         iou_list.append(iou)
         acc_list.append(acc)
@@ -0,0 +1,154 @@
+import os
+import sys
+import csv
+import argparse
+import itertools
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.pcd_io import read_pcd_points
+from common.frame_cache import enable_frame_cache
+from common.batch import add_batch_arguments, run_batch, report_batch
+from common.profiling import enable_profiling, stage
+from common.cluster import dbscan_labels_exact, eps_neighbor_counts
+from common.normals import NOISE_POLICIES, knn_normals, cluster_normal_consistency, normal_consistency_labels
+from common.spatial import FrameIndex
+from calculate_iou import load_labels
+
+# 扫描的参数，顺序即嵌套顺序：法向和邻域点数在外层只算一次，内层只换 min_samples / 噪声处理 / 阈值
+SWEEP_KEYS = ('dbscan_eps', 'dbscan_min_samples', 'normal_knn', 'noise_policy', 'cos_threshold')
+# 与 improve_all.py process_file 中一致的参数，结果表中标 *
+CURRENT_PARAMS = {'dbscan_eps': 0.5, 'dbscan_min_samples': 3, 'normal_knn': 20, 'noise_policy': 'keep',
+                  'cos_threshold': 0.8}
+# 每个组合每帧记录的计数：交集、并集、真值标签2点数、细化后标签2点数
+STAT_FIELDS = ('intersection', 'union', 'gt_total', 'kept')
+
+
+def combinations(grid):
+    return list(itertools.product(*[grid[key] for key in SWEEP_KEYS]))
+
+
+def sweep_frame(pred_path, gt_path, grid):
+    """
+    对一帧预测结果计算所有参数组合下细化后的标签2与真值的计数，形状 (组合数, 4)，列见 STAT_FIELDS，
+    行序与 combinations(grid) 相同；点数与真值不一致时返回 None。
+    法向按 normal_knn、xy 邻域点数按 eps 各算一次，换 min_samples 时 DBSCAN 只按计数重新判定核心点
+    """
+    _, points = read_pcd_points(pred_path)
+    gt = load_labels(gt_path)
+    if gt.shape[0] != points.shape[0]:
+        return None
+    xyz = points[:, :3]
+    index = FrameIndex(xyz, points[:, 3])
+    idx2 = index.indices(2)
+    gt2 = gt[idx2] == 2
+    gt_total = np.count_nonzero(gt == 2)
+
+    with stage('normals', idx2.shape[0] * len(grid['normal_knn'])):
+        normals = {knn: knn_normals(xyz, idx2, knn, index) for knn in grid['normal_knn']}
+    xy2 = index.points(2, dims=2)
+    tree = index.tree(2, dims=2)
+    stats = []
+    for eps in grid['dbscan_eps']:
+        with stage('neighbor_counts', idx2.shape[0]):
+            counts = eps_neighbor_counts(xy2, eps, tree)
+        for min_samples in grid['dbscan_min_samples']:
+            with stage('clustering', idx2.shape[0]):
+                cluster_labels = dbscan_labels_exact(xy2, eps, min_samples, tree, counts)
+            for knn in grid['normal_knn']:
+                cos_sim = cluster_normal_consistency(normals[knn], cluster_labels)
+                for noise_policy in grid['noise_policy']:
+                    for cos_threshold in grid['cos_threshold']:
+                        kept = normal_consistency_labels(None, cluster_labels, cos_threshold, noise_policy,
+                                                         cos_sim)[0] == 2
+                        intersection = np.count_nonzero(kept & gt2)
+                        num_kept = np.count_nonzero(kept)
+                        stats.append((intersection, gt_total + num_kept - intersection, gt_total, num_kept))
+    return np.array(stats, dtype=np.int64).reshape(-1, len(STAT_FIELDS))
+
+
+def rank_results(combos, frame_stats):
+    """
+    按组合汇总各帧：与 calculate_iou.py 相同，细化后没有标签2的帧不计入，IoU / Accuracy 取有效帧的平均。
+    返回按平均 IoU（其次 Accuracy）降序排列的 [(参数字典, 平均IoU, 平均Accuracy, 有效帧数)]
+    """
+    stats = np.stack(frame_stats)  # (帧数, 组合数, 4)
+    intersection, union, gt_total, kept = (stats[..., i] for i in range(len(STAT_FIELDS)))
+    valid = kept > 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        iou = np.where(union > 0, intersection / union, 0.0)
+        acc = np.where(gt_total > 0, intersection / gt_total, 0.0)
+    num_valid = valid.sum(axis=0)
+    with np.errstate(invalid='ignore'):
+        mean_iou = np.where(num_valid > 0, (iou * valid).sum(axis=0) / num_valid, np.nan)
+        mean_acc = np.where(num_valid > 0, (acc * valid).sum(axis=0) / num_valid, np.nan)
+    rows = [(dict(zip(SWEEP_KEYS, combo)), mean_iou[i], mean_acc[i], int(num_valid[i]))
+            for i, combo in enumerate(combos)]
+    return sorted(rows, key=lambda r: (-np.nan_to_num(r[1], nan=-1.0), -np.nan_to_num(r[2], nan=-1.0)))
+
+
+def print_table(rows, top):
+    header = ''.join(f"{key:>20}" for key in SWEEP_KEYS)
+    print(f"{'排名':>4}  {header}{'平均IoU':>10}{'平均Acc':>10}{'有效帧':>8}")
+    for rank, (params, mean_iou, mean_acc, num_valid) in enumerate(rows[:top], 1):
+        mark = '*' if params == CURRENT_PARAMS else ' '
+        cells = ''.join(f"{str(params[key]):>20}" for key in SWEEP_KEYS)
+        print(f"{rank:>4}{mark} {cells}{mean_iou:>10.4f}{mean_acc:>10.4f}{num_valid:>8}")
+    current = [i for i, row in enumerate(rows) if row[0] == CURRENT_PARAMS]
+    if current:
+        print(f"* 当前 improve_all.py 的参数排第 {current[0] + 1}/{len(rows)}")
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['rank', *SWEEP_KEYS, 'mean_iou', 'mean_accuracy', 'valid_frames'])
+        for rank, (params, mean_iou, mean_acc, num_valid) in enumerate(rows, 1):
+            writer.writerow([rank, *[params[key] for key in SWEEP_KEYS], f"{mean_iou:.6f}", f"{mean_acc:.6f}",
+                             num_valid])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="标签2法向细化的参数扫描：每帧法向按 normal_knn、邻域按 eps 只算一次，"
+                                                 "在内存中与真值比较 IoU / Accuracy，输出排序后的结果表")
+    parser.add_argument('--pred_dir', default="/home/may/data/predict_image/data/predictresult/exp5",
+                        help="预测结果（improve_all.py 的输入）")
+    parser.add_argument('--gt_dir', default="/home/may/data/improve_perfomance/data/raw", help="真值，文件名与预测相同")
+    parser.add_argument('--cos_threshold', type=float, nargs='+', default=[0.7, 0.8, 0.9, 0.95])
+    parser.add_argument('--dbscan_eps', type=float, nargs='+', default=[0.3, 0.5, 1.0])
+    parser.add_argument('--dbscan_min_samples', type=int, nargs='+', default=[3, 6, 10])
+    parser.add_argument('--normal_knn', type=int, nargs='+', default=[10, 20, 30])
+    parser.add_argument('--noise_policy', nargs='+', default=['keep'], choices=NOISE_POLICIES)
+    parser.add_argument('--top', type=int, default=20, help="打印前多少个组合")
+    parser.add_argument('--csv', default=None, help="全部组合的结果写入该 CSV")
+    add_batch_arguments(parser)
+    args = parser.parse_args()
+    if args.profile:
+        enable_profiling(args.profile)
+
+    cache_dir = None  # 设为目录后启用 PCD 解析缓存，重复扫描时直接加载解析结果
+    if cache_dir:
+        enable_frame_cache(cache_dir)
+    grid = {key: getattr(args, key) for key in SWEEP_KEYS}
+    combos = combinations(grid)
+    tasks, inputs = [], []
+    for fname in sorted(f for f in os.listdir(args.pred_dir) if f.endswith('.pcd')):
+        gt_path = os.path.join(args.gt_dir, fname)
+        if not os.path.exists(gt_path):
+            continue
+        pred_path = os.path.join(args.pred_dir, fname)
+        tasks.append((fname, (pred_path, gt_path, grid)))
+        inputs.append(pred_path)
+    print(f"{len(tasks)} 帧 × {len(combos)} 个参数组合")
+    results = run_batch(sweep_frame, tasks, args.workers, args.threads_per_worker, inputs=inputs,
+                        prefetch=args.prefetch)
+    report_batch(results)
+    frame_stats = [r.value for r in results if r.ok and r.value is not None]
+    if not frame_stats:
+        print("没有可评估的帧（预测与真值点数不一致或读取失败）")
+        sys.exit(1)
+    rows = rank_results(combos, frame_stats)
+    print_table(rows, args.top)
+    if args.csv:
+        write_csv(args.csv, rows)
+        print(f"全部 {len(rows)} 个组合已写入 {args.csv}")
@@ -1,96 +1,108 @@
 import os
-import numpy as np
-from sklearn.cluster import DBSCAN
+import sys
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.pcd_io import read_pcd_xyz_label, write_pcd_xyz_label
+from common.batch import add_batch_arguments, report_batch
+from common.profiling import enable_profiling, stage
+from common.cluster import CLUSTER_METHODS, largest_cluster_mask
+from common.prefetch import DEFAULT_PREFETCH_DEPTH
+from common.manifest import BuildManifest, add_manifest_arguments, run_incremental
+from common.spatial import FrameIndex
 
 def read_pcd_xyz_intensity(filename):
-    with open(filename, 'r') as f:
-        lines = f.readlines()
-    header = []
-    data_start = 0
-    for i, line in enumerate(lines):
-        header.append(line)
-        if line.strip().startswith('DATA'):
-            data_start = i + 1
-            break
-    data = np.loadtxt(lines[data_start:])
-    xyz = data[:, :3]
-    intensity = data[:, 3].astype(int)
-    return header, xyz, intensity
+    return read_pcd_xyz_label(filename, label_dtype=int)
 
-def write_pcd_xyz_intensity(filename, header, xyz, intensity):
-    with open(filename, 'w') as f:
-        for line in header:
-            if line.startswith('POINTS'):
-                f.write(f"POINTS {xyz.shape[0]}\n")
-            elif line.startswith('WIDTH'):
-                f.write(f"WIDTH {xyz.shape[0]}\n")
-            else:
-                f.write(line)
-        for i in range(xyz.shape[0]):
-            f.write(f"{xyz[i,0]:.6f} {xyz[i,1]:.6f} {xyz[i,2]:.6f} {int(intensity[i])}\n")
+def write_pcd_xyz_intensity(filename, header, xyz, intensity, data_format='ascii', mask=None):
+    write_pcd_xyz_label(filename, xyz, intensity, header, data_format, mask)
 
-def process_pcd_file(input_path, output_path, dbscan_eps=0.5, dbscan_min_samples=8):
-    header, xyz, intensity = read_pcd_xyz_intensity(input_path)
+def largest_label1_cluster_mask(xyz, intensity, dbscan_eps=0.5, dbscan_min_samples=8, cluster_method='exact',
+                                index=None):
+    """
+    标签0和2全部保留，标签1只保留 DBSCAN 最大簇，返回 (保留掩码, 原始标签1点数, 保留的标签1点数)。
+    cluster_method 见 common.cluster.CLUSTER_METHODS，exact 与 sklearn 结果相同。
+    聚类（exact）使用本帧 FrameIndex 中标签1的树，index 为空时新建。
+    标签1绝大部分是吊具本身，按上一帧吊具区域限定聚类范围省不下多少工作量，因此不做跨帧跟踪
+    """
+    if index is None:
+        index = FrameIndex(xyz, intensity)
     mask0 = intensity == 0
-    mask1 = intensity == 1
     mask2 = intensity == 2
-    xyz0 = xyz[mask0]
-    xyz1 = xyz[mask1]
-    xyz2 = xyz[mask2]
-    inten0 = intensity[mask0]
-    inten2 = intensity[mask2]
+    idx1 = index.indices(1)
+    xyz1 = index.points(1)
 
-    xyz1_filtered = []
-    total_removed = 0
+    mask_keep = mask0 | mask2
+    num_kept1 = 0
     if xyz1.shape[0] > 0:
-        clustering = DBSCAN(eps=dbscan_eps, min_samples=dbscan_min_samples).fit(xyz1)
-        labels = clustering.labels_
-        unique_labels, counts = np.unique(labels, return_counts=True)
+        with stage('clustering', xyz1.shape[0]):
+            tree = index.tree(1) if cluster_method == 'exact' else None
+            largest = largest_cluster_mask(xyz1, dbscan_eps, dbscan_min_samples, cluster_method, tree)
+        largest_idx = idx1[largest]
+        mask_keep[largest_idx] = True
+        num_kept1 = largest_idx.shape[0]
+    return mask_keep, idx1.shape[0], num_kept1
 
-        # 非噪声簇
-        label_count_dict = {label: count for label, count in zip(unique_labels, counts) if label != -1}
-        
-        if label_count_dict:
-            largest_label = max(label_count_dict, key=label_count_dict.get)
-            largest_count = label_count_dict[largest_label]
-            xyz1_filtered = xyz1[labels == largest_label]
-            inten1_filtered = np.ones(xyz1_filtered.shape[0], dtype=int)
-            total_removed = xyz1.shape[0] - xyz1_filtered.shape[0]
-        else:
-            xyz1_filtered = np.empty((0, 3))
-            inten1_filtered = np.empty((0,), dtype=int)
-            total_removed = xyz1.shape[0]
-    else:
-        xyz1_filtered = np.empty((0, 3))
-        inten1_filtered = np.empty((0,), dtype=int)
+def process_pcd_file(input_path, output_path, dbscan_eps=0.5, dbscan_min_samples=8, data_format='ascii',
+                     cluster_method='exact'):
+    header, xyz, intensity = read_pcd_xyz_intensity(input_path)
+
+    # 标签0和2全部保留，标签1只保留最大簇；保持原始点序
+    mask_keep, num_label1, num_kept1 = largest_label1_cluster_mask(xyz, intensity, dbscan_eps, dbscan_min_samples,
+                                                                   cluster_method)
+    total_removed = num_label1 - num_kept1
 
     # 打印当前文件的处理结果
     print(f"文件: {os.path.basename(input_path)}")
-    print(f"原始标签为1的点数: {xyz1.shape[0]}")
-    print(f"最终保留的标签为1的点数（最大簇）: {xyz1_filtered.shape[0]}")
+    print(f"原始标签为1的点数: {num_label1}")
+    print(f"最终保留的标签为1的点数（最大簇）: {num_kept1}")
     print(f"删除的标签为1的点数: {total_removed}")
     print("-" * 50)
 
-    # 合并最终点云
-    xyz_all = np.vstack([xyz0, xyz1_filtered, xyz2])
-    inten_all = np.concatenate([inten0, inten1_filtered, inten2])
-    write_pcd_xyz_intensity(output_path, header, xyz_all, inten_all)
+    # 按掩码写出最终点云
+    write_pcd_xyz_intensity(output_path, header, xyz, intensity, data_format, mask_keep)
+    return num_label1, num_kept1
 
-def process_pcd_folder(input_folder, output_folder, dbscan_eps=0.5, dbscan_min_samples=8):
+def process_pcd_folder(input_folder, output_folder, dbscan_eps=0.5, dbscan_min_samples=8, data_format='ascii',
+                       workers=1, threads_per_worker=1, resume=True, prefetch=DEFAULT_PREFETCH_DEPTH,
+                       cluster_method='exact'):
     os.makedirs(output_folder, exist_ok=True)
-    pcd_files = [f for f in os.listdir(input_folder) if f.endswith('.pcd')]
+    pcd_files = sorted(f for f in os.listdir(input_folder) if f.endswith('.pcd'))
+    params = {'dbscan_eps': dbscan_eps, 'dbscan_min_samples': dbscan_min_samples, 'data_format': data_format,
+              'cluster_method': cluster_method}
+    code_files = [__file__]
 
+    tasks = []
     for pcd_file in pcd_files:
         input_path = os.path.join(input_folder, pcd_file)
         output_path = os.path.join(output_folder, pcd_file)
-        process_pcd_file(input_path, output_path, dbscan_eps, dbscan_min_samples)
+        tasks.append((pcd_file, (input_path, output_path, dbscan_eps, dbscan_min_samples, data_format,
+                                 cluster_method), [input_path], [output_path]))
+    # exact 与 sklearn 结果相同，但仍作为参数记录：切换方法后重新处理，便于对比
+    manifest = BuildManifest(output_folder, params, code_files)
+    report_batch(run_incremental(process_pcd_file, tasks, manifest, resume, workers, threads_per_worker, prefetch))
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="标签1只保留 DBSCAN 最大簇")
+    parser.add_argument('--cluster_method', default='exact', choices=CLUSTER_METHODS,
+                        help="exact：网格 + 并查集，结果与 sklearn 相同；voxel：体素连通近似，最快；sklearn：原 DBSCAN")
+    add_batch_arguments(parser)
+    add_manifest_arguments(parser)
+    args = parser.parse_args()
+    if args.profile:
+        enable_profiling(args.profile)
+
     input_dir = 'process_data/data/aftercut_dataset'
     output_dir = 'process_data/data/afterDBSCAN_dataset'
     process_pcd_folder(
         input_folder=input_dir,
         output_folder=output_dir,
         dbscan_eps=2,
-        dbscan_min_samples=5
+        dbscan_min_samples=5,
+        data_format='ascii',  # 输出格式：ascii / binary / binary_compressed
+        workers=args.workers,
+        threads_per_worker=args.threads_per_worker,
+        resume=args.resume,
+        prefetch=args.prefetch,
+        cluster_method=args.cluster_method
     )
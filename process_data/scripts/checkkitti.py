@@ -1,33 +1,41 @@
 import os
-import numpy as np
+import sys
+import argparse
 
-# 目录路径
-velodyne_dir = "/home/may/data/kitti/dataset/sequences/02/velodyne"
-labels_dir = "/home/may/data/kitti/dataset/sequences/02/labels"
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.kitti_index import index_problems, update_sequence_index
 
-# 加载点云文件
-def load_velodyne_file(filepath):
-    return np.fromfile(filepath, dtype=np.float32).reshape(-1, 3)
+# 数据集 sequences 目录
+sequences_dir = "/home/may/data/kitti/dataset/sequences"
 
-# 加载标签文件
-def load_label_file(filepath):
-    return np.fromfile(filepath, dtype=np.uint32)
 
-# 获取所有文件名
-velodyne_files = sorted(os.listdir(velodyne_dir))
-label_files = sorted(os.listdir(labels_dir))
+def check_sequence(seq_dir, checksum=False, histogram=False):
+    """
+    增量更新序列的帧索引，按帧名配对核对点云与标签的行数（由文件大小得到，不读取帧数据），返回有问题的帧数
+    """
+    index = update_sequence_index(seq_dir, checksum, histogram)
+    problems = {}
+    for name, message in index_problems(index):
+        problems.setdefault(name, []).append(message)
+    for name in index['frames']:
+        if name in problems:
+            print(f"❌ 不一致: {name} - {'; '.join(problems[name])}")
+        else:
+            print(f"✅ 一致: {name}")
+    return len(problems)
 
-# 检查点云和标签行数是否对应
-for v_file, l_file in zip(velodyne_files, label_files):
-    v_path = os.path.join(velodyne_dir, v_file)
-    l_path = os.path.join(labels_dir, l_file)
 
-    # 加载点云和标签
-    point_cloud = load_velodyne_file(v_path)
-    labels = load_label_file(l_path)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="建立/更新 SemanticKITTI 序列的帧索引，并核对 .bin 与 .label 的配对和行数")
+    parser.add_argument('--sequences_dir', default=sequences_dir)
+    parser.add_argument('--sequences', nargs='+', default=["02"], help="要检查的序列编号")
+    parser.add_argument('--checksum', action='store_true',
+                        help="为新帧计算内容摘要并记入索引（需读取整个文件，默认只 stat）")
+    parser.add_argument('--histogram', action='store_true', help="为新帧统计标签直方图并记入索引")
+    args = parser.parse_args()
 
-    # 检查行数
-    if point_cloud.shape[0] != labels.shape[0]:
-        print(f"❌ 不一致: {v_file} - 点云行数={point_cloud.shape[0]}, 标签行数={labels.shape[0]}")
-    else:
-        print(f"✅ 一致: {v_file}")
\ No newline at end of file
+    failed = 0
+    for seq in args.sequences:
+        failed += check_sequence(os.path.join(args.sequences_dir, seq), args.checksum, args.histogram)
+    if failed:
+        sys.exit(1)
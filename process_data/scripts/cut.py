@@ -1,124 +1,94 @@
 import os
+import sys
+import argparse
 import numpy as np
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.pcd_io import read_pcd_points, write_pcd_points
+from common.batch import add_batch_arguments, report_batch
+from common.profiling import enable_profiling, stage
+from common.crop import (trim_mask, crop_stats, crop_mask, crop_pcd_stream, fixed_x_band_bounds, load_trim_thresholds)
+from common.manifest import BuildManifest, add_manifest_arguments, run_incremental
+from common.pcd_stream import DEFAULT_CHUNK_POINTS
+
 # ====== 修改这里的目录路径 ======
 input_dir = "process_data/data/dataset"               # 输入文件夹
 output_dir = "process_data/data/aftercut_dataset"     # 输出文件夹
+data_format = "ascii"                                 # 输出格式：ascii / binary / binary_compressed
+stream_mode = False                                   # 流式处理，内存占用与帧大小无关
+chunk_points = DEFAULT_CHUNK_POINTS                   # 流式处理时每块的点数
+quantile_sample = None                                # 超大帧估计百分位时的采样点数，None 为精确计算（流式处理用 t-digest，不用此项）
+stats_file = None                                     # dataset_stats.py 生成的统计文件，给出时去离群阈值取全数据集百分位
 
-too_few_points_files = []  # 用来记录点数少于5000的文件名和对应点数
-
-def parse_pcd_header(lines):
-    header = []
-    data_start = 0
-    for i, line in enumerate(lines):
-        header.append(line)
-        if line.strip().startswith("DATA"):
-            data_start = i + 1
-            break
-    return header, data_start
-
-def remove_outliers_by_percentile(points, lower_percentile=1, upper_percentile=99):
-    # 分离标签为1的点，保留它们，不参与裁剪
-    mask_label1 = (points[:, 3] == 1)
-    preserved_label1 = points[mask_label1]
-    to_clean = points[~mask_label1]
-
-    for i in [0, 2]:  # 只处理 X 和 Z
-        low = np.percentile(to_clean[:, i], lower_percentile)
-        high = np.percentile(to_clean[:, i], upper_percentile)
-        to_clean = to_clean[(to_clean[:, i] >= low) & (to_clean[:, i] <= high)]
-
-    return np.vstack([to_clean, preserved_label1])
+def remove_outliers_by_percentile(points, lower_percentile=1, upper_percentile=99, sample_size=None):
+    # 标签1不参与裁剪、始终保留；保持原始点序
+    return points[trim_mask(points[:, :3], points[:, 3], lower_percentile, upper_percentile, sample_size)]
 
 def get_dynamic_bounds(points):
-    min_bound = np.min(points[:, :3], axis=0)
-    max_bound = np.max(points[:, :3], axis=0)
-    range_ = max_bound - min_bound
-
-    new_min = min_bound.copy()
-    new_max = max_bound.copy()
-
-    # X轴保留中间 70%
-    new_min[0] = min(-14, min_bound[0] + range_[0] * 0.15)
-    new_max[0] = max(14, max_bound[0] - range_[0] * 0.15)
-
-    # Y轴不变
-
-    # Z轴下边界处理
-    if range_[2] > 30:
-        new_min[2] = max(min_bound[2] + range_[2] * 0.3, 30.0)
-
-    return new_min, new_max
-
-def process_file(input_file, output_file):
-    with open(input_file, 'r') as f:
-        lines = f.readlines()
-
-    header, data_start = parse_pcd_header(lines)
-    point_lines = lines[data_start:]
-
-    try:
-        points = np.loadtxt(point_lines, dtype=np.float32)
-    except Exception as e:
-        print(f"⚠️ 读取失败：{input_file}")
-        print(f"错误信息：{e}")
-        return
-
-    # 去除离群点（标签1不参与）
-    points = remove_outliers_by_percentile(points, 1, 99)
-
-    coords = points[:, :3]
-    labels = points[:, 3].astype(int)
-
-    # 动态边界计算
-    new_min, new_max = get_dynamic_bounds(points)
-
-    # 三类处理逻辑
-    mask_label1 = (labels == 1)  # 始终保留
-    mask_label0 = (labels == 0)
-    mask_label2 = (labels == 2)
-
-    mask_in_bound = np.all((coords >= new_min) & (coords <= new_max), axis=1)
-
-    # 标签0和2的点只保留在范围内的
-    mask_keep_label0 = mask_label0 & mask_in_bound
-    mask_keep_label2 = mask_label2 & mask_in_bound
-
-    mask_keep = mask_label1 | mask_keep_label0 | mask_keep_label2
-    filtered_points = points[mask_keep]
-
-    # 点数统计
-    if filtered_points.shape[0] < 5000:
-        too_few_points_files.append((os.path.basename(input_file), filtered_points.shape[0]))
-
-    # 修改 header
-    new_header = []
-    for line in header:
-        if line.startswith("POINTS"):
-            new_header.append(f"POINTS {filtered_points.shape[0]}\n")
-        elif line.startswith("WIDTH"):
-            new_header.append(f"WIDTH {filtered_points.shape[0]}\n")
-        else:
-            new_header.append(line)
-
+    return fixed_x_band_bounds(crop_stats(points[:, :3], points[:, 3]))
+
+def process_file(input_file, output_file, data_format='ascii', sample_size=None, trim_thresholds=None):
+    # 读取失败时抛出异常，由 run_incremental 记为失败、不写入清单，下次重跑
+    header, points = read_pcd_points(input_file, dtype=np.float32)
+
+    # 去除离群点（标签1不参与）+ 动态边界裁剪，合成一个掩码，写出时一次取出，保持原始点序
+    with stage('crop', points.shape[0]) as s:
+        mask_keep, num_trimmed, _, _ = crop_mask(points[:, :3], points[:, 3], fixed_x_band_bounds, 1, 99,
+                                                 sample_size, trim_thresholds)
+        num_kept = int(np.count_nonzero(mask_keep))
+        s.points_out = num_kept
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    write_pcd_points(output_file, points, header, data_format, mask=mask_keep)
 
-    with open(output_file, 'w') as f:
-        f.writelines(new_header)
-        np.savetxt(f, filtered_points, fmt="%.6f %.6f %.6f %d")
-
     print(f"✅ 已处理：{input_file}")
-    print(f"   点数从 {points.shape[0]} -> {filtered_points.shape[0]}")
-    print(f"   标签统计：", dict(zip(*np.unique(filtered_points[:, 3], return_counts=True))))
+    print(f"   点数从 {num_trimmed} -> {num_kept}")
+    print(f"   标签统计：", dict(zip(*np.unique(points[mask_keep, 3], return_counts=True))))
+    return num_kept
+
+def process_file_stream(input_file, output_file, data_format='ascii', chunk_points=DEFAULT_CHUNK_POINTS,
+                        trim_thresholds=None):
+    """
+    流式版本的 process_file，内存占用与帧大小无关（见 common.crop.crop_pcd_stream）。
+    未给出 trim_thresholds 时去离群阈值为 t-digest 近似值
+    """
+    num_trimmed, num_kept, label_counts, new_min, new_max = crop_pcd_stream(
+        input_file, output_file, fixed_x_band_bounds, data_format, chunk_points, 1, 99, trim_thresholds)
+    print(f"✅ 已处理：{input_file}")
+    print(f"   点数从 {num_trimmed} -> {num_kept}")
+    print(f"   标签统计：", label_counts)
+    return num_kept
 
 def main():
-    for filename in os.listdir(input_dir):
+    parser = argparse.ArgumentParser(description="按动态边界裁剪点云")
+    add_batch_arguments(parser)
+    add_manifest_arguments(parser)
+    args = parser.parse_args()
+    if args.profile:
+        enable_profiling(args.profile)
+    trim_thresholds = load_trim_thresholds(stats_file) if stats_file else None
+    manifest = BuildManifest(output_dir, {'data_format': data_format, 'stream_mode': stream_mode,
+                                          'quantile_sample': quantile_sample, 'trim_thresholds': trim_thresholds},
+                             [__file__])
+
+    tasks = []
+    for filename in sorted(os.listdir(input_dir)):
         if filename.endswith(".pcd"):
             input_file = os.path.join(input_dir, filename)
             output_file = os.path.join(output_dir, filename)
-            process_file(input_file, output_file)
+            if stream_mode:
+                tasks.append((filename, (input_file, output_file, data_format, chunk_points, trim_thresholds),
+                              [input_file], [output_file]))
+            else:
+                tasks.append((filename, (input_file, output_file, data_format, quantile_sample, trim_thresholds),
+                              [input_file], [output_file]))
+    # 流式处理不经过 read_pcd，不预读整帧
+    results = run_incremental(process_file_stream if stream_mode else process_file, tasks, manifest,
+                              args.resume, args.workers, args.threads_per_worker, 0 if stream_mode else args.prefetch)
 
     print("✅ 所有文件处理完成！")
+    report_batch(results)
+    # 处理后点数少于5000的文件名和对应点数（读取失败的文件见上面的失败汇总）
+    too_few_points_files = [(r.name, r.value) for r in results if r.ok and r.value < 5000]
     if too_few_points_files:
         print("\n⚠️ 以下文件处理后点数少于 5000：")
         for fname, count in too_few_points_files:
@@ -0,0 +1,93 @@
+import os
+import sys
+import argparse
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.pcd_io import read_pcd_xyz_label
+from common.batch import add_batch_arguments, run_batch, report_batch
+from common.profiling import enable_profiling, stage
+from common.prefetch import DEFAULT_PREFETCH_DEPTH
+from common.sketch import DEFAULT_COMPRESSION, AXIS_NAMES, DatasetStats, suggest_crop_params, save_dataset_stats
+
+# ====== 修改这里的路径 ======
+input_dir = "process_data/data/dataset"                   # 输入 PCD 文件夹
+stats_path = "process_data/data/dataset_stats.json"       # 统计文件，cut.py / cut_new.py 的 stats_file 指向它
+
+
+def frame_stats(file_path, compression=DEFAULT_COMPRESSION):
+    """
+    单帧的统计草图，由父进程合并
+    """
+    _, xyz, labels = read_pcd_xyz_label(file_path, xyz_dtype=np.float32)
+    with stage('sketch', xyz.shape[0]):
+        return DatasetStats(compression).add_frame(xyz, labels)
+
+
+def print_dataset_stats(stats, crop_params):
+    avg_min, avg_max = stats.average_bounds()
+    overall = stats.combined()
+    print(f"共 {stats.num_frames} 帧，{overall.count} 个点")
+    print(f"Average Point Cloud Range: min {avg_min}, max {avg_max}")
+    print(f"Overall Minimum Bound: {overall.min}")
+    print(f"Overall Maximum Bound: {overall.max}")
+    print(f"{'标签':<6}{'点数':>12}{'轴':>4}{'min':>10}{'p1':>10}{'p50':>10}{'p99':>10}{'max':>10}{'mean':>10}{'std':>10}")
+    for label, s in sorted(stats.labels.items()):
+        mean, std = s.mean(), s.std()
+        for axis, name in enumerate(AXIS_NAMES):
+            p1, p50, p99 = s.digests[axis].percentile([1, 50, 99])
+            print(f"{label:<6}{s.count:>12}{name:>4}{s.min[axis]:>10.2f}{p1:>10.2f}{p50:>10.2f}{p99:>10.2f}"
+                  f"{s.max[axis]:>10.2f}{mean[axis]:>10.2f}{std[axis]:>10.2f}")
+    print("裁剪参数参考：")
+    for axis, (low, high) in crop_params['trim'].items():
+        print(f"  去离群阈值 {axis}: [{low:.2f}, {high:.2f}]（全数据集 {crop_params['lower_percentile']}% ~ "
+              f"{crop_params['upper_percentile']}%）")
+    if 'label2_x' in crop_params:
+        print(f"  标签2 X 窗口: [{crop_params['label2_x'][0]:.2f}, {crop_params['label2_x'][1]:.2f}]")
+    print("  Z 分位数: " + ", ".join(f"p{p}={v:.1f}" for p, v in crop_params['z_percentiles'].items()))
+    print("  每帧点数: " + ", ".join(f"p{p}={v:.0f}" for p, v in crop_params['frame_points'].items()))
+
+
+def compute_dataset_stats(input_dir, compression=DEFAULT_COMPRESSION, workers=1, threads_per_worker=1,
+                          prefetch=DEFAULT_PREFETCH_DEPTH):
+    """
+    一遍扫描全部帧（可多进程），逐帧的草图在父进程中按任务顺序合并，结果与进程数无关
+    """
+    names = sorted(f for f in os.listdir(input_dir) if f.endswith('.pcd'))
+    paths = [os.path.join(input_dir, f) for f in names]
+    stats = DatasetStats(compression)
+
+    def on_result(result):
+        if result.ok:
+            stats.merge(result.value)
+
+    tasks = [(name, (path, compression)) for name, path in zip(names, paths)]
+    # 草图已经合并进 stats，结果中不再保留
+    results = [r._replace(value=None) for r in run_batch(frame_stats, tasks, workers, threads_per_worker, on_result,
+                                                         [[p] for p in paths], prefetch)]
+    return stats, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="一遍扫描数据集，按标签/坐标轴统计分位数草图、直方图、点数与范围")
+    parser.add_argument('--input_dir', default=input_dir)
+    parser.add_argument('--output', default=stats_path)
+    parser.add_argument('--compression', type=int, default=DEFAULT_COMPRESSION, help="t-digest 压缩参数")
+    parser.add_argument('--lower_percentile', type=float, default=1)
+    parser.add_argument('--upper_percentile', type=float, default=99)
+    add_batch_arguments(parser)
+    args = parser.parse_args()
+    if args.profile:
+        enable_profiling(args.profile)
+
+    stats, results = compute_dataset_stats(args.input_dir, args.compression, args.workers, args.threads_per_worker,
+                                           args.prefetch)
+    report_batch(results)
+    crop_params = suggest_crop_params(stats, args.lower_percentile, args.upper_percentile)
+    save_dataset_stats(args.output, stats, crop_params)
+    print_dataset_stats(stats, crop_params)
+    print(f"✅ 统计文件已保存：{args.output}（{os.path.getsize(args.output) / 1024:.0f} KB）")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,97 +1,62 @@
 import os
-import open3d as o3d
-import numpy as np
-from sklearn.cluster import DBSCAN
-
-def read_pcd_ascii(file_path):
-    with open(file_path, 'r') as f:
-        lines = f.readlines()
-    for i, line in enumerate(lines):
-        if line.strip().startswith('DATA'):
-            data_start = i + 1
-            break
-    header = lines[:data_start]
-    data = []
-    for line in lines[data_start:]:
-        if line.strip() == '':
-            continue
-        vals = line.strip().split()
-        if len(vals) == 4:
-            data.append([float(vals[0]), float(vals[1]), float(vals[2]), int(vals[3])])
-    points = np.array(data)
-    return header, points
-
-def write_pcd_ascii(file_path, header, points):
-    with open(file_path, 'w') as f:
-        for line in header:
-            if line.startswith('POINTS'):
-                f.write(f'POINTS {points.shape[0]}\n')
-            elif line.startswith('WIDTH'):
-                f.write(f'WIDTH {points.shape[0]}\n')
-            else:
-                f.write(line)
-        for pt in points:
-            f.write(f"{pt[0]:.6f} {pt[1]:.6f} {pt[2]:.6f} {int(pt[3])}\n")
-
-def filter_label2_by_normal_cluster(points, normal_knn=20, cos_threshold=0.8, dbscan_eps=0.5, dbscan_min_samples=6):
-    xyz = points[:, :3]
-    labels = points[:, 3].copy()
-    mask2 = labels == 2
-    num_label2_before = np.sum(mask2)
-    if num_label2_before == 0:
-        return points, None, num_label2_before, num_label2_before
-
-    # 只用xy坐标聚类
-    xy2 = xyz[mask2][:, :2]
-    db = DBSCAN(eps=dbscan_eps, min_samples=dbscan_min_samples).fit(xy2)
-    cluster_labels = db.labels_
-    cluster_info = np.unique(cluster_labels, return_counts=True)
-    print(f"聚类簇分布: {cluster_info}")
-
-    # 估算所有点的法向量
-    pcd = o3d.geometry.PointCloud()
-    pcd.points = o3d.utility.Vector3dVector(xyz)
-    pcd.estimate_normals(search_param=o3d.geometry.KDTreeSearchParamKNN(knn=normal_knn))
-    normals = np.asarray(pcd.normals)
-    normals2 = normals[mask2]
-
-    # 对每个轨道簇分别筛选
-    for clu in np.unique(cluster_labels):
-        clu_mask = cluster_labels == clu
-        idx = np.where(mask2)[0][clu_mask]
-        if clu == -1:
-            labels[idx] = 2
-            continue
-        clu_normals = normals2[clu_mask]
-        if clu_normals.shape[0] == 0:
-            continue
-        mean_normal = np.mean(clu_normals, axis=0)
-        mean_normal /= np.linalg.norm(mean_normal) + 1e-8
-        cos_sim = np.dot(clu_normals, mean_normal)
-        keep_mask = cos_sim > cos_threshold
-        labels[idx] = np.where(keep_mask, 2, 0)
-    points[:, 3] = labels
-    num_label2_after = np.sum(points[:, 3] == 2)
-    return points, cluster_info, num_label2_before, num_label2_after
-
-# ...existing code...
+import sys
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.pcd_io import read_pcd_points, write_pcd_points
+from common.frame_cache import enable_frame_cache
+from common.profiling import enable_profiling
+from common.batch import add_batch_arguments, report_batch
+from common.manifest import BuildManifest, add_manifest_arguments, run_incremental
+from common.normals import NOISE_POLICIES, filter_label2_by_normal_cluster
+
+# 细化后标签2少于该点数的帧不保存
+MIN_LABEL2_POINTS = 30
+
+def process_file(input_path, output_path, data_format='ascii', noise_policy='keep'):
+    """
+    细化单帧的标签2并保存，标签2少于 MIN_LABEL2_POINTS 的帧不保存，返回 (处理前, 处理后标签2点数)
+    """
+    fname = os.path.basename(input_path)
+    header, points = read_pcd_points(input_path)
+    filtered_points, cluster_info, num_label2_before, num_label2_after = filter_label2_by_normal_cluster(
+        points, cos_threshold=0.8, dbscan_eps=0.5, dbscan_min_samples=3, noise_policy=noise_policy)
+    print(f"{fname} 处理前标签为2的点数: {num_label2_before}")
+    print(f"{fname} 处理后标签为2的点数: {num_label2_after}")
+    # 只保存标签2数量大于等于30的文件
+    if num_label2_after >= MIN_LABEL2_POINTS:
+        write_pcd_points(output_path, filtered_points, header, data_format)
+    else:
+        print(f"{fname} 标签2数量小于30，文件未保存.")
+        # 删除之前运行留下的旧结果，下一阶段不会误用，清单中记为“无输出”
+        if os.path.exists(output_path):
+            os.remove(output_path)
+    return num_label2_before, num_label2_after
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按法向一致性细化标签2")
+    parser.add_argument('--noise_policy', default='keep', choices=NOISE_POLICIES,
+                        help="标签2中 DBSCAN 噪声点的处理：keep 保留为标签2，drop 改为标签0（improve.py 的做法）")
+    add_batch_arguments(parser)
+    add_manifest_arguments(parser)
+    args = parser.parse_args()
+    if args.profile:
+        enable_profiling(args.profile)
+
+    cache_dir = None  # 设为目录后启用 PCD 解析缓存，重复运行时直接加载解析结果
+    if cache_dir:
+        enable_frame_cache(cache_dir)
     input_dir = "/home/may/data/process_data/data/afterDBSCAN_dataset"
     output_dir = "/home/may/data/process_data/data/afterimproved_dataset"
+    data_format = "ascii"  # 输出格式：ascii / binary / binary_compressed
     os.makedirs(output_dir, exist_ok=True)
-    for fname in os.listdir(input_dir):
+    tasks = []
+    for fname in sorted(os.listdir(input_dir)):
         if not fname.endswith('.pcd'):
             continue
         input_path = os.path.join(input_dir, fname)
         output_path = os.path.join(output_dir, fname)
-        header, points = read_pcd_ascii(input_path)
-        filtered_points, cluster_info, num_label2_before, num_label2_after = filter_label2_by_normal_cluster(
-            points, cos_threshold=0.8, dbscan_eps=0.5, dbscan_min_samples=3)
-        print(f"{fname} 处理前标签为2的点数: {num_label2_before}")
-        print(f"{fname} 处理后标签为2的点数: {num_label2_after}")
-        # 只保存标签2数量大于等于30的文件
-        if num_label2_after >= 30:
-            write_pcd_ascii(output_path, header, filtered_points)
-        else:
-            print(f"{fname} 标签2数量小于30，文件未保存.")
\ No newline at end of file
+        tasks.append((fname, (input_path, output_path, data_format, args.noise_policy), [input_path], [output_path]))
+    manifest = BuildManifest(output_dir, {'data_format': data_format, 'noise_policy': args.noise_policy}, [__file__])
+    report_batch(run_incremental(process_file, tasks, manifest, args.resume, args.workers, args.threads_per_worker,
+                                 args.prefetch))
@@ -0,0 +1,45 @@
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.kitti_index import index_problems, update_sequence_index
+from common.kitti_shards import DEFAULT_SHARD_BYTES, pack_sequence, unpack_sequence
+
+
+def pack_dataset(sequences_dir, packed_dir, sequences, shard_bytes=DEFAULT_SHARD_BYTES):
+    """
+    把 sequences_dir 下的各序列打包到 packed_dir/<序列号>/，配对或点数有问题的帧不打包
+    """
+    for seq in sequences:
+        seq_dir = os.path.join(sequences_dir, seq)
+        index = update_sequence_index(seq_dir)
+        for name, message in index_problems(index):
+            print(f"⚠️ Sequence {seq} 跳过 {name}：{message}")
+        table = pack_sequence(seq_dir, os.path.join(packed_dir, seq), shard_bytes, index)
+        print(f"✅ Sequence {seq} 已打包：{len(table['names'])} 帧，{len(table['shards'])} 个分片，"
+              f"共 {sum(table['shards'])} 个点")
+
+
+def unpack_dataset(packed_dir, sequences_dir, sequences):
+    """
+    把 packed_dir/<序列号>/ 还原为 sequences_dir/<序列号>/velodyne、labels
+    """
+    for seq in sequences:
+        num_frames = unpack_sequence(os.path.join(packed_dir, seq), os.path.join(sequences_dir, seq))
+        print(f"✅ Sequence {seq} 已还原 {num_frames} 帧")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SemanticKITTI 序列与打包分片（少量可内存映射的大文件 + 偏移表）互相转换")
+    parser.add_argument('mode', choices=['pack', 'unpack'])
+    parser.add_argument('--sequences_dir', default="/home/may/data/process_data/data/Final_dataset2/dataset/sequences")
+    parser.add_argument('--packed_dir', default="/home/may/data/process_data/data/Final_dataset2/packed")
+    parser.add_argument('--sequences', nargs='+', default=["00", "01", "02"])
+    parser.add_argument('--shard_mb', type=int, default=DEFAULT_SHARD_BYTES >> 20, help="每个分片点云部分的目标大小（MB）")
+    args = parser.parse_args()
+
+    if args.mode == 'pack':
+        pack_dataset(args.sequences_dir, args.packed_dir, args.sequences, args.shard_mb << 20)
+    else:
+        unpack_dataset(args.packed_dir, args.sequences_dir, args.sequences)
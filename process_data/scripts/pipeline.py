@@ -0,0 +1,146 @@
+import os
+import sys
+import argparse
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.pcd_io import read_pcd_points, write_pcd_points
+from common.frame_cache import enable_frame_cache
+from common.batch import add_batch_arguments, run_batch, report_batch
+from common.profiling import enable_profiling
+from common.prefetch import DEFAULT_PREFETCH_DEPTH
+from common.spatial import FrameIndex
+from common.splits import SPLIT_MODES, add_split_arguments, split_arguments
+
+import cut_new
+import DBSCAN as dbscan_stage
+import improve2
+import trans2kittinew
+
+# 与各阶段脚本 __main__ 中一致的参数
+DBSCAN_EPS = 2
+DBSCAN_MIN_SAMPLES = 5
+IMPROVE_COS_THRESHOLD = 0.8
+IMPROVE_DBSCAN_EPS = 0.5
+IMPROVE_DBSCAN_MIN_SAMPLES = 3
+IMPROVE_NOISE_POLICY = 'keep'
+
+# 调试输出的子目录名，与逐阶段运行时的数据集目录对应
+DEBUG_DIRS = {
+    'cut': 'aftercut_dataset',
+    'dbscan': 'afterDBSCAN_dataset',
+    'improve': 'afterimproved_dataset',
+}
+
+
+def dump_debug(debug_dir, stage, fname, points, header, data_format):
+    """
+    debug_dir 不为空时把中间结果写成 PCD，便于和逐阶段运行的结果对比
+    """
+    if not debug_dir:
+        return
+    out_dir = os.path.join(debug_dir, DEBUG_DIRS[stage])
+    os.makedirs(out_dir, exist_ok=True)
+    write_pcd_points(os.path.join(out_dir, fname), points, header, data_format)
+
+
+def process_frame(input_path, debug_dir=None, data_format='ascii'):
+    """
+    在内存中依次执行 裁剪 → 标签1最大簇 → 标签2法向细化，返回 (N×4 点, 处理后标签2点数)。
+    每一步只做掩码筛选，不经过 PCD 文本的写出和解析；近邻查询共用一个 FrameIndex，筛选后沿用未受影响的树
+    """
+    fname = os.path.basename(input_path)
+    header, points = read_pcd_points(input_path, dtype=np.float32)
+
+    # 1. 裁剪（cut_new.py）
+    points, mask_keep, _ = cut_new.crop_points(points)
+    points = points[mask_keep]
+    dump_debug(debug_dir, 'cut', fname, points, header, data_format)
+
+    # 2. 标签1只保留最大簇（DBSCAN.py）
+    points = points.astype(np.float64)
+    labels = points[:, 3].astype(int)
+    index = FrameIndex(points[:, :3], labels)
+    mask_keep, num_label1, num_kept1 = dbscan_stage.largest_label1_cluster_mask(
+        points[:, :3], labels, DBSCAN_EPS, DBSCAN_MIN_SAMPLES, index=index)
+    points = points[mask_keep]
+    index = index.select(mask_keep)
+    print(f"   标签1点数 {num_label1} -> {num_kept1}（最大簇）")
+    dump_debug(debug_dir, 'dbscan', fname, points, header, data_format)
+
+    # 3. 标签2按法向细化（improve2.py）
+    points, _, num_label2_before, num_label2_after = improve2.filter_label2_by_normal_cluster(
+        points, cos_threshold=IMPROVE_COS_THRESHOLD, dbscan_eps=IMPROVE_DBSCAN_EPS,
+        dbscan_min_samples=IMPROVE_DBSCAN_MIN_SAMPLES, index=index, noise_policy=IMPROVE_NOISE_POLICY)
+    print(f"   标签2点数 {num_label2_before} -> {num_label2_after}")
+    if num_label2_after >= improve2.MIN_LABEL2_POINTS:
+        dump_debug(debug_dir, 'improve', fname, points, header, data_format)
+    return points, num_label2_after
+
+
+def stage_frame(input_path, staging_velo, staging_label, debug_dir=None, data_format='ascii'):
+    """
+    处理一帧并写入暂存目录，返回是否被保留（标签2不少于 MIN_LABEL2_POINTS）
+    """
+    fname = os.path.basename(input_path)
+    print(f"🔧 正在处理 {fname}")
+    points, num_label2_after = process_frame(input_path, debug_dir, data_format)
+    # 只保存标签2数量大于等于30的帧
+    if num_label2_after < improve2.MIN_LABEL2_POINTS:
+        print(f"{fname} 标签2数量小于{improve2.MIN_LABEL2_POINTS}，未导出.")
+        return False
+    base_name = os.path.splitext(fname)[0]
+    trans2kittinew.write_kitti_frame(points[:, :3], points[:, 3], staging_velo, staging_label, base_name)
+    return True
+
+
+def run_pipeline(input_dir, output_root, debug_dir=None, data_format='ascii', workers=1, threads_per_worker=1,
+                 prefetch=DEFAULT_PREFETCH_DEPTH, split_mode='hardlink', counts=None, ratios=None,
+                 seed=trans2kittinew.SPLIT_SEED):
+    """
+    对 input_dir 下每帧执行完整流程，结果直接写成 SemanticKITTI 的 .bin / .label。
+    先写入 output_root/frames，全部帧处理完、知道哪些帧被保留后再按 trans2kittinew 的规则链接到各序列
+    """
+    staging_velo, staging_label = trans2kittinew.frame_dirs(output_root)
+
+    fnames = sorted(f for f in os.listdir(input_dir) if f.endswith('.pcd'))
+    tasks, inputs = [], []
+    for fname in fnames:
+        input_path = os.path.join(input_dir, fname)
+        tasks.append((fname, (input_path, staging_velo, staging_label, debug_dir, data_format)))
+        inputs.append([input_path])
+    results = run_batch(stage_frame, tasks, workers, threads_per_worker, inputs=inputs, prefetch=prefetch)
+    report_batch(results)
+    kept_names = [os.path.splitext(r.name)[0] for r in results if r.ok and r.value]
+
+    return trans2kittinew.link_splits(output_root, kept_names, split_mode, counts, ratios, seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="裁剪 → DBSCAN → 法向细化 → KITTI 导出 一次完成")
+    parser.add_argument('--input_dir', default="process_data/data/dataset")
+    parser.add_argument('--output_root', default="process_data/data/Final_dataset2/dataset")
+    parser.add_argument('--debug_dir', default=None, help="指定后写出各阶段的中间 PCD")
+    parser.add_argument('--data_format', default='ascii', choices=['ascii', 'binary', 'binary_compressed'],
+                        help="中间 PCD 的格式")
+    parser.add_argument('--cache_dir', default=None, help="启用 PCD 解析缓存")
+    add_split_arguments(parser, default_seed=trans2kittinew.SPLIT_SEED)
+    parser.add_argument('--split_mode', default='hardlink', choices=SPLIT_MODES,
+                        help="序列中的帧用硬链接 / 符号链接指向 frames，manifest 只写划分清单 splits.json")
+    add_batch_arguments(parser)
+    args = parser.parse_args()
+    if args.profile:
+        enable_profiling(args.profile)
+
+    if args.cache_dir:
+        enable_frame_cache(args.cache_dir)
+    counts, ratios = split_arguments(args, trans2kittinew.SPLIT_RATIOS)
+    assignment = run_pipeline(args.input_dir, args.output_root, args.debug_dir, args.data_format, args.workers,
+                              args.threads_per_worker, args.prefetch, args.split_mode, counts, ratios,
+                              args.seed)
+    if args.split_mode != 'manifest':
+        trans2kittinew.validate_sequences(args.output_root, list(assignment))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,25 @@
 import os
+import sys
+import argparse
 import numpy as np
-import open3d as o3d
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.pcd_io import (read_pcd_xyz_label, write_pcd_xyz_label, get_label_field, pcd_to_array, xyz_label_dtype,
+                           xyz_label_to_structured)
+from common.batch import add_batch_arguments, report_batch
+from common.profiling import enable_profiling, stage
+from common.prefetch import DEFAULT_PREFETCH_DEPTH
+from common.manifest import BuildManifest, add_manifest_arguments, run_incremental
+from common.pcd_stream import DEFAULT_CHUNK_POINTS, open_pcd_stream, PCDStreamWriter
+from common.outliers import DEFAULT_NB_NEIGHBORS, DEFAULT_STD_RATIO, outlier_keep_indices
+from common.spatial import FrameIndex
 
 def load_point_cloud(file_path):
     """
     加载 PCD 点云文件，支持 XYZ + 语义标签
     """
-    # 读取 PCD 文件，手动解析
-    points = []
-    labels = []
-    with open(file_path, 'r') as f:
-        lines = f.readlines()
-
-    # 跳过 PCD 文件头部
-    data_started = False
-    for line in lines:
-        if line.startswith("DATA ascii"):
-            data_started = True
-            continue
-        if data_started:
-            # 读取每行点云数据（包括标签）
-            parts = line.split()
-            if len(parts) == 4:
-                x, y, z, label = map(float, parts)
-                points.append([x, y, z])
-                labels.append(int(label))  # 确保标签是整数
-    points = np.array(points)
-    labels = np.array(labels).reshape(-1, 1)  # 标签转为列向量
+    _, points, labels = read_pcd_xyz_label(file_path)
+    labels = labels.reshape(-1, 1)  # 标签转为列向量
     return points, labels
 
 def remove_invalid_points(points, labels):
@@ -36,12 +29,36 @@ def remove_invalid_points(points, labels):
     mask = np.all(np.isfinite(points), axis=1)
     return points[mask], labels[mask]
 
-def remove_outliers(pcd, points, labels, nb_neighbors=20, std_ratio=2.0):
+def remove_invalid_points_stream(input_path, output_path, data_format='ascii', chunk_points=DEFAULT_CHUNK_POINTS):
+    """
+    流式移除无效点（NaN/Inf），逐块读取、判断、写出（格式与 save_pcd_with_labels 相同），内存占用与帧大小无关。
+    同一遍中累计保留点的范围和标签直方图，返回 (最小范围, 最大范围, {标签: 点数})
+    """
+    header, chunks = open_pcd_stream(input_path, chunk_points)
+    label_field = get_label_field(header)
+    min_bound, max_bound = np.full(3, np.inf), np.full(3, -np.inf)
+    label_counts = {}
+    with PCDStreamWriter(output_path, xyz_label_dtype(), data_format) as writer:
+        for chunk in chunks:
+            points = pcd_to_array(chunk, ('x', 'y', 'z'))
+            labels = chunk[label_field].astype(np.int64)
+            mask = np.all(np.isfinite(points), axis=1)
+            if mask.any():
+                min_bound = np.minimum(min_bound, points[mask].min(axis=0))
+                max_bound = np.maximum(max_bound, points[mask].max(axis=0))
+            for label, count in zip(*np.unique(labels[mask], return_counts=True)):
+                label_counts[int(label)] = label_counts.get(int(label), 0) + int(count)
+            writer.write(xyz_label_to_structured(points, labels), mask)
+    return min_bound, max_bound, label_counts
+
+def remove_outliers(points, labels, nb_neighbors=DEFAULT_NB_NEIGHBORS, std_ratio=DEFAULT_STD_RATIO, index=None,
+                    label_params=None):
     """
-    统计滤波去除离群点
+    去除离群点，近邻通过本帧的 FrameIndex 查询：label_params 为 None 时对全部点统计滤波（规则与
+    open3d remove_statistical_outlier 相同），否则按标签分别滤波（见 common/outliers.py label_outlier_mask）
     """
-    cl, ind = pcd.remove_statistical_outlier(nb_neighbors=nb_neighbors, std_ratio=std_ratio)
-    return cl, points[ind], labels[ind]
+    keep = outlier_keep_indices(points, labels.reshape(-1), label_params, nb_neighbors, std_ratio, index)
+    return points[keep], labels[keep]
 
 def check_point_cloud_range(points):
     """
@@ -51,84 +68,88 @@ def check_point_cloud_range(points):
     max_bound = np.max(points, axis=0)
     return min_bound, max_bound
 
-def save_pcd_with_labels(file_path, points, labels):
+def save_pcd_with_labels(file_path, points, labels, data_format='ascii'):
     """
     以 PointXYZI（XYZ + 标签）格式保存 PCD，确保 ROS 读取时能找到 'intensity' 字段
     """
-    # 组合 XYZ + 标签（作为 Intensity）
-    structured_array = np.zeros(points.shape[0], dtype=[("x", np.float32), 
-                                                         ("y", np.float32), 
-                                                         ("z", np.float32), 
-                                                         ("intensity", np.int32)])  # 标签为整型
-    structured_array["x"] = points[:, 0]
-    structured_array["y"] = points[:, 1]
-    structured_array["z"] = points[:, 2]
-    structured_array["intensity"] = labels.flatten()  # 将标签作为整型保存
-
-    # 保存 PCD
-    with open(file_path, 'w') as f:
-        # 写入头部信息
-        f.write("# .PCD v0.7 - Point Cloud Data file format\n")
-        f.write("VERSION 0.7\n")
-        f.write("FIELDS x y z intensity\n")
-        f.write("SIZE 4 4 4 4\n")
-        f.write("TYPE F F F I\n")  # int32 for intensity
-        f.write("COUNT 1 1 1 1\n")
-        f.write(f"WIDTH {len(points)}\n")
-        f.write("HEIGHT 1\n")
-        f.write("VIEWPOINT 0 0 0 1 0 0 0\n")
-        f.write(f"POINTS {len(points)}\n")
-        f.write("DATA ascii\n")
-
-        # 写入点云数据
-        for i in range(len(points)):
-            f.write(f"{structured_array['x'][i]} {structured_array['y'][i]} {structured_array['z'][i]} {structured_array['intensity'][i]}\n")
-
-def process_point_clouds(directory, output_directory):
-    """
-    处理点云：去除无效点、离群点，计算范围，并保存新的 PCD
+    # XYZ 为 float32，标签作为整型 intensity 保存
+    write_pcd_xyz_label(file_path, points, labels, data_format=data_format)
+
+def process_point_cloud(file_path, output_path, data_format='ascii', label_params=None):
     """
-    if not os.path.exists(output_directory):
-        os.makedirs(output_directory)
-    
-    min_bounds = []
-    max_bounds = []
-    avg_min_bound = []
-    avg_max_bound = []
+    处理单个点云：去除无效点、离群点，保存新的 PCD，返回 (最小范围, 最大范围)
+    """
+    print(f"Processing: {file_path}")
 
-    for filename in os.listdir(directory):
-        if filename.endswith(".pcd"):
-            file_path = os.path.join(directory, filename)
-            print(f"Processing: {file_path}")
+    # 1. 读取 PCD
+    points, labels = load_point_cloud(file_path)
+
+    # 2. 去除无效点
+    with stage('invalid_filter', points.shape[0]) as s:
+        points, labels = remove_invalid_points(points, labels)
+        s.points_out = points.shape[0]
 
-            # 1. 读取 PCD
-            points, labels = load_point_cloud(file_path)
+    # 3. 统计滤波去除离群点
+    with stage('outlier_removal', points.shape[0]) as s:
+        points, labels = remove_outliers(points, labels, index=FrameIndex(points, labels[:, 0]),
+                                         label_params=label_params)
+        s.points_out = points.shape[0]
 
-            # 2. 去除无效点
-            points, labels = remove_invalid_points(points, labels)
+    # 4. 计算点云范围
+    min_bound, max_bound = check_point_cloud_range(points)
+    print(f"Range: min {min_bound}, max {max_bound}")
 
-            # 3. 统计滤波去除离群点
-            pcd = o3d.geometry.PointCloud()
-            pcd.points = o3d.utility.Vector3dVector(points)
-            pcd, points, labels = remove_outliers(pcd, points, labels)
+    # 5. 以 PointXYZI 格式保存
+    save_pcd_with_labels(output_path, points, labels, data_format)
+    print(f"Saved: {output_path}\n")
+    return min_bound, max_bound
 
-            # 4. 计算点云范围
-            min_bound, max_bound = check_point_cloud_range(points)
-            min_bounds.append(min_bound)
-            max_bounds.append(max_bound)
-            avg_min_bound.append(min_bound)
-            avg_max_bound.append(max_bound)
+def process_point_cloud_stream(file_path, output_path, data_format='ascii', chunk_points=DEFAULT_CHUNK_POINTS):
+    """
+    流式处理单个点云：只去除无效点（离群点滤波需要整帧的近邻，流式模式不做），打印标签直方图，
+    返回 (最小范围, 最大范围)。分块写出只支持 ascii / binary
+    """
+    print(f"Processing: {file_path}")
+    with stage('invalid_filter_stream'):
+        min_bound, max_bound, label_counts = remove_invalid_points_stream(file_path, output_path, data_format,
+                                                                          chunk_points)
+    print(f"Range: min {min_bound}, max {max_bound}")
+    print(f"Labels: {dict(sorted(label_counts.items()))}")
+    print(f"Saved: {output_path}\n")
+    return min_bound, max_bound
 
-            print(f"Range: min {min_bound}, max {max_bound}")
+def process_point_clouds(directory, output_directory, data_format='ascii', workers=1, threads_per_worker=1, resume=True,
+                         prefetch=DEFAULT_PREFETCH_DEPTH, label_params=None, stream=False,
+                         chunk_points=DEFAULT_CHUNK_POINTS):
+    """
+    处理点云：去除无效点、离群点，计算范围，并保存新的 PCD。
+    stream 为 True 时逐块处理、内存与帧大小无关，只去除无效点（见 process_point_cloud_stream）
+    """
+    if not os.path.exists(output_directory):
+        os.makedirs(output_directory)
 
-            # 5. 以 PointXYZI 格式保存
+    tasks = []
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(".pcd"):
+            input_path = os.path.join(directory, filename)
             output_path = os.path.join(output_directory, filename)
-            save_pcd_with_labels(output_path, points, labels)
-            print(f"Saved: {output_path}\n")
+            args = (input_path, output_path, data_format, chunk_points) if stream else \
+                (input_path, output_path, data_format, label_params)
+            tasks.append((filename, args, [input_path], [output_path]))
+    manifest = BuildManifest(output_directory, {'data_format': data_format, 'outlier_label_params': label_params,
+                                                'stream': stream},
+                             [__file__])
+    # 流式处理不预读整帧
+    results = run_incremental(process_point_cloud_stream if stream else process_point_cloud, tasks, manifest, resume,
+                              workers, threads_per_worker, 0 if stream else prefetch)
+    report_batch(results)
+
+    min_bounds = [r.value[0] for r in results if r.ok]
+    max_bounds = [r.value[1] for r in results if r.ok]
 
     # 计算整体的平均范围、最小值范围和最大值范围
-    avg_min_bound = np.mean(avg_min_bound, axis=0) if avg_min_bound else None
-    avg_max_bound = np.mean(avg_max_bound, axis=0) if avg_max_bound else None
+    avg_min_bound = np.mean(min_bounds, axis=0) if min_bounds else None
+    avg_max_bound = np.mean(max_bounds, axis=0) if max_bounds else None
     min_bound_overall = np.min(min_bounds, axis=0) if min_bounds else None
     max_bound_overall = np.max(max_bounds, axis=0) if max_bounds else None
 
@@ -139,4 +160,18 @@ def process_point_clouds(directory, output_directory):
 if __name__ == "__main__":
     dataset_path = "/home/may/data/dataset"
     processed_path = "/home/may/data/processed_pcd"
-    process_point_clouds(dataset_path, processed_path)
+    data_format = "ascii"  # 输出格式：ascii / binary / binary_compressed
+    # 按标签设置离群点滤波参数，None 为全帧统计滤波（与 open3d 相同）。例：{1: None} 吊具点不过滤，
+    # 其余标签各自在本标签内统计滤波；{0: {'nb_points': 5, 'radius': 0.5}} 标签0改用半径滤波
+    outlier_label_params = None
+    parser = argparse.ArgumentParser(description="去除无效点与离群点")
+    parser.add_argument('--stream', action='store_true',
+                        help="逐块流式处理，内存占用与帧大小无关；只去除无效点并统计标签直方图，不做离群点滤波")
+    parser.add_argument('--chunk_points', type=int, default=DEFAULT_CHUNK_POINTS, help="流式处理时每块的点数")
+    add_batch_arguments(parser)
+    add_manifest_arguments(parser)
+    args = parser.parse_args()
+    if args.profile:
+        enable_profiling(args.profile)
+    process_point_clouds(dataset_path, processed_path, data_format, args.workers, args.threads_per_worker,
+                         args.resume, args.prefetch, outlier_label_params, args.stream, args.chunk_points)
@@ -1,60 +1,145 @@
 import os
+import sys
+import csv
+import json
+import argparse
 import numpy as np
-from scipy.spatial import KDTree
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.frames import open_kitti_bin, xyz_view
+from common.spatial import FrameIndex
+from common.batch import add_batch_arguments, run_batch, report_batch, thread_budget
+from common.profiling import enable_profiling, stage
 
 DATA_ROOT = "kitti/dataset/sequences"  # 数据集根目录
 COORD_DIM = 3  # 检查前3个坐标 (x,y,z)
 ISOLATION_DISTANCE = 1.0  # 孤立点的距离阈值
+DUPLICATE_RESOLUTION = 0.0  # 大于 0 时坐标按该分辨率量化后判断重复（近似重复点），0 为坐标完全相同才算重复
+EXAMPLE_COUNT = 5  # 打印和报告中每类问题的示例点数
+# 报告中每个文件的计数字段，CSV 按此顺序输出（JSON 另含各类问题的示例下标）
+REPORT_FIELDS = ('sequence', 'file', 'points', 'invalid', 'nan', 'inf', 'duplicates', 'isolated', 'error')
+# 量化坐标按列乘以不同的奇数后异或得到 64 位哈希
+_HASH_MULTIPLIERS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9)
+
+def _quantize(xyz, resolution):
+    """
+    重复点判断用的整数坐标：resolution > 0 时为所在网格的编号 k（k·resolution <= 坐标 < (k+1)·resolution，
+    在 float64 下比较），否则为浮点数的位模式（-0.0 先归一为 0.0）
+    """
+    if resolution > 0:
+        values = xyz.astype(np.float64)
+        cells = np.floor(values / resolution)
+        # 除法的舍入可能让恰在格边界上的坐标落到相邻的格，按乘回去的边界修正一格
+        cells -= cells * resolution > values
+        cells += (cells + 1) * resolution <= values
+        return cells.astype(np.int64)
+    normalized = np.ascontiguousarray(xyz + xyz.dtype.type(0))
+    return normalized.view(np.dtype(f'u{xyz.dtype.itemsize}'))
+
+def duplicate_indices(xyz, resolution=DUPLICATE_RESOLUTION):
+    """
+    重复点的下标（升序）：与某个下标更小的点坐标相同（按 resolution 量化后）的点，resolution 为 0 时与
+    np.unique(axis=0) 之外的点相同。先对每行的量化坐标求 64 位哈希，只有哈希值出现多次的少数点再逐行比较，
+    不必对整帧按行做字典序排序
+    """
+    keys = _quantize(xyz, resolution)
+    hashes = np.zeros(keys.shape[0], dtype=np.uint64)
+    for column, multiplier in zip(keys.T, _HASH_MULTIPLIERS):
+        hashes ^= column.astype(np.uint64) * np.uint64(multiplier)
+    order = np.argsort(hashes)
+    same = hashes[order[1:]] == hashes[order[:-1]]
+    if not same.any():
+        return np.empty(0, dtype=np.int64)
+    in_run = np.zeros(keys.shape[0], dtype=bool)
+    in_run[1:] |= same
+    in_run[:-1] |= same
+    candidates = np.sort(order[in_run])
+    # 候选点升序排列，return_index 给出的即每组中下标最小的点；哈希碰撞的不同坐标在这里分开
+    _, first = np.unique(keys[candidates], axis=0, return_index=True)
+    return np.setdiff1d(candidates, candidates[first])
+
+def isolated_indices(xyz, distance=ISOLATION_DISTANCE, index=None):
+    """
+    最近的其他点远于 distance 的点的下标（升序）：全部点一次批量查询最近的两个点（第一个是自身），
+    按 thread_budget() 多线程执行。查询按 KD 树叶节点的顺序提交，相邻查询走相近的树节点，缓存命中更好
+    """
+    if index is None:
+        index = FrameIndex(xyz)
+    tree = index.tree()
+    dist, _ = tree.query(xyz[tree.indices], k=2, workers=thread_budget())
+    return np.sort(tree.indices[dist[:, 1] > distance])
+
+def scan_points(points):
+    """
+    检查一帧的坐标，返回 {'nan', 'inf', 'duplicates', 'isolated': 下标数组}；
+    重复点和孤立点只在坐标有限的点中判断
+    """
+    coords = points[:, :COORD_DIM]
+    with stage('invalid_check', points.shape[0]):
+        nan_rows = np.isnan(coords).any(axis=1)
+        inf_rows = np.isinf(coords).any(axis=1)
+        finite = np.flatnonzero(~(nan_rows | inf_rows))
+        xyz = coords if finite.shape[0] == points.shape[0] else coords[finite]
+    with stage('duplicates', xyz.shape[0]):
+        duplicates = finite[duplicate_indices(xyz)]
+    with stage('isolation', xyz.shape[0]):
+        isolated = finite[isolated_indices(xyz)] if xyz.shape[0] else np.empty(0, dtype=np.int64)
+    return {'nan': np.flatnonzero(nan_rows), 'inf': np.flatnonzero(inf_rows), 'duplicates': duplicates,
+            'isolated': isolated}
 
-def check_invalid_points(file_path):
-    """检查单个点云文件中的NaN和Inf值"""
+def scan_file(file_path, sequence):
+    """
+    扫描单个 .bin，打印发现的问题，返回一条报告记录（只含计数和示例下标，可在进程间传递）
+    """
+    record = {'sequence': sequence, 'file': os.path.basename(file_path), 'points': 0, 'invalid': 0, 'nan': 0,
+              'inf': 0, 'duplicates': 0, 'isolated': 0, 'error': ''}
     try:
-        # 读取二进制数据 (假设格式为x,y,z)
-        points = np.fromfile(file_path, dtype=np.float32).reshape(-1, 3)
+        points = xyz_view(open_kitti_bin(file_path))
     except Exception as e:
         print(f"读取文件 {file_path} 失败: {str(e)}")
-        return False, [], [], []
-
-    # 向量化检查：同时检测NaN和Inf
-    invalid_mask = np.logical_or(
-        np.isnan(points[:, :COORD_DIM]),
-        np.isinf(points[:, :COORD_DIM])
-    )
-    invalid_indices = np.where(np.any(invalid_mask, axis=1))[0]
-
-    # 检查重复点
-    unique_points, unique_indices = np.unique(points, axis=0, return_index=True)
-    duplicate_indices = np.setdiff1d(np.arange(points.shape[0]), unique_indices)
-
-    # 检查孤立点
-    tree = KDTree(points)
-    isolated_indices = []
-    for i, point in enumerate(points):
-        distances, _ = tree.query(point, k=2)
-        if distances[1] > ISOLATION_DISTANCE:
-            isolated_indices.append(i)
-
-    # 生成详细报告
-    invalid_points = []
-    for idx in invalid_indices:
-        coords = points[idx, :COORD_DIM]
-        problem_types = []
-        if np.any(np.isnan(coords)):
-            problem_types.append("NaN")
-        if np.any(np.isinf(coords)):
-            problem_types.append("Inf")
-        invalid_points.append((idx, "|".join(problem_types), coords))
-
-    return len(invalid_points) > 0, invalid_points, points, duplicate_indices, isolated_indices
-
-def scan_dataset(data_root):
-    """遍历数据集并统计问题"""
-    error_files = 0
-    total_points = 0
-    invalid_points_total = 0
-    duplicate_points_total = 0
-    isolated_points_total = 0
+        record['error'] = str(e)
+        return record
+    found = scan_points(points)
+    invalid = np.union1d(found['nan'], found['inf'])
+    record.update(points=int(points.shape[0]), invalid=int(invalid.shape[0]), nan=int(found['nan'].shape[0]),
+                  inf=int(found['inf'].shape[0]), duplicates=int(found['duplicates'].shape[0]),
+                  isolated=int(found['isolated'].shape[0]))
+    for key, idx in (('invalid', invalid), ('duplicates', found['duplicates']), ('isolated', found['isolated'])):
+        record[f'{key}_examples'] = idx[:EXAMPLE_COUNT].tolist()
 
+    name = record['file']
+    if invalid.size > 0:
+        print(f" 发现无效点: {name}")
+        print(f"    首5个无效点示例:")
+        for idx in invalid[:EXAMPLE_COUNT]:
+            coords = points[idx, :COORD_DIM]
+            problem_types = [t for t, bad in (("NaN", np.isnan(coords).any()), ("Inf", np.isinf(coords).any())) if bad]
+            print(f"     点索引 {idx} - 问题类型 {'|'.join(problem_types)} - 坐标 {coords}")
+    if found['duplicates'].size > 0:
+        print(f" 发现重复点: {name}")
+        print(f"    首5个重复点索引: {found['duplicates'][:EXAMPLE_COUNT]}")
+    if found['isolated'].size > 0:
+        print(f" 发现孤立点: {name}")
+        print(f"    首5个孤立点索引: {found['isolated'][:EXAMPLE_COUNT].tolist()}")
+    return record
+
+def write_report(report_path, records, summary):
+    """
+    逐文件报告：.csv 写出 REPORT_FIELDS 各列，其余写 JSON（{'summary': 汇总, 'files': 全部记录}）
+    """
+    if report_path.endswith('.csv'):
+        with open(report_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(records)
+    else:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump({'summary': summary, 'files': records}, f, ensure_ascii=False, indent=1)
+
+def scan_dataset(data_root, workers=1, threads_per_worker=1, report_path=None):
+    """遍历数据集并统计问题，各帧可在进程池中并行扫描"""
+    tasks = []
+    sequences = []
     for seq in sorted(os.listdir(data_root)):  # 按顺序检查00,01,02...
         seq_path = os.path.join(data_root, seq)
         if not os.path.isdir(seq_path):
@@ -64,39 +149,53 @@ def scan_dataset(data_root):
         if not os.path.exists(velodyne_path):
             continue
 
-        print(f"正在扫描序列 {seq}...")
-        for file in sorted(os.listdir(velodyne_path)):
-            if not file.endswith(".bin"):
-                continue
-
-            file_path = os.path.join(velodyne_path, file)
-            has_invalid, invalid_points, points, duplicate_indices, isolated_indices = check_invalid_points(file_path)
-            total_points += len(points)
-            duplicate_points_total += len(duplicate_indices)
-            isolated_points_total += len(isolated_indices)
-
-            if has_invalid:
-                error_files += 1
-                invalid_points_total += len(invalid_points)
-                print(f" 发现无效点: {file}")
-                print(f"    首5个无效点示例:")
-                for pt in invalid_points[:5]:
-                    print(f"     点索引 {pt[0]} - 问题类型 {pt[1]} - 坐标 {pt[2]}")
-            if duplicate_indices.size > 0:
-                print(f" 发现重复点: {file}")
-                print(f"    首5个重复点索引: {duplicate_indices[:5]}")
-            if len(isolated_indices) > 0:
-                print(f" 发现孤立点: {file}")
-                print(f"    首5个孤立点索引: {isolated_indices[:5]}")
+        files = sorted(f for f in os.listdir(velodyne_path) if f.endswith(".bin"))
+        print(f"序列 {seq}: {len(files)} 个文件")
+        sequences.append(seq)
+        tasks += [(f"{seq}/{file}", (os.path.join(velodyne_path, file), seq)) for file in files]
+
+    results = run_batch(scan_file, tasks, workers, threads_per_worker)
+    report_batch(results)
+    records = []
+    for r in results:
+        if r.ok:
+            records.append(r.value)
+        else:
+            seq, file = r.name.split('/', 1)
+            records.append({'sequence': seq, 'file': file, 'error': r.error.strip().splitlines()[-1]})
+
+    summary = {
+        'sequences': len(sequences),
+        'files': len(records),
+        'points': sum(r.get('points', 0) for r in records),
+        'files_with_invalid': sum(r.get('invalid', 0) > 0 for r in records),
+        'invalid': sum(r.get('invalid', 0) for r in records),
+        'duplicates': sum(r.get('duplicates', 0) for r in records),
+        'isolated': sum(r.get('isolated', 0) for r in records),
+        'failed_files': sum(bool(r['error']) for r in records),
+    }
 
     # 最终统计报告
     print("\n===== 检查完成 =====")
-    print(f"扫描序列数量: {len(os.listdir(data_root))}")
-    print(f"总点数: {total_points}")
-    print(f"包含无效点的文件数: {error_files}")
-    print(f"无效点总数: {invalid_points_total}")
-    print(f"重复点总数: {duplicate_points_total}")
-    print(f"孤立点总数: {isolated_points_total}")
+    print(f"扫描序列数量: {summary['sequences']}")
+    print(f"总点数: {summary['points']}")
+    print(f"包含无效点的文件数: {summary['files_with_invalid']}")
+    print(f"无效点总数: {summary['invalid']}")
+    print(f"重复点总数: {summary['duplicates']}")
+    print(f"孤立点总数: {summary['isolated']}")
+    if summary['failed_files']:
+        print(f"读取或扫描失败的文件数: {summary['failed_files']}")
+    if report_path:
+        write_report(report_path, records, summary)
+        print(f"逐文件报告已写入 {report_path}")
+    return records, summary
 
 if __name__ == "__main__":
-    scan_dataset(DATA_ROOT)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="扫描 KITTI 数据集各帧的无效点（NaN/Inf）、重复点、孤立点")
+    parser.add_argument('--data_root', default=DATA_ROOT, help="sequences 目录")
+    parser.add_argument('--report', default=None, help="逐文件报告写入该文件，.csv 结尾为 CSV，否则为 JSON")
+    add_batch_arguments(parser)
+    args = parser.parse_args()
+    if args.profile:
+        enable_profiling(args.profile)
+    scan_dataset(args.data_root, args.workers, args.threads_per_worker, args.report)
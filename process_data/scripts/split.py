@@ -1,73 +1,52 @@
 import os
-import shutil
-import random
+import sys
+import argparse
 
-def split_dataset(base_dir, src_sequence="00", val_size=100, test_size=100, seed=42):
-    """
-    分割数据集并创建验证集和测试集
-    :param base_dir: 数据集根目录（包含sequences文件夹的路径）
-    :param src_sequence: 原始数据所在的序列目录（默认为00）
-    :param val_size: 验证集样本数
-    :param test_size: 测试集样本数
-    :param seed: 随机种子（保证可重复性）
-    """
-    # 路径设置
-    src_dir = os.path.join(base_dir, "sequences", src_sequence)
-    val_dir = os.path.join(base_dir, "sequences", "01")
-    test_dir = os.path.join(base_dir, "sequences", "02")
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.splits import (SPLIT_MODES, add_split_arguments, assign_splits, materialize_splits,
+                           migrate_sequences_to_pool, source_frames, split_arguments, split_sizes)
 
-    # 获取所有样本（基于bin文件）
-    bin_files = [f for f in os.listdir(os.path.join(src_dir, "velodyne")) if f.endswith(".bin")]
-    base_names = [os.path.splitext(f)[0] for f in bin_files]  # 去除扩展名
-    
-    # 随机打乱并分割
-    random.seed(seed)
-    random.shuffle(base_names)
-    
-    # 分割数据集
-    val_samples = base_names[:val_size]
-    test_samples = base_names[val_size:val_size+test_size]
-    
-    # 创建目标目录
-    for seq in ["01", "02"]:
-        os.makedirs(os.path.join(base_dir, "sequences", seq, "velodyne"), exist_ok=True)
-        os.makedirs(os.path.join(base_dir, "sequences", seq, "labels"), exist_ok=True)
 
-    # 移动验证集（01）
-    print(f"正在迁移验证集到01（{val_size}个样本）...")
-    for base in val_samples:
-        # 移动点云文件
-        src_bin = os.path.join(src_dir, "velodyne", f"{base}.bin")
-        dst_bin = os.path.join(val_dir, "velodyne", f"{base}.bin")
-        shutil.move(src_bin, dst_bin)
-        
-        # 移动标签文件
-        src_label = os.path.join(src_dir, "labels", f"{base}.label")
-        dst_label = os.path.join(val_dir, "labels", f"{base}.label")
-        shutil.move(src_label, dst_label)
+def split_dataset(source_dirs, out_root, counts=None, ratios=None, seed=None, mode='hardlink'):
+    """
+    分割数据集：把 source_dirs 中的帧按 counts（帧数）或 ratios（比例）和随机种子分到各划分，
+    在 out_root/sequences/<划分>/ 下建立链接（或只写划分清单），不移动、不改写来源文件，可换种子重复运行
+    :param source_dirs: 帧的来源目录（包含 velodyne、labels 的序列目录，或 kitti_shards 的打包目录）
+    :param out_root: 输出根目录，划分清单写在 out_root/splits.json
+    :param counts: {划分名: 帧数}，至多一个为 None 表示取剩下的全部
+    :param ratios: {划分名: 比例}
+    :param seed: 随机种子（None 时按帧名顺序切分）
+    :param mode: hardlink / symlink / manifest
+    """
+    frames = source_frames(source_dirs)
+    sizes = split_sizes(len(frames), counts, ratios)
+    assignment = assign_splits(frames, sizes, seed)
+    params = {'sources': [os.path.abspath(d) for d in source_dirs], 'counts': counts, 'ratios': ratios, 'seed': seed}
+    created, removed = materialize_splits(frames, assignment, out_root, mode, params)
 
-    # 移动测试集（02）
-    print(f"正在迁移测试集到02（{test_size}个样本）...")
-    for base in test_samples:
-        src_bin = os.path.join(src_dir, "velodyne", f"{base}.bin")
-        dst_bin = os.path.join(test_dir, "velodyne", f"{base}.bin")
-        shutil.move(src_bin, dst_bin)
-        
-        src_label = os.path.join(src_dir, "labels", f"{base}.label")
-        dst_label = os.path.join(test_dir, "labels", f"{base}.label")
-        shutil.move(src_label, dst_label)
+    print("分割完成！" + " | ".join(f"{split}：{len(names)}" for split, names in assignment.items()))
+    print(f"新建链接 {created} 个，删除旧链接 {removed} 个")
+    return assignment
 
-    # 统计结果
-    remaining = len(base_names) - val_size - test_size
-    print(f"分割完成！剩余训练样本：{remaining} | 验证集：{val_size} | 测试集：{test_size}")
 
 if __name__ == "__main__":
     # 配置参数
     DATASET_ROOT = "/home/may/data/aqc_phase1/dataset"  # 替换为实际路径
-    
-    split_dataset(
-        base_dir=DATASET_ROOT,
-        val_size=100,
-        test_size=100,
-        seed=2023  # 固定随机种子保证可重复性
-    )
\ No newline at end of file
+
+    parser = argparse.ArgumentParser(description="按帧数或比例和随机种子划分训练/验证/测试集，以链接或划分清单的形式输出")
+    parser.add_argument('--source', nargs='+', default=None,
+                        help="帧的来源目录（序列目录或打包目录），不能是输出的 sequences/<划分>；"
+                             "默认 <out_root>/frames，旧布局（帧都在 sequences/<划分>/ 下）先迁移到这里")
+    parser.add_argument('--out_root', default=DATASET_ROOT)
+    add_split_arguments(parser, default_seed=2023)  # 固定随机种子保证可重复性
+    parser.add_argument('--mode', default='hardlink', choices=SPLIT_MODES)
+    args = parser.parse_args()
+
+    source = args.source
+    if source is None:
+        source = [os.path.join(args.out_root, "frames")]
+        moved = migrate_sequences_to_pool(args.out_root, source[0])
+        if moved:
+            print(f"旧布局：已把 sequences 下的 {moved} 个文件移动到 {source[0]}，各划分改为链接")
+    counts, ratios = split_arguments(args, {"00": 7, "01": 1, "02": 1})
+    split_dataset(source, args.out_root, counts, ratios, args.seed, args.mode)
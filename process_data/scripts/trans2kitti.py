@@ -1,32 +1,16 @@
 import os
+import sys
 import numpy as np
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.pcd_io import read_pcd_xyz_label
+
 def read_pcd(input_path):
     """
     读取 PCD 文件，返回点云数据和标签。
     """
-    with open(input_path, 'r') as f:
-        lines = f.readlines()
-    
-    # 查找数据开始的位置
-    data_start_idx = 0
-    for i, line in enumerate(lines):
-        if line.startswith('DATA'):
-            data_start_idx = i + 1
-            break
-    
-    # 读取点云数据
-    point_cloud = []
-    labels = []
-    for line in lines[data_start_idx:]:
-        values = line.split()
-        if len(values) >= 4:
-            x, y, z = map(float, values[:3])
-            intensity = int(float(values[3]))  # 标签值
-            point_cloud.append([x, y, z])
-            labels.append(intensity)
-    
-    return np.array(point_cloud, dtype=np.float32), np.array(labels, dtype=np.int32)
+    _, point_cloud, labels = read_pcd_xyz_label(input_path, xyz_dtype=np.float32, label_dtype=np.int32)
+    return point_cloud, labels
 
 def convert_to_bin_and_label(input_pcd_dir, output_bin_dir, output_label_dir):
     """
@@ -57,37 +41,20 @@ def organize_data(input_bin_dir, input_label_dir, output_dir):
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
     
-    sequences = set()
-    for filename in os.listdir(input_bin_dir):
-        if filename.endswith('.bin'):
-            sequence_id = filename.split('_')[0]  # 假设文件名格式为 'sequenceID_index.pcd'
-            sequences.add(sequence_id)
-    
-    for seq in sequences:
-        seq_dir = os.path.join(output_dir, seq)
-        if not os.path.exists(seq_dir):
-            os.makedirs(seq_dir)
-        
-        velodyne_dir = os.path.join(seq_dir, 'velodyne')
-        labels_dir = os.path.join(seq_dir, 'labels')
-        if not os.path.exists(velodyne_dir):
-            os.makedirs(velodyne_dir)
-        if not os.path.exists(labels_dir):
-            os.makedirs(labels_dir)
-        
-        # 复制文件到对应的文件夹
-        for filename in os.listdir(input_bin_dir):
-            if filename.startswith(seq) and filename.endswith('.bin'):
-                os.rename(
-                    os.path.join(input_bin_dir, filename),
-                    os.path.join(velodyne_dir, filename)
-                )
-        for filename in os.listdir(input_label_dir):
-            if filename.startswith(seq) and filename.endswith('.label'):
-                os.rename(
-                    os.path.join(input_label_dir, filename),
-                    os.path.join(labels_dir, filename)
-                )
+    # 一次遍历按序列号分组，每个输入目录只列一次
+    grouped = {}
+    for input_dir, ext, sub in ((input_bin_dir, '.bin', 'velodyne'), (input_label_dir, '.label', 'labels')):
+        for filename in os.listdir(input_dir):
+            if filename.endswith(ext):
+                sequence_id = filename.split('_')[0]  # 假设文件名格式为 'sequenceID_index.pcd'
+                grouped.setdefault((sequence_id, sub), []).append(os.path.join(input_dir, filename))
+
+    # 移动文件到对应的文件夹
+    for (seq, sub), paths in grouped.items():
+        target_dir = os.path.join(output_dir, seq, sub)
+        os.makedirs(target_dir, exist_ok=True)
+        for path in paths:
+            os.rename(path, os.path.join(target_dir, os.path.basename(path)))
 
 if __name__ == '__main__':
     input_pcd_dir = '/home/may/data/process_data/data/afterDBSCAN_dataset'  # 替换为您的 PCD 文件夹路径
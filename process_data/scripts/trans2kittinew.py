@@ -1,93 +1,141 @@
 import os
+import sys
+import argparse
 import numpy as np
 import shutil
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.pcd_io import read_pcd_xyz_label, write_file_bytes
+from common.frame_cache import enable_frame_cache
+from common.batch import add_batch_arguments, report_batch
+from common.profiling import enable_profiling, stage
+from common.prefetch import DEFAULT_PREFETCH_DEPTH
+from common.manifest import BuildManifest, add_manifest_arguments, run_incremental
+from common.kitti_index import index_problems, update_sequence_index
+from common.splits import (SPLIT_MODES, add_split_arguments, assign_splits, materialize_splits,
+                           migrate_sequences_to_pool, source_frames, split_arguments, split_sizes)
+from packkitti import pack_dataset
+
+# 默认序列划分：00 训练、01 验证、02 测试按 7:1:1（900 帧时为 700 / 100 / 100），可用 --counts / --ratios 修改；
+# SPLIT_SEED 为 None 时按帧名顺序切分，否则按种子打乱
+SPLIT_RATIOS = {"00": 7, "01": 1, "02": 1}
+SPLIT_SEED = None
+# 全部帧只转换一次写入 <output_root>/frames，sequences 下各序列是指向它的链接，换划分时不重写数据
+FRAMES_DIR = "frames"
+
+
 def read_pcd_with_label(input_path):
     """读取 PCD 文件，返回点云数据和标签"""
-    with open(input_path, 'r') as f:
-        lines = [line.strip() for line in f.readlines()]
-    
-    data_start = lines.index('DATA ascii') + 1
-    
-    points = []
-    labels = []
-    for line in lines[data_start:]:
-        if not line:
-            continue
-        parts = line.split()
-        if len(parts) >= 4:
-            x, y, z = map(float, parts[:3])
-            label = int(float(parts[3]))
-            points.append([x, y, z])  # 去掉强度 # 强度为 0
-            labels.append(label)
-
-    return np.array(points, dtype=np.float32), np.array(labels, dtype=np.uint32)
-
-
-def convert_and_split_dataset(pcd_dir, output_root):
-    """将所有 PCD 文件分成三个序列（00、01、02）并转换为 SemanticKITTI 格式"""
-    # 所有 .pcd 文件排序后分组
-    all_files = sorted([f for f in os.listdir(pcd_dir) if f.endswith('.pcd')])
-    total = len(all_files)
-    assert total == 900, f"期望 1198 个文件，实际找到 {total} 个"
-
-    split_00 = all_files[:700]
-    split_01 = all_files[700:800]
-    split_02 = all_files[800:]
-
-    splits = {
-        "00": split_00,
-        "01": split_01,
-        "02": split_02
-    }
-
-    for seq_id, file_list in splits.items():
-        print(f"🔧 正在处理 sequence {seq_id}（{len(file_list)} 个文件）")
-
-        velo_dir = os.path.join(output_root, "sequences", seq_id, "velodyne")
-        label_dir = os.path.join(output_root, "sequences", seq_id, "labels")
-        os.makedirs(velo_dir, exist_ok=True)
-        os.makedirs(label_dir, exist_ok=True)
-
-        for fname in file_list:
-            input_path = os.path.join(pcd_dir, fname)
-            points, labels = read_pcd_with_label(input_path)
-
-            base_name = os.path.splitext(fname)[0]
-            bin_path = os.path.join(velo_dir, f"{base_name}.bin")
-            label_path = os.path.join(label_dir, f"{base_name}.label")
-
-            points.tofile(bin_path)
-            labels.tofile(label_path)
-
-        print(f"✅ Sequence {seq_id} 处理完成，已写入 {len(file_list)} 个文件")
-
-def validate_sequences(output_root):
-    """验证每个序列中的 .bin 和 .label 文件是否一一对应"""
-    for seq in ["00", "01", "02"]:
-        seq_dir = os.path.join(output_root, "sequences", seq)
-        velo_dir = os.path.join(seq_dir, "velodyne")
-        label_dir = os.path.join(seq_dir, "labels")
-
-        bin_files = {os.path.splitext(f)[0] for f in os.listdir(velo_dir) if f.endswith('.bin')}
-        label_files = {os.path.splitext(f)[0] for f in os.listdir(label_dir) if f.endswith('.label')}
-
-        missing_bin = label_files - bin_files
-        missing_label = bin_files - label_files
-
-        if missing_bin or missing_label:
+    _, points, labels = read_pcd_xyz_label(input_path, xyz_dtype=np.float32, label_dtype=np.uint32)
+    return points, labels
+
+
+def split_assignment(names, counts=None, ratios=None, seed=SPLIT_SEED):
+    """按 counts 或 ratios（都为空时为 SPLIT_RATIOS）把帧名分成 00（训练）、01（验证）、02（测试）等序列"""
+    if counts is None and ratios is None:
+        ratios = SPLIT_RATIOS
+    return assign_splits(names, split_sizes(len(names), counts, ratios), seed)
+
+
+def frame_dirs(output_root):
+    """返回并创建全部帧所在的 velodyne / labels 目录；旧布局（帧是 sequences/NN 下的普通文件）先迁移过来"""
+    moved = migrate_sequences_to_pool(output_root, os.path.join(output_root, FRAMES_DIR))
+    if moved:
+        print(f"旧布局：已把 sequences 下的 {moved} 个文件移动到 {FRAMES_DIR}，各序列改为链接")
+    velo_dir = os.path.join(output_root, FRAMES_DIR, "velodyne")
+    label_dir = os.path.join(output_root, FRAMES_DIR, "labels")
+    os.makedirs(velo_dir, exist_ok=True)
+    os.makedirs(label_dir, exist_ok=True)
+    return velo_dir, label_dir
+
+
+def link_splits(output_root, names, split_mode='hardlink', counts=None, ratios=None, seed=SPLIT_SEED):
+    """把 frames 中的 names 按划分链接到 sequences/00、01、02（已有的链接只增删有变化的部分，不重写数据）"""
+    frames = source_frames([os.path.join(output_root, FRAMES_DIR)])
+    assignment = split_assignment([name for name in names if name in frames], counts, ratios, seed)
+    created, removed = materialize_splits(frames, assignment, output_root, split_mode,
+                                          {'counts': counts, 'ratios': ratios, 'seed': seed})
+    for seq_id, seq_names in assignment.items():
+        print(f"✅ Sequence {seq_id} 处理完成，共 {len(seq_names)} 帧")
+    print(f"新建链接 {created} 个，删除旧链接 {removed} 个")
+    return assignment
+
+
+def write_kitti_frame(points, labels, velo_dir, label_dir, base_name):
+    """写出一帧 .bin（float32 xyz）和 .label（uint32）"""
+    with stage('write', len(points)):
+        # tobytes 拷贝一份，启用后台写队列时调用方随后修改数组也不影响写出的内容
+        write_file_bytes(os.path.join(velo_dir, f"{base_name}.bin"), [np.asarray(points, dtype=np.float32).tobytes()])
+        write_file_bytes(os.path.join(label_dir, f"{base_name}.label"), [np.asarray(labels, dtype=np.uint32).tobytes()])
+
+
+def convert_frame(input_path, velo_dir, label_dir, base_name):
+    """读取一帧 PCD 并写出对应的 .bin / .label"""
+    points, labels = read_pcd_with_label(input_path)
+    write_kitti_frame(points, labels, velo_dir, label_dir, base_name)
+
+
+def convert_and_split_dataset(pcd_dir, output_root, workers=1, threads_per_worker=1, resume=True,
+                              prefetch=DEFAULT_PREFETCH_DEPTH, split_mode='hardlink', counts=None, ratios=None,
+                              seed=SPLIT_SEED):
+    """将所有 PCD 文件转换为 SemanticKITTI 格式写入 frames，再按划分链接成三个序列（00、01、02）"""
+    # 全部帧一起并行转换，只写一次
+    velo_dir, label_dir = frame_dirs(output_root)
+    tasks = []
+    for fname in sorted(f for f in os.listdir(pcd_dir) if f.endswith('.pcd')):
+        base_name = os.path.splitext(fname)[0]
+        input_path = os.path.join(pcd_dir, fname)
+        outputs = [os.path.join(velo_dir, f"{base_name}.bin"), os.path.join(label_dir, f"{base_name}.label")]
+        tasks.append((fname, (input_path, velo_dir, label_dir, base_name), [input_path], outputs))
+    manifest = BuildManifest(output_root, {}, [__file__])
+    results = run_incremental(convert_frame, tasks, manifest, resume, workers, threads_per_worker, prefetch)
+    report_batch(results)
+
+    return link_splits(output_root, [os.path.splitext(r.name)[0] for r in results if r.ok], split_mode, counts, ratios,
+                       seed)
+
+
+def validate_sequences(output_root, sequences):
+    """验证每个序列中的 .bin 和 .label 文件是否一一对应、点数是否一致"""
+    for seq in sequences:
+        # 帧索引（按帧名配对、由文件大小得到点数）同时写入序列目录，供后续检查和加载沿用
+        index = update_sequence_index(os.path.join(output_root, "sequences", seq))
+        problems = index_problems(index)
+
+        if problems:
             print(f"❌ Sequence {seq} 文件不匹配")
-            if missing_bin:
-                print(f"  缺失 bin 文件：{missing_bin}")
-            if missing_label:
-                print(f"  缺失 label 文件：{missing_label}")
+            for name, message in problems:
+                print(f"  {name}：{message}")
         else:
-            print(f"✅ Sequence {seq} 验证通过，共 {len(bin_files)} 个样本")
+            print(f"✅ Sequence {seq} 验证通过，共 {len(index['frames'])} 个样本")
 
 if __name__ == "__main__":
+    cache_dir = None  # 设为目录后启用 PCD 解析缓存，重复运行时直接加载解析结果
+    if cache_dir:
+        enable_frame_cache(cache_dir)
     # 修改这里的路径为你裁剪后 .pcd 文件所在的目录
     input_pcd_dir = "/home/may/data/process_data/data/afterimproved_dataset"
     output_root = "/home/may/data/process_data/data/Final_dataset2/dataset"
 
-    convert_and_split_dataset(input_pcd_dir, output_root)
-    validate_sequences(output_root)
+    parser = argparse.ArgumentParser(description="PCD 转 SemanticKITTI 并划分序列")
+    add_split_arguments(parser, default_seed=SPLIT_SEED)
+    parser.add_argument('--split_mode', default='hardlink', choices=SPLIT_MODES,
+                        help="序列中的帧用硬链接 / 符号链接指向 frames，manifest 只写划分清单 splits.json")
+    parser.add_argument('--pack_dir', default=None,
+                        help="转换后再把每个序列（manifest 时为 frames）打包为分片写到该目录下（见 packkitti.py）")
+    add_batch_arguments(parser)
+    add_manifest_arguments(parser)
+    args = parser.parse_args()
+    if args.profile:
+        enable_profiling(args.profile)
+
+    counts, ratios = split_arguments(args, SPLIT_RATIOS)
+    assignment = convert_and_split_dataset(input_pcd_dir, output_root, args.workers, args.threads_per_worker,
+                                           args.resume, args.prefetch, args.split_mode, counts, ratios, args.seed)
+    if args.split_mode == 'manifest':
+        if args.pack_dir:
+            pack_dataset(output_root, args.pack_dir, [FRAMES_DIR])
+    else:
+        validate_sequences(output_root, list(assignment))
+        if args.pack_dir:
+            pack_dataset(os.path.join(output_root, "sequences"), args.pack_dir, list(assignment))
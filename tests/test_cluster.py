@@ -0,0 +1,71 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.cluster import dbscan_labels_exact, eps_neighbor_counts, largest_cluster_mask
+
+DBSCAN = pytest.importorskip('sklearn.cluster').DBSCAN
+
+
+def _cloud(kind, seed, dtype):
+    """
+    random：连续随机点；lattice / plane：格点间距为 eps 的整数倍，大量点对距离恰好等于 eps；
+    rounded：坐标取一位小数，float32 下平方距离在 eps² 附近舍入
+    """
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(20, 400))
+    if kind == 'random':
+        xyz = rng.random((n, 3)) * 5
+    elif kind == 'lattice':
+        xyz = rng.integers(0, 8, (n, 3)) * 0.1
+    elif kind == 'plane':
+        xyz = rng.integers(0, 10, (n, 2)) * 0.3
+    else:
+        xyz = np.round(rng.random((n, 3)) * 3, 1)
+    return xyz.astype(dtype)
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+@pytest.mark.parametrize('kind', ['random', 'lattice', 'plane', 'rounded'])
+@pytest.mark.parametrize('seed', range(10))
+def test_exact_matches_sklearn(kind, seed, dtype):
+    xyz = _cloud(kind, seed, dtype)
+    for eps in (0.1, 0.3, 0.5):
+        counts = eps_neighbor_counts(xyz, eps)
+        for min_samples in (2, 4, 6):
+            expected = DBSCAN(eps=eps, min_samples=min_samples, algorithm='kd_tree').fit(xyz).labels_
+            np.testing.assert_array_equal(dbscan_labels_exact(xyz, eps, min_samples), expected)
+            np.testing.assert_array_equal(dbscan_labels_exact(xyz, eps, min_samples, neighbor_counts=counts),
+                                          expected)
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+@pytest.mark.parametrize('step', [0.25, 0.3])
+def test_boundary_distance_equal_to_eps(step, dtype):
+    # 相邻点沿 X 等距排列，eps 取第一段间距及其前一个浮点数：0.25 时各段间距都恰好等于 eps，
+    # 0.3 时各段间距在 eps 上下舍入，逐对取舍都要与 sklearn 一致
+    xyz = (np.arange(40)[:, None] * np.array([[step, 0.0, 0.0]])).astype(dtype)
+    eps = float(np.float64(xyz[1, 0]) - np.float64(xyz[0, 0]))
+    for e in (eps, np.nextafter(eps, 0)):
+        for min_samples in (2, 3):
+            expected = DBSCAN(eps=e, min_samples=min_samples, algorithm='kd_tree').fit(xyz).labels_
+            np.testing.assert_array_equal(dbscan_labels_exact(xyz, e, min_samples), expected)
+    if step == 0.25:
+        np.testing.assert_array_equal(dbscan_labels_exact(xyz, eps, 2), np.zeros(40))
+        np.testing.assert_array_equal(dbscan_labels_exact(xyz, np.nextafter(eps, 0), 2), np.full(40, -1))
+
+
+def test_empty_and_all_noise():
+    assert dbscan_labels_exact(np.empty((0, 3)), 0.5, 4).shape == (0,)
+    xyz = np.arange(30, dtype=np.float64).reshape(10, 3) * 10
+    np.testing.assert_array_equal(dbscan_labels_exact(xyz, 0.5, 2), np.full(10, -1))
+    assert not largest_cluster_mask(xyz, 0.5, 2).any()
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_largest_cluster_mask_matches_sklearn(seed):
+    xyz = _cloud('rounded', seed, np.float32)
+    np.testing.assert_array_equal(largest_cluster_mask(xyz, 0.3, 4, 'exact'),
+                                  largest_cluster_mask(xyz, 0.3, 4, 'sklearn'))
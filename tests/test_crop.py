@@ -0,0 +1,74 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.crop import crop_mask, crop_pcd_stream, fixed_x_band_bounds, label2_x_window_bounds
+from common.pcd_io import read_pcd_xyz_label, write_pcd_xyz_label
+
+POLICIES = [fixed_x_band_bounds, label2_x_window_bounds]
+
+
+def _frame(n, seed=0, labels=None):
+    rng = np.random.default_rng(seed)
+    xyz = np.column_stack([rng.normal(0, 20, n), rng.normal(0, 3, n), rng.uniform(5, 80, n)]).astype(np.float32)
+    if labels is None:
+        labels = rng.integers(0, 3, n)
+    return xyz, np.broadcast_to(labels, (n,)).astype(np.int32)
+
+
+def _crop_both(tmp_path, xyz, labels, policy, data_format='ascii', chunk_points=64, trim_thresholds=None):
+    """
+    同一帧分别整帧裁剪和流式裁剪，返回 (整帧保留的点, 流式写出的点, crop_mask 的结果, crop_pcd_stream 的结果)
+    """
+    src = str(tmp_path / 'src.pcd')
+    dst = str(tmp_path / 'out' / 'dst.pcd')
+    write_pcd_xyz_label(src, xyz, labels, data_format=data_format)
+    _, xyz_in, labels_in = read_pcd_xyz_label(src, np.float32)
+    mask_result = crop_mask(xyz_in, labels_in, policy, trim_thresholds=trim_thresholds)
+    stream_result = crop_pcd_stream(src, dst, policy, data_format, chunk_points, trim_thresholds=trim_thresholds)
+    _, xyz_out, labels_out = read_pcd_xyz_label(dst, np.float32)
+    mask = mask_result[0]
+    return (xyz_in[mask], labels_in[mask]), (xyz_out, labels_out), mask_result, stream_result
+
+
+@pytest.mark.parametrize('policy', POLICIES)
+@pytest.mark.parametrize('data_format', ['ascii', 'binary'])
+def test_empty_frame(tmp_path, policy, data_format):
+    xyz, labels = _frame(0)
+    (xyz_a, _), (xyz_b, _), (mask, num_trimmed, new_min, new_max), stream = _crop_both(
+        tmp_path, xyz, labels, policy, data_format)
+    assert mask.shape == (0,) and num_trimmed == 0 and xyz_b.shape == (0, 3)
+    assert stream[:3] == (0, 0, {})
+    # 空边界：下限 inf、上限 -inf
+    assert np.isposinf(new_min).all() and np.isneginf(new_max).all()
+    np.testing.assert_array_equal(stream[3], new_min)
+    np.testing.assert_array_equal(stream[4], new_max)
+
+
+@pytest.mark.parametrize('policy', POLICIES)
+def test_label1_only_frame(tmp_path, policy):
+    # 标签1不参与去离群也始终保留，只有标签1的帧两条路径都原样保留
+    xyz, labels = _frame(500, labels=1)
+    (xyz_a, labels_a), (xyz_b, labels_b), (mask, num_trimmed, _, _), stream = _crop_both(tmp_path, xyz, labels,
+                                                                                          policy)
+    assert mask.all() and num_trimmed == 500
+    assert stream[:3] == (500, 500, {1: 500})
+    np.testing.assert_array_equal(xyz_b, xyz_a)
+    np.testing.assert_array_equal(labels_b, labels_a)
+
+
+@pytest.mark.parametrize('policy', POLICIES)
+@pytest.mark.parametrize('data_format', ['ascii', 'binary'])
+def test_stream_matches_crop_mask_with_fixed_thresholds(tmp_path, policy, data_format):
+    # 固定去离群阈值时流式结果与整帧处理完全相同（不用 t-digest 近似）
+    xyz, labels = _frame(5000, seed=1)
+    thresholds = {'x': (-30.0, 30.0), 'z': (8.0, 75.0)}
+    (xyz_a, labels_a), (xyz_b, labels_b), (mask, num_trimmed, new_min, new_max), stream = _crop_both(
+        tmp_path, xyz, labels, policy, data_format, 333, thresholds)
+    assert stream[0] == num_trimmed and stream[1] == np.count_nonzero(mask)
+    np.testing.assert_array_equal(stream[3], new_min)
+    np.testing.assert_array_equal(stream[4], new_max)
+    np.testing.assert_array_equal(xyz_b, xyz_a)
+    np.testing.assert_array_equal(labels_b, labels_a)
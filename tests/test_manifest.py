@@ -0,0 +1,143 @@
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.manifest import BuildManifest, run_incremental
+
+# 本进程中处理函数被调用的文件名，用来判断哪些文件重新处理了
+CALLS = []
+
+
+def _stage(input_path, output_path):
+    """
+    测试用的处理函数：内容为 bad 时失败，为 empty 时不写出（如标签2太少的帧），否则写出大写内容并返回长度
+    """
+    CALLS.append(os.path.basename(input_path))
+    with open(input_path) as f:
+        text = f.read()
+    if text == 'bad':
+        raise ValueError("bad input")
+    if text == 'empty':
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        return 0
+    with open(output_path, 'w') as f:
+        f.write(text.upper())
+    return len(text)
+
+
+class _Stage:
+    def __init__(self, tmp_path, contents):
+        self.in_dir = tmp_path / 'in'
+        self.out_dir = tmp_path / 'out'
+        self.in_dir.mkdir()
+        self.out_dir.mkdir()
+        self.code_file = tmp_path / 'stage.py'
+        self.code_file.write_text('VERSION = 1\n')
+        for name, text in contents.items():
+            self.write(name, text)
+
+    def write(self, name, text):
+        (self.in_dir / name).write_text(text)
+
+    def output(self, name):
+        return str(self.out_dir / name)
+
+    def run(self, params=None, resume=True):
+        """
+        相当于重新运行一次脚本：重新读取清单，返回 (本次处理的文件名, {文件名: TaskResult})
+        """
+        manifest = BuildManifest(str(self.out_dir), params or {'scale': 1}, [str(self.code_file)])
+        tasks = []
+        for name in sorted(os.listdir(self.in_dir)):
+            input_path, output_path = str(self.in_dir / name), self.output(name)
+            tasks.append((name, (input_path, output_path), [input_path], [output_path]))
+        del CALLS[:]
+        results = run_incremental(_stage, tasks, manifest, resume, workers=1, prefetch=0)
+        return sorted(CALLS), {r.name: r for r in results}
+
+
+@pytest.fixture
+def stage(tmp_path):
+    return _Stage(tmp_path, {'a.txt': 'aaa', 'b.txt': 'bb', 'c.txt': 'empty'})
+
+
+def test_unchanged_inputs_are_skipped(stage):
+    calls, results = stage.run()
+    assert calls == ['a.txt', 'b.txt', 'c.txt']
+    calls, results = stage.run()
+    assert calls == []
+    # 跳过的文件取清单中记录的返回值
+    assert {name: r.value for name, r in results.items()} == {'a.txt': 3, 'b.txt': 2, 'c.txt': 0}
+    assert all(r.ok for r in results.values())
+    # 只改 mtime、内容不变：摘要相同，仍跳过
+    os.utime(stage.in_dir / 'a.txt', ns=(1, 1))
+    assert stage.run()[0] == []
+    # --force 全部重新处理
+    assert stage.run(resume=False)[0] == ['a.txt', 'b.txt', 'c.txt']
+
+
+def test_changed_param_or_code_recomputes_all(stage):
+    stage.run()
+    assert stage.run(params={'scale': 2})[0] == ['a.txt', 'b.txt', 'c.txt']
+    assert stage.run(params={'scale': 2})[0] == []
+    stage.code_file.write_text('VERSION = 2\n')
+    assert stage.run(params={'scale': 2})[0] == ['a.txt', 'b.txt', 'c.txt']
+
+
+def test_changed_input_recomputes_only_that_file(stage):
+    stage.run()
+    stage.write('a.txt', 'aaaa')
+    calls, results = stage.run()
+    assert calls == ['a.txt'] and results['a.txt'].value == 4
+    # 大小不变的改动：mtime 变了就重新计算摘要
+    stage.write('b.txt', 'xy')
+    os.utime(stage.in_dir / 'b.txt', ns=(10 ** 18, 10 ** 18))
+    assert stage.run()[0] == ['b.txt']
+    with open(stage.output('b.txt')) as f:
+        assert f.read() == 'XY'
+
+
+def test_failed_task_is_not_recorded(stage):
+    stage.write('d.txt', 'bad')
+    calls, results = stage.run()
+    assert calls == ['a.txt', 'b.txt', 'c.txt', 'd.txt']
+    assert not results['d.txt'].ok and 'bad input' in results['d.txt'].error
+    # 失败的文件下次重跑，其余跳过
+    calls, results = stage.run()
+    assert calls == ['d.txt'] and not results['d.txt'].ok
+    stage.write('d.txt', 'dddd')
+    calls, results = stage.run()
+    assert calls == ['d.txt'] and results['d.txt'].ok
+    assert stage.run()[0] == []
+
+
+def test_deleted_or_modified_output_rebuilds(stage):
+    stage.run()
+    os.remove(stage.output('a.txt'))
+    assert stage.run()[0] == ['a.txt']
+    assert os.path.exists(stage.output('a.txt'))
+    with open(stage.output('b.txt'), 'a') as f:
+        f.write('edited')
+    assert stage.run()[0] == ['b.txt']
+
+
+def test_output_recorded_as_none(stage):
+    # 有意不写出的文件记为 None：输出不存在是正常的，下次跳过；之后出现了同名文件则重新处理
+    stage.run()
+    assert not os.path.exists(stage.output('c.txt'))
+    assert stage.run()[0] == []
+    with open(stage.output('c.txt'), 'w') as f:
+        f.write('stale')
+    assert stage.run()[0] == ['c.txt']
+    assert not os.path.exists(stage.output('c.txt'))
+
+
+def test_deleted_input_is_pruned(stage):
+    stage.run()
+    os.remove(stage.in_dir / 'b.txt')
+    calls, results = stage.run()
+    assert calls == [] and sorted(results) == ['a.txt', 'c.txt']
+    stage.write('b.txt', 'bb')
+    assert stage.run()[0] == ['b.txt']
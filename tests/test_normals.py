@@ -0,0 +1,90 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.normals import knn_normals, label2_normals, smallest_eigenvectors
+from common.spatial import FrameIndex
+
+# open3d 0.20 estimate_normals(KDTreeSearchParamKNN(点数)) 在这些点集上的输出（各点近邻相同，法向相同），
+# 用来检查符号：eigh 的特征向量符号不确定，open3d 的闭式解有固定的符号
+OPEN3D_NORMALS = [
+    ([[0, 0, 0], [1, 0, 1], [0, 1, 2], [1, 1, 3], [2, 1, 4], [1, 2, 5]],
+     [-0.40824829, -0.81649658, 0.40824829]),
+    ([[0, 0, 0], [0.1, 0, 1], [-0.1, 0.05, 2], [0, -0.05, 3], [0.05, 0, 4], [0, 0.02, 5]],
+     [2.73336080e-01, 9.61918518e-01, 3.90566378e-04]),
+    ([[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0], [2, 3, 0]], [0, 0, -1]),
+    ([[0, 0, 0], [0, 1, 0], [0, 0, 1], [0, 1, 1], [0, 3, 2]], [1, 0, 0]),
+    ([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1], [1, 1, 0.5], [-1, 0.5, 0.2]],
+     [0.01795034, -0.24855878, -0.96845047]),
+]
+
+
+def _covariances(kind, rng, m=500):
+    """
+    random：一般位置的点；planar / collinear：近邻落在平面 / 直线上（协方差秩为 2 / 1）；
+    isotropic：协方差为单位阵的倍数
+    """
+    if kind == 'isotropic':
+        return np.eye(3)[None] * rng.uniform(0.1, 10, m)[:, None, None]
+    pts = rng.normal(0, 1, (m, 20, 3))
+    if kind != 'random':
+        basis = np.linalg.qr(rng.normal(0, 1, (m, 3, 3)))[0]
+        rank = 2 if kind == 'planar' else 1
+        pts = np.einsum('mkr,mjr->mkj', pts[:, :, :rank], basis[:, :, :rank])
+    pts -= pts.mean(axis=1, keepdims=True)
+    return np.matmul(pts.transpose(0, 2, 1), pts) / pts.shape[1]
+
+
+@pytest.mark.parametrize('kind', ['random', 'planar', 'collinear', 'isotropic'])
+@pytest.mark.parametrize('seed', range(3))
+def test_smallest_eigenvectors_matches_eigh(kind, seed):
+    cov = _covariances(kind, np.random.default_rng(seed))
+    vec = smallest_eigenvectors(cov)
+    evals, evecs = np.linalg.eigh(cov)
+    np.testing.assert_allclose(np.linalg.norm(vec, axis=1), 1, atol=1e-12)
+    # 最小特征值唯一时方向与 eigh 相同（只差符号），重根时是对应特征子空间中的任一单位向量
+    scale = np.abs(evals).max(axis=1, keepdims=True)
+    residual = np.einsum('mij,mj->mi', cov, vec) - evals[:, :1] * vec
+    np.testing.assert_allclose(residual / scale, 0, atol=1e-9)
+    if kind in ('random', 'planar'):
+        np.testing.assert_allclose(np.abs((vec * evecs[:, :, 0]).sum(axis=1)), 1, atol=1e-9)
+
+
+def test_degenerate_covariances():
+    cov = np.zeros((3, 3, 3))
+    cov[1] = np.diag([2.0, 1.0, 3.0])
+    cov[2] = np.diag([1.0, 1.0, 1.0])
+    np.testing.assert_array_equal(smallest_eigenvectors(cov), [[0, 0, 1], [0, 1, 0], [0, 0, 1]])
+
+
+@pytest.mark.parametrize('points, expected', OPEN3D_NORMALS)
+def test_open3d_sign_convention(points, expected):
+    xyz = np.array(points, dtype=np.float64)
+    normals = knn_normals(xyz, knn=xyz.shape[0])
+    np.testing.assert_allclose(normals, np.tile(expected, (xyz.shape[0], 1)), atol=1e-8)
+
+
+def test_matches_open3d_estimate_normals():
+    # open3d 依赖的系统库缺失时导入报 ImportError 而不是 ModuleNotFoundError，同样跳过
+    o3d = pytest.importorskip('open3d', exc_type=ImportError)
+    rng = np.random.default_rng(0)
+    xyz = np.vstack([rng.normal(0, 1, (2000, 3)), np.column_stack([rng.uniform(-5, 5, (2000, 2)),
+                                                                   rng.normal(0, 0.01, 2000)])])
+    pcd = o3d.geometry.PointCloud(o3d.utility.Vector3dVector(xyz))
+    pcd.estimate_normals(o3d.geometry.KDTreeSearchParamKNN(20))
+    np.testing.assert_allclose(knn_normals(xyz, knn=20), np.asarray(pcd.normals), atol=1e-6)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_label2_normals_match_full_cloud(seed):
+    # 只对标签2点估算的法向，与对全部点估算后取出标签2相同；近邻仍在全部点中查
+    rng = np.random.default_rng(seed)
+    xyz = rng.normal(0, 1, (3000, 3))
+    labels = rng.integers(0, 3, 3000)
+    mask2 = labels == 2
+    full = knn_normals(xyz)[mask2]
+    np.testing.assert_array_equal(label2_normals(xyz, mask2), full)
+    np.testing.assert_array_equal(label2_normals(xyz, mask2, index=FrameIndex(xyz, labels)), full)
+    assert label2_normals(xyz, np.zeros(3000, dtype=bool)).shape == (0, 3)
@@ -0,0 +1,94 @@
+import os
+import sys
+import numpy as np
+import pytest
+from scipy.spatial.distance import cdist
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.outliers import label_outlier_mask, radius_outlier_mask, statistical_outlier_mask
+
+
+def _reference_statistical(xyz, nb_neighbors, std_ratio):
+    """
+    open3d remove_statistical_outlier 的规则，逐点暴力计算：k 近邻含自身（点数不足时取全部点），
+    均值除以全部点数，标准差只统计平均距离大于 0 的点并除以 点数-1，阈值比较为严格小于
+    """
+    n = xyz.shape[0]
+    dist = np.sort(cdist(xyz, xyz), axis=1)[:, :min(nb_neighbors, n)]
+    avg = dist.mean(axis=1)
+    positive = avg > 0
+    cloud_mean = avg[positive].sum() / n
+    std_dev = np.sqrt(((avg[positive] - cloud_mean) ** 2).sum() / (n - 1))
+    return positive & (avg < cloud_mean + std_ratio * std_dev)
+
+
+def _reference_radius(xyz, nb_points, radius):
+    """
+    open3d remove_radius_outlier 的规则：距离² 严格小于 radius² 的点（含自身）多于 nb_points 个时保留
+    """
+    diff = xyz[:, None, :] - xyz[None, :, :]
+    return ((diff * diff).sum(axis=2) < radius * radius).sum(axis=1) > nb_points
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_statistical_matches_reference(seed):
+    rng = np.random.default_rng(seed)
+    xyz = np.vstack([rng.normal(0, 1, (300, 3)), rng.uniform(-8, 8, (20, 3))])
+    for nb_neighbors in (2, 5, 20):
+        for std_ratio in (0.5, 2.0):
+            np.testing.assert_array_equal(statistical_outlier_mask(xyz, nb_neighbors, std_ratio),
+                                          _reference_statistical(xyz, nb_neighbors, std_ratio))
+
+
+def test_statistical_duplicate_points():
+    # 与近邻全部重合的点平均距离为 0，被去除；它们仍计入均值的分母
+    rng = np.random.default_rng(0)
+    xyz = np.vstack([rng.normal(0, 1, (100, 3)), np.repeat(rng.normal(0, 1, (5, 3)), 4, axis=0)])
+    for nb_neighbors in (2, 4, 5, 10):
+        keep = statistical_outlier_mask(xyz, nb_neighbors, 1.0)
+        np.testing.assert_array_equal(keep, _reference_statistical(xyz, nb_neighbors, 1.0))
+    assert not statistical_outlier_mask(xyz, 4, 1.0)[100:].any()
+
+
+def test_statistical_fewer_points_than_neighbors():
+    rng = np.random.default_rng(1)
+    for n in (2, 7, 19):
+        xyz = rng.normal(0, 1, (n, 3))
+        np.testing.assert_array_equal(statistical_outlier_mask(xyz, 20, 1.0), _reference_statistical(xyz, 20, 1.0))
+    assert not statistical_outlier_mask(np.zeros((1, 3)), 20, 1.0).any()
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_radius_matches_reference(seed):
+    rng = np.random.default_rng(seed)
+    xyz = np.vstack([rng.normal(0, 1, (300, 3)), rng.uniform(-8, 8, (20, 3))])
+    for nb_points in (1, 3, 8):
+        for radius in (0.2, 0.5):
+            np.testing.assert_array_equal(radius_outlier_mask(xyz, nb_points, radius),
+                                          _reference_radius(xyz, nb_points, radius))
+
+
+def test_radius_boundary_and_duplicates():
+    # 格点间距恰好等于 radius：距离等于 radius 的邻点不计入，重复点计入
+    rng = np.random.default_rng(2)
+    xyz = np.vstack([rng.integers(0, 6, (200, 3)) * 0.25, np.zeros((3, 3))])
+    for nb_points in (1, 2, 3, 5):
+        for radius in (0.25, np.nextafter(0.25, 1), np.sqrt(2) * 0.25):
+            np.testing.assert_array_equal(radius_outlier_mask(xyz, nb_points, radius),
+                                          _reference_radius(xyz, nb_points, radius))
+    line = np.arange(5)[:, None] * np.array([[0.25, 0.0, 0.0]])
+    assert not radius_outlier_mask(line, 1, 0.25).any()
+    np.testing.assert_array_equal(radius_outlier_mask(line, 2, np.nextafter(0.25, 1)), [0, 1, 1, 1, 0])
+    assert not radius_outlier_mask(line[:2], 2, 1.0).any()
+
+
+def test_label_outlier_mask_per_label():
+    # 标签0按默认参数统计滤波，标签1不过滤，标签2半径滤波；各标签只在本标签的点中查近邻
+    rng = np.random.default_rng(3)
+    xyz = np.vstack([rng.normal(0, 1, (200, 3)), rng.uniform(-20, 20, (30, 3)), rng.normal(0, 0.3, (80, 3)),
+                     rng.uniform(-5, 5, (10, 3))])
+    labels = np.concatenate([np.zeros(200), np.ones(30), np.full(80, 2), np.full(10, 2)]).astype(int)
+    keep = label_outlier_mask(xyz, labels, {1: None, 2: {'nb_points': 3, 'radius': 0.3}}, 20, 2.0)
+    assert keep[labels == 1].all()
+    np.testing.assert_array_equal(keep[labels == 0], _reference_statistical(xyz[labels == 0], 20, 2.0))
+    np.testing.assert_array_equal(keep[labels == 2], _reference_radius(xyz[labels == 2], 3, 0.3))
@@ -0,0 +1,126 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common import pcd_stream
+from common.pcd_io import encode_pcd_body, read_pcd, read_pcd_points, write_pcd
+from common.pcd_stream import PCDStreamWriter, iter_pcd_chunks
+
+
+def _ascii_lines(values):
+    data = np.empty(values.shape[0], dtype=[('x', np.float64), ('label', np.int32)])
+    data['x'] = values
+    data['label'] = np.arange(values.shape[0]) % 3
+    return b''.join(encode_pcd_body(data, 'ascii')).decode().splitlines()
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_ascii_float_matches_printf(seed):
+    rng = np.random.default_rng(seed)
+    values = np.concatenate([
+        # 放大 1e6 后恰在 .5 附近，np.rint 与 printf 的舍入可能差一位
+        (rng.integers(-10 ** 8, 10 ** 8, 50000) + 0.5) / 1e6,
+        rng.integers(-10 ** 9, 10 ** 9, 50000) / 1e7,
+        (rng.integers(-10 ** 9, 10 ** 9, 50000) / 1e7).astype(np.float32),
+        rng.normal(0, 50, 50000),
+        rng.normal(0, 1e10, 1000),
+        [2.5e-6, -2.5e-6, 1 / 128, 0.0, -0.0, 1e11 + 0.1234565],
+    ])
+    assert _ascii_lines(values) == [f'{x:.6f} {i % 3}' for i, x in enumerate(values)]
+
+
+def test_ascii_float_fallback():
+    # 含 NaN/Inf 或超出定点范围时整列逐元素格式化
+    values = np.array([2.5e-6, np.nan, np.inf, -np.inf, 1e13, -1.5])
+    assert _ascii_lines(values) == [f'{x:.6f} {i % 3}' for i, x in enumerate(values)]
+
+
+def test_ascii_float_fields_parse_as_float64(tmp_path):
+    # SIZE 4 的 ASCII 浮点字段按 float64 解析，不截断为 float32；调用方要求的 dtype 在最后转换
+    path = str(tmp_path / 'frame.pcd')
+    xyz = np.array([[123456.789012, -0.1, 3.3], [0.3, 98765.432109, -7.000001]])
+    with open(path, 'w') as f:
+        f.write("VERSION 0.7\nFIELDS x y z intensity\nSIZE 4 4 4 4\nTYPE F F F I\nCOUNT 1 1 1 1\n"
+                "WIDTH 2\nHEIGHT 1\nVIEWPOINT 0 0 0 1 0 0 0\nPOINTS 2\nDATA ascii\n")
+        for (x, y, z), label in zip(xyz, (1, 2)):
+            f.write(f"{x:.6f} {y:.6f} {z:.6f} {label}\n")
+    header, points = read_pcd_points(path)
+    np.testing.assert_array_equal(points[:, :3], xyz)
+    np.testing.assert_array_equal(points[:, 3], [1, 2])
+    assert header['size'] == [4, 4, 4, 4]
+    _, points32 = read_pcd_points(path, dtype=np.float32)
+    np.testing.assert_array_equal(points32[:, :3], xyz.astype(np.float32))
+    chunk = next(iter_pcd_chunks(path))
+    assert chunk.dtype['x'] == np.float64 and chunk.dtype['intensity'] == np.int32
+    np.testing.assert_array_equal(chunk['x'], xyz[:, 0])
+
+
+def _structured(n, seed=0):
+    rng = np.random.default_rng(seed)
+    data = np.empty(n, dtype=[('x', np.float32), ('y', np.float32), ('z', np.float32), ('label', np.int32)])
+    for name in ('x', 'y', 'z'):
+        # 不同长度的数字，每行字节数不同，分块边界落在行中间
+        data[name] = np.round(rng.normal(0, 10 ** rng.integers(0, 4, n)), 3)
+    data['label'] = rng.integers(0, 3, n)
+    return data
+
+
+@pytest.mark.parametrize('bytes_per_point', [1, 3, 40])
+@pytest.mark.parametrize('chunk_points', [1, 7, 64, 5000])
+def test_ascii_chunks_split_mid_line(tmp_path, monkeypatch, chunk_points, bytes_per_point):
+    # 每次读取的字节数远小于一行时，不完整的行跨多次读取拼接
+    monkeypatch.setattr(pcd_stream, '_ASCII_BYTES_PER_POINT', bytes_per_point)
+    path = str(tmp_path / 'frame.pcd')
+    write_pcd(path, _structured(1000), 'ascii')
+    _, expected = read_pcd(path)
+    chunks = list(iter_pcd_chunks(path, chunk_points))
+    assert all(c.shape[0] == chunk_points for c in chunks[:-1]) and 0 < chunks[-1].shape[0] <= chunk_points
+    np.testing.assert_array_equal(np.concatenate(chunks), expected)
+
+
+def test_binary_partial_last_chunk(tmp_path):
+    path = str(tmp_path / 'frame.pcd')
+    data = _structured(1000)
+    write_pcd(path, data, 'binary')
+    chunks = list(iter_pcd_chunks(path, 64))
+    assert [c.shape[0] for c in chunks] == [64] * 15 + [40]
+    np.testing.assert_array_equal(np.concatenate(chunks), data)
+    np.testing.assert_array_equal(np.concatenate(chunks), read_pcd(path)[1])
+    # 文件被截断时报错，不静默少读
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 5 * data.dtype.itemsize)
+    with pytest.raises(ValueError):
+        list(iter_pcd_chunks(path, 64))
+
+
+@pytest.mark.parametrize('data_format', ['ascii', 'binary'])
+def test_empty_file(tmp_path, data_format):
+    path = str(tmp_path / 'empty.pcd')
+    data = _structured(0)
+    with PCDStreamWriter(path, data.dtype, data_format):
+        pass
+    assert list(iter_pcd_chunks(path)) == []
+    header, read_back = read_pcd(path)
+    assert header['points'] == 0 and read_back.shape == (0,)
+
+
+@pytest.mark.parametrize('data_format', ['ascii', 'binary'])
+def test_stream_writer_matches_read_pcd(tmp_path, data_format):
+    # 按块带掩码写出，结果与整帧读回的数据相同；头部点数按实际写入的点数生成
+    src = str(tmp_path / 'src.pcd')
+    dst = str(tmp_path / 'dst.pcd')
+    data = _structured(3000, seed=1)
+    write_pcd(src, data, data_format)
+    kept = []
+    with PCDStreamWriter(dst, data.dtype, data_format) as writer:
+        for chunk in iter_pcd_chunks(src, 500):
+            mask = chunk['label'] != 1
+            writer.write(chunk, mask)
+            kept.append(chunk[mask])
+    header, read_back = read_pcd(dst)
+    assert header['points'] == writer.num_points == sum(c.shape[0] for c in kept)
+    np.testing.assert_array_equal(read_back, np.concatenate(kept).astype(read_back.dtype))
+    np.testing.assert_array_equal(read_back, read_pcd(src)[1][data['label'] != 1])
+    assert not [f for f in os.listdir(tmp_path) if f.endswith('.part')]
@@ -0,0 +1,91 @@
+import os
+import sys
+import math
+import numpy as np
+import pytest
+from scipy.spatial.distance import cdist
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'process_data', 'scripts'))
+from scan import _quantize, duplicate_indices, isolated_indices
+
+
+def _cell(value, resolution):
+    # 逐个标量求格编号 k：k·resolution <= value < (k+1)·resolution
+    k = math.floor(value / resolution)
+    while k * resolution > value:
+        k -= 1
+    while (k + 1) * resolution <= value:
+        k += 1
+    return k
+
+
+def _reference_duplicates(xyz, resolution=0.0):
+    """
+    逐对比较：与某个下标更小的点坐标相同（-0.0 与 0.0 相同），或 resolution > 0 时三个轴都在同一格
+    """
+    if resolution > 0:
+        keys = np.array([[_cell(float(v), resolution) for v in row] for row in xyz])
+    else:
+        keys = xyz
+    same = (keys[:, None, :] == keys[None, :, :]).all(axis=2)
+    return np.flatnonzero(np.tril(same, -1).any(axis=1))
+
+
+def _reference_isolated(xyz, distance):
+    dist = cdist(xyz.astype(np.float64), xyz.astype(np.float64))
+    np.fill_diagonal(dist, np.inf)
+    return np.flatnonzero(dist.min(axis=1) > distance)
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+@pytest.mark.parametrize('seed', range(5))
+def test_duplicates_match_reference(seed, dtype):
+    rng = np.random.default_rng(seed)
+    # 坐标取少量离散值，重复点多；混入 -0.0
+    xyz = rng.integers(-3, 4, (400, 3)) * 0.5
+    xyz[rng.random((400, 3)) < 0.2] = -0.0
+    xyz = xyz.astype(dtype)
+    np.testing.assert_array_equal(duplicate_indices(xyz), _reference_duplicates(xyz))
+
+
+def test_negative_zero_is_duplicate():
+    xyz = np.array([[0.0, 1.0, -0.0], [-0.0, 1.0, 0.0], [0.0, -1.0, 0.0], [1e-45, 1.0, 0.0]], dtype=np.float32)
+    np.testing.assert_array_equal(duplicate_indices(xyz), [1])
+    np.testing.assert_array_equal(_reference_duplicates(xyz), [1])
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+@pytest.mark.parametrize('resolution', [0.1, 0.25, 0.3])
+def test_duplicates_on_grid_boundaries(resolution, dtype):
+    # 坐标恰在格边界 k·resolution 上及其前后一个浮点间隔，边界上的点属于以它为下界的格
+    rng = np.random.default_rng(0)
+    k = np.arange(-20, 21, dtype=np.float64)
+    edges = (k * resolution).astype(dtype)
+    values = np.concatenate([edges, np.nextafter(edges, dtype(-np.inf)), np.nextafter(edges, dtype(np.inf)),
+                             np.array([0.0, -0.0], dtype=dtype)])
+    xyz = np.column_stack([rng.choice(values, 600), rng.choice(values[:5], 600), np.zeros(600)]).astype(dtype)
+    np.testing.assert_array_equal(duplicate_indices(xyz, resolution), _reference_duplicates(xyz, resolution))
+    if dtype == np.float64:
+        # 恰在边界上的坐标属于第 k 格，紧挨在下面的属于第 k-1 格
+        np.testing.assert_array_equal(_quantize(edges[:, None], resolution)[:, 0], k)
+        np.testing.assert_array_equal(_quantize(np.nextafter(edges, -np.inf)[:, None], resolution)[:, 0], k - 1)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_isolated_match_reference(seed):
+    rng = np.random.default_rng(seed)
+    xyz = np.vstack([rng.normal(0, 2, (300, 3)), rng.uniform(-30, 30, (30, 3))]).astype(np.float32)
+    xyz[:10] = xyz[10:20]
+    for distance in (0.5, 1.0, 3.0):
+        np.testing.assert_array_equal(isolated_indices(xyz, distance), _reference_isolated(xyz, distance))
+
+
+def test_isolated_boundary_distance():
+    # 与最近点的距离恰好等于 distance 的点不算孤立
+    line = np.array([[0.0, 0, 0], [1.0, 0, 0], [2.0, 0, 0], [3.5, 0, 0], [10, 0, 0], [10, 0, 0]])
+    np.testing.assert_array_equal(isolated_indices(line, 1.0), [3])
+    np.testing.assert_array_equal(_reference_isolated(line, 1.0), [3])
+    np.testing.assert_array_equal(isolated_indices(line, np.nextafter(1.0, 0)), [0, 1, 2, 3])
+    np.testing.assert_array_equal(isolated_indices(line[:1], 1.0), [0])
@@ -0,0 +1,195 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.splits import (assign_splits, load_split_manifest, materialize_splits, migrate_sequences_to_pool,
+                           source_frames, split_sizes)
+
+OLD_LAYOUT = {'00': 7, '01': 2, '02': 1}
+
+
+def _write_frame(seq_dir, name, num_points):
+    for sub, ext, itemsize in (('velodyne', '.bin', 12), ('labels', '.label', 4)):
+        os.makedirs(os.path.join(seq_dir, sub), exist_ok=True)
+        with open(os.path.join(seq_dir, sub, name + ext), 'wb') as f:
+            f.write(bytes([len(name) % 256]) * (num_points * itemsize))
+
+
+def _old_layout(root):
+    """
+    旧 split.py 的结果：帧是 sequences/<划分>/ 下的普通文件；另有用户自己放的文件
+    """
+    start = 0
+    for split, n in OLD_LAYOUT.items():
+        for i in range(start, start + n):
+            _write_frame(os.path.join(root, 'sequences', split), f"{i:06d}", i + 1)
+        start += n
+    with open(os.path.join(root, 'sequences', '00', 'calib.txt'), 'w') as f:
+        f.write('P0: 1 0 0 0')
+    with open(os.path.join(root, 'sequences', '00', 'velodyne', 'README.txt'), 'w') as f:
+        f.write('notes')
+
+
+def _entries(root, assignment):
+    """
+    各划分下的链接：{(划分, 子目录, 文件名): lstat 的 inode}
+    """
+    out = {}
+    for split in assignment:
+        for sub in ('velodyne', 'labels'):
+            d = os.path.join(root, 'sequences', split, sub)
+            for fname in os.listdir(d) if os.path.isdir(d) else []:
+                if fname.endswith(('.bin', '.label')):
+                    out[(split, sub, fname)] = os.lstat(os.path.join(d, fname)).st_ino
+    return out
+
+
+def _check_links(root, pool, assignment, mode):
+    for split, names in assignment.items():
+        for sub, ext in (('velodyne', '.bin'), ('labels', '.label')):
+            d = os.path.join(root, 'sequences', split, sub)
+            assert sorted(f for f in os.listdir(d) if f.endswith(ext)) == sorted(n + ext for n in names)
+            for name in names:
+                path = os.path.join(d, name + ext)
+                assert os.path.islink(path) == (mode == 'symlink')
+                assert os.path.samefile(path, os.path.join(pool, sub, name + ext))
+
+
+def _moved_frames(assignment, previous):
+    where = {name: split for split, names in previous.items() for name in names}
+    return sum(where.get(name) != split for split, names in assignment.items() for name in names)
+
+
+@pytest.mark.parametrize('mode', ['hardlink', 'symlink'])
+def test_migrate_and_resplit(tmp_path, mode):
+    root = str(tmp_path / 'dataset')
+    pool = os.path.join(root, 'frames')
+    _old_layout(root)
+    assert migrate_sequences_to_pool(root, pool) == 2 * sum(OLD_LAYOUT.values())
+    # 已有帧目录时不再迁移
+    assert migrate_sequences_to_pool(root, pool) == 0
+    assert not os.path.exists(os.path.join(root, 'sequences', '00', 'velodyne', '000000.bin'))
+
+    frames = source_frames([pool])
+    assert sorted(frames) == [f"{i:06d}" for i in range(10)]
+    ratios = {'00': 7, '01': 1, '02': 1}
+    first = assign_splits(frames, split_sizes(len(frames), ratios=ratios))
+    assert materialize_splits(frames, first, root, mode) == (20, 0)
+    _check_links(root, pool, first, mode)
+    # 同一划分再跑一次不动任何链接
+    before = _entries(root, first)
+    assert materialize_splits(frames, first, root, mode) == (0, 0)
+    assert _entries(root, first) == before
+
+    # 换种子、再换比例：只增删换了划分的帧的链接，其余链接不重建
+    previous = first
+    for seed, new_ratios in ((1, ratios), (1, {'00': 6, '01': 2, '02': 2})):
+        assignment = assign_splits(frames, split_sizes(len(frames), ratios=new_ratios), seed)
+        moved = _moved_frames(assignment, previous)
+        before = _entries(root, assignment)
+        assert 0 < moved < len(frames)
+        assert materialize_splits(frames, assignment, root, mode, {'seed': seed}) == (2 * moved, 2 * moved)
+        _check_links(root, pool, assignment, mode)
+        after = _entries(root, assignment)
+        if mode == 'symlink':
+            kept = set(before) & set(after)
+            assert len(kept) == 2 * (len(frames) - moved)
+            assert all(before[k] == after[k] for k in kept)
+        assert load_split_manifest(root) == assignment
+        previous = assignment
+
+    # 少了一个划分：上次清单中有的划分的链接全部删除
+    assignment = assign_splits(frames, split_sizes(len(frames), ratios={'00': 1, '01': 1}))
+    materialize_splits(frames, assignment, root, mode)
+    assert _entries(root, {'02': []}) == {}
+    _check_links(root, pool, assignment, mode)
+
+    # 用户的文件不受影响，帧数据没有被改写
+    with open(os.path.join(root, 'sequences', '00', 'calib.txt')) as f:
+        assert f.read() == 'P0: 1 0 0 0'
+    assert os.path.exists(os.path.join(root, 'sequences', '00', 'velodyne', 'README.txt'))
+    for name, (bin_path, label_path) in frames.items():
+        assert os.path.getsize(bin_path) == (int(name) + 1) * 12
+
+
+def test_plain_frame_file_is_not_overwritten(tmp_path):
+    root = str(tmp_path / 'dataset')
+    pool = os.path.join(root, 'frames')
+    for i in range(4):
+        _write_frame(pool, f"{i:06d}", 5)
+    frames = source_frames([pool])
+    materialize_splits(frames, {'00': ['000000', '000001'], '01': ['000002', '000003']}, root)
+    # 划分目录中用户自己放的同名普通文件不删除，报错
+    user_file = os.path.join(root, 'sequences', '00', 'velodyne', '000009.bin')
+    with open(user_file, 'wb') as f:
+        f.write(b'x' * 12)
+    with pytest.raises(ValueError):
+        materialize_splits(frames, {'00': ['000000'], '01': ['000001', '000002', '000003']}, root)
+    assert os.path.exists(user_file)
+
+
+def test_switch_link_mode(tmp_path):
+    root = str(tmp_path / 'dataset')
+    pool = os.path.join(root, 'frames')
+    for i in range(6):
+        _write_frame(pool, f"{i:06d}", 3)
+    frames = source_frames([pool])
+    assignment = assign_splits(frames, split_sizes(6, counts={'01': 1, '02': 1, '00': None}), seed=3)
+    materialize_splits(frames, assignment, root, 'hardlink')
+    _check_links(root, pool, assignment, 'hardlink')
+    assert materialize_splits(frames, assignment, root, 'symlink') == (12, 0)
+    _check_links(root, pool, assignment, 'symlink')
+    assert materialize_splits(frames, assignment, root, 'hardlink') == (12, 0)
+    _check_links(root, pool, assignment, 'hardlink')
+
+
+def test_manifest_mode(tmp_path):
+    root = str(tmp_path / 'dataset')
+    pool = os.path.join(root, 'frames')
+    for i in range(5):
+        _write_frame(pool, f"{i:06d}", 2)
+    frames = source_frames([pool])
+    assignment = assign_splits(frames, split_sizes(5, ratios={'00': 3, '01': 1, '02': 1}), seed=0)
+    assert materialize_splits(frames, assignment, root, 'manifest', {'seed': 0}) == (0, 0)
+    assert not os.path.exists(os.path.join(root, 'sequences'))
+    assert load_split_manifest(root) == assignment
+    # 打包格式的来源（路径为 None）只能写清单
+    with pytest.raises(ValueError):
+        materialize_splits({'000000': (None, None)}, {'00': ['000000']}, root, 'hardlink')
+
+
+def _reference_sizes(total, ratios):
+    # 最大余数法：先取整，余下的帧按小数部分从大到小（并列时按给出的顺序）逐个分配
+    weights = list(ratios.values())
+    exact = [w / sum(weights) * total for w in weights]
+    sizes = [int(np.floor(e)) for e in exact]
+    order = sorted(range(len(sizes)), key=lambda i: (-(exact[i] - sizes[i]), i))
+    for i in order[:total - sum(sizes)]:
+        sizes[i] += 1
+    return dict(zip(ratios, sizes))
+
+
+def test_split_sizes_largest_remainder():
+    assert split_sizes(900, ratios={'00': 7, '01': 1, '02': 1}) == {'00': 700, '01': 100, '02': 100}
+    assert split_sizes(10, ratios={'00': 1, '01': 1, '02': 1}) == {'00': 4, '01': 3, '02': 3}
+    assert split_sizes(10, ratios={'00': 7, '01': 1, '02': 1}) == {'00': 8, '01': 1, '02': 1}
+    assert split_sizes(0, ratios={'00': 1, '01': 2}) == {'00': 0, '01': 0}
+    rng = np.random.default_rng(0)
+    for _ in range(500):
+        total = int(rng.integers(0, 2000))
+        ratios = {f"{i:02d}": float(w) for i, w in enumerate(rng.integers(0, 10, int(rng.integers(1, 6))))}
+        if not any(ratios.values()):
+            continue
+        sizes = split_sizes(total, ratios=ratios)
+        assert sum(sizes.values()) == total
+        assert sizes == _reference_sizes(total, ratios)
+
+
+def test_split_sizes_counts():
+    assert split_sizes(10, counts={'01': 2, '02': 1, '00': None}) == {'01': 2, '02': 1, '00': 7}
+    assert split_sizes(3, counts={'00': 2, '01': 1}) == {'00': 2, '01': 1}
+    for counts in ({'00': 2, '01': 1}, {'00': 20, '01': None}, {'00': None, '01': None}):
+        with pytest.raises(ValueError):
+            split_sizes(10, counts=counts)